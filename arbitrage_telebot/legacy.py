@@ -2,25 +2,37 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import atexit
 import base64
 import csv
 import hashlib
+import heapq
 import itertools
 import json
 import math
+import operator
 import os
 import random
 import shutil
+import sys
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from dataclasses import dataclass, field
+from functools import lru_cache
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from pathlib import Path
-from statistics import StatisticsError, mean, pstdev
 from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Type, Union
 
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional, se usa json estándar
+    orjson = None  # type: ignore[assignment]
 
 from config_store import (
     build_runtime_payload,
@@ -97,12 +109,15 @@ except Exception:  # pragma: no cover - fallback when prometheus_client is unava
 
 from observability import (
     ERROR_RATE_ALERT_THRESHOLD,
+    circuit_snapshot,
+    fetch_latency_snapshot,
     is_circuit_open,
     log_event,
     metrics_snapshot,
     record_exchange_attempt,
     record_exchange_error,
     record_exchange_no_data,
+    record_fetch_latency,
     record_exchange_skip,
     record_exchange_success,
     register_degradation_alert,
@@ -114,6 +129,17 @@ from runtime_state import RuntimeState
 LOG_BASE_DIR = os.getenv("LOG_BASE_DIR", "logs")
 LOG_BACKUP_DIR = os.getenv("LOG_BACKUP_DIR", "log_backups")
 DEFAULT_QUOTE_WORKERS = int(os.getenv("QUOTE_WORKERS", "16"))
+# Tope de espera por corrida: un venue lento (reintentos, fallbacks) no debe
+# demorar las alertas del resto. Lo que llega tarde igual queda en QUOTE_CACHE.
+QUOTE_FETCH_DEADLINE_SECONDS = float(os.getenv("QUOTE_FETCH_DEADLINE_SECONDS", "12"))
+# Requests simultáneas por venue (0 = sin tope): los pares de un venue sin
+# endpoint bulk se reparten en a lo sumo esta cantidad de tareas secuenciales,
+# así un venue con muchos pares no ocupa todo el pool compartido ni dispara
+# sus 429, y ningún worker queda bloqueado esperando turno.
+QUOTE_VENUE_CONCURRENCY = int(os.getenv("QUOTE_VENUE_CONCURRENCY", "4"))
+# Requests de cotización por segundo y venue (0 = sin límite); cada venue
+# puede fijar el suyo con `requests_per_second` en CONFIG["venues"].
+QUOTE_VENUE_RATE_PER_SECOND = float(os.getenv("QUOTE_VENUE_RATE_PER_SECOND", "10"))
 DEFAULT_QUOTE_ASSET = os.getenv("DEFAULT_QUOTE_ASSET", "USDT").strip().upper() or "USDT"
 PROCESS_ROLE = (os.getenv("PROCESS_ROLE", "all") or "all").strip().lower()
 
@@ -150,6 +176,18 @@ PROM_EXCHANGE_ERRORS = Gauge(
     ["exchange"],
     registry=PROM_REGISTRY,
 )
+PROM_FETCH_LATENCY_MS = Gauge(
+    "arbitrage_fetch_latency_ms",
+    "Per-quote fetch latency over the recent sample window",
+    ["stat"],
+    registry=PROM_REGISTRY,
+)
+
+# Gauges only change inside update_prometheus_metrics, so scrapes between two
+# scanner runs can reuse the rendered exposition instead of re-serialising it.
+PROM_CACHE_LOCK = threading.Lock()
+PROM_GENERATION = 0
+PROM_CACHE: Tuple[int, bytes] = (-1, b"")
 
 
 def emit_pair_coverage(pair: str, venues: Iterable[str]) -> None:
@@ -169,6 +207,9 @@ def emit_pair_coverage(pair: str, venues: Iterable[str]) -> None:
 # =========================
 BASE_CONFIG = {
     "threshold_percent": 0.30,      # alerta si neto >= 0.30%
+    # "all" evalúa todos los cruces buy/sell por par; "best_only" solo el
+    # mejor ask contra el mejor bid (una oportunidad por par, costo lineal).
+    "scan_mode": "all",
     "pairs": [
         # En modo de prueba solo consideramos los activos solicitados
         "BTC/USDT",
@@ -208,6 +249,9 @@ BASE_CONFIG = {
         "p2p_p2p": True,
         "ars_usdt_roundtrip": False,
         "triangular_intra_venue": True,
+        # Busca ciclos rentables (Bellman-Ford) entre los pares ya cotizados,
+        # además de las rutas fijas de triangular_routes.
+        "triangular_discovery": False,
     },
     "p2p_execution": {
         "allowed_payment_methods": ["BANK_TRANSFER"],
@@ -1435,6 +1479,9 @@ def persist_runtime_config() -> None:
     write_runtime_config(RUNTIME_CONFIG_PATH, runtime_payload)
     CONFIG["config_version"] = runtime_payload["config_version"]
     CONFIG["updated_at"] = runtime_payload["updated_at"]
+    # Los cambios por Telegram (pares, venues, fees) se aplican acá una sola
+    # vez; run_once sigue reutilizando los adapters y el mapa de fees.
+    rebuild_adapters()
 
 DYNAMIC_THRESHOLD_PERCENT: float = float(CONFIG.get("threshold_percent", 0.0))
 
@@ -1451,8 +1498,14 @@ TELEGRAM_WEBHOOK_RESET_COOLDOWN_SECONDS = 600.0
 TELEGRAM_LAST_WEBHOOK_RESET_TS = 0.0
 TELEGRAM_POLL_HEARTBEAT_TS = 0.0
 TELEGRAM_API_DEFAULT_TIMEOUT_SECONDS = 8
-TELEGRAM_POLL_TIMEOUT_SECONDS = 25
+# Espera del long poll del lado de Telegram (la API acepta hasta 50s).
+TELEGRAM_POLL_TIMEOUT_SECONDS = max(1, min(50, int(os.getenv("TELEGRAM_POLL_TIMEOUT_SECONDS", "25"))))
+TELEGRAM_POLL_LIMIT = 100
+# Solo procesamos mensajes; el resto de tipos de update no viaja por la red.
+TELEGRAM_POLL_ALLOWED_UPDATES = json.dumps(["message", "channel_post"])
 TELEGRAM_POLL_HTTP_TIMEOUT_GRACE_SECONDS = 8
+TELEGRAM_POLL_ERROR_BACKOFF_MAX_SECONDS = 30.0
+TELEGRAM_POLL_STOP = threading.Event()
 
 STATE_LOCK = threading.Lock()
 CONFIG_LOCK = threading.Lock()
@@ -1473,7 +1526,25 @@ WEB_AUTH_OPTIONAL = os.getenv("WEB_AUTH_OPTIONAL", "").strip().lower() in {"1",
 
 LATEST_ANALYSIS: Optional[Any] = None
 LAST_TELEGRAM_SEND_TS: float = 0.0
+# Estado de envíos: se actualiza una sola vez por broadcast, bajo lock, en vez
+# de que cada worker escriba los globals por su cuenta.
+TELEGRAM_SEND_STATS_LOCK = threading.Lock()
+TELEGRAM_SEND_ERRORS: "deque[Dict[str, Any]]" = deque(maxlen=100)
 PENDING_CHAT_ACTIONS: Dict[str, str] = {}
+# Protege chats registrados, acciones pendientes y offset de getUpdates, que
+# el hilo de polling muta mientras el scanner/broadcast los lee.
+TELEGRAM_STATE_LOCK = threading.RLock()
+# Los chats registrados se persisten en JSON (os.environ se pierde al
+# reiniciar). La escritura se agrupa con un debounce para no tocar disco en
+# cada alta.
+TELEGRAM_CHAT_IDS_PATH = Path(os.getenv("TELEGRAM_CHAT_IDS_PATH", str(Path(LOG_BASE_DIR) / "chat_ids.json")))
+TELEGRAM_CHAT_IDS_PERSIST_DEBOUNCE_SECONDS = 5.0
+TELEGRAM_CHAT_IDS_PERSIST_TIMER: Optional[threading.Timer] = None
+# Copia ordenada para los broadcasts; se invalida en cada alta de chats.
+TELEGRAM_CHAT_IDS_SORTED_CACHE: Optional[Tuple[int, Tuple[str, ...]]] = None
+# Último update_id procesado: al reiniciar se retoma desde acá en lugar de
+# re-ejecutar los comandos que Telegram retiene hasta 24 h.
+TELEGRAM_OFFSET_PATH = Path(os.getenv("TELEGRAM_OFFSET_PATH", str(Path(LOG_BASE_DIR) / "telegram_offset")))
 
 
 LOG_HEADER = [
@@ -1559,23 +1630,145 @@ def snapshot_public_config() -> Dict[str, Any]:
 def refresh_config_snapshot() -> None:
     RUNTIME_STATE.set_config_snapshot(snapshot_public_config())
 
+# Rutas cuyo header ya fue verificado en este proceso: los appends siguientes
+# evitan makedirs/stat y solo abren el archivo.
+CSV_HEADER_READY: Set[str] = set()
+
+
+def _read_csv_header(path: str) -> List[str]:
+    # utf-8-sig descarta el BOM que dejan Excel y otros editores.
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        first_line = f.readline()
+    return next(csv.reader([first_line]), [])
+
+
+def _migrate_csv_header(path: str, header: List[str]) -> None:
+    """Reescribe el CSV con el header nuevo en streaming (tmp + os.replace)."""
+    tmp_path = f"{path}.tmp"
+    with open(path, "r", newline="", encoding="utf-8-sig") as src, open(
+        tmp_path, "w", newline="", encoding="utf-8"
+    ) as dst:
+        reader = csv.DictReader(src)
+        writer = csv.DictWriter(dst, fieldnames=header, extrasaction="ignore", restval="")
+        writer.writeheader()
+        writer.writerows(reader)
+    os.replace(tmp_path, path)
+
+
+def _backup_unrecognized_csv(path: str) -> str:
+    """Copia el CSV a LOG_BACKUP_DIR sin tocar el original; devuelve la copia."""
+    source = Path(path)
+    backup_dir = Path(LOG_BACKUP_DIR)
+    backup_dir.mkdir(parents=True, exist_ok=True)
+    target = backup_dir / f"{source.stem}-header-{time.strftime('%Y%m%d-%H%M%S')}{source.suffix}"
+    shutil.copy2(source, target)
+    return str(target)
+
+
 def _ensure_csv_header(path: str, header: List[str]) -> None:
-    if not path:
+    if not path or path in CSV_HEADER_READY:
         return
-    os.makedirs(os.path.dirname(path), exist_ok=True)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
     if not os.path.exists(path) or os.path.getsize(path) == 0:
         with open(path, "w", newline="", encoding="utf-8") as f:
             csv.writer(f).writerow(header)
+    else:
+        # Solo se lee la primera línea; la reescritura queda para cuando el
+        # esquema cambió y las filas nuevas quedarían desalineadas.
+        existing = _read_csv_header(path)
+        if existing != list(header):
+            if set(existing) & set(header):
+                _migrate_csv_header(path, header)
+                log_event("csv.header_migrated", path=path, previous_columns=len(existing))
+            else:
+                # Sin columnas conocidas la primera línea no es un header
+                # (archivo sin header o ajeno): DictReader la tomaría como
+                # nombres y dejaría las filas en blanco. Se respalda y no se
+                # reescribe.
+                backup = _backup_unrecognized_csv(path)
+                log_event("csv.header_unrecognized", path=path, backup=backup, first_columns=len(existing))
+    CSV_HEADER_READY.add(path)
+
+
+def _write_header_if_empty(fh: Any, header: List[str]) -> None:
+    # CSV_HEADER_READY evita el stat por escritura; si el archivo se borró o
+    # rotó después, el handle recién abierto en modo "a" queda en 0 y se
+    # repone el header sin syscalls extra.
+    if fh.tell() == 0:
+        csv.writer(fh).writerow(header)
+
+
+def _open_csv_append(path: str, header: List[str], buffering: int = -1) -> Any:
+    """Abre el CSV en modo append; tras la primera vez no hay makedirs ni stat.
+
+    Si el directorio desapareció (rotación, limpieza manual) se vuelve a
+    inicializar una única vez en lugar de fallar en cada escritura.
+    """
+    _ensure_csv_header(path, header)
+    try:
+        fh = open(path, "a", newline="", encoding="utf-8", buffering=buffering)
+    except FileNotFoundError:
+        CSV_HEADER_READY.discard(path)
+        _ensure_csv_header(path, header)
+        fh = open(path, "a", newline="", encoding="utf-8", buffering=buffering)
+    _write_header_if_empty(fh, header)
+    return fh
 
 
 def _append_csv_row(path: str, header: List[str], row: List[Any]) -> None:
     if not path:
         return
-    _ensure_csv_header(path, header)
-    with open(path, "a", newline="", encoding="utf-8") as f:
+    with _open_csv_append(path, header) as f:
         csv.writer(f).writerow(row)
 
 
+# Los eventos de ciclo de vida se escriben varias veces por oportunidad: el
+# archivo queda abierto con buffer y se vuelca cada pocos segundos, al final
+# de cada corrida y al salir del proceso.
+CSV_BUFFERED_FLUSH_SECONDS = 2.0
+CSV_BUFFERED_HANDLES: Dict[str, Tuple[Any, Any]] = {}
+CSV_BUFFERED_LOCK = threading.Lock()
+CSV_BUFFERED_LAST_FLUSH = 0.0
+
+
+def _append_csv_row_buffered(path: str, header: List[str], row: List[Any]) -> None:
+    global CSV_BUFFERED_LAST_FLUSH
+    if not path:
+        return
+    with CSV_BUFFERED_LOCK:
+        entry = CSV_BUFFERED_HANDLES.get(path)
+        if entry is None:
+            fh = _open_csv_append(path, header, buffering=1 << 16)
+            entry = (fh, csv.writer(fh))
+            CSV_BUFFERED_HANDLES[path] = entry
+        entry[1].writerow(row)
+        now = time.monotonic()
+        if now - CSV_BUFFERED_LAST_FLUSH >= CSV_BUFFERED_FLUSH_SECONDS:
+            for fh, _ in CSV_BUFFERED_HANDLES.values():
+                fh.flush()
+            CSV_BUFFERED_LAST_FLUSH = now
+
+
+def flush_buffered_csv(close: bool = False) -> None:
+    global CSV_BUFFERED_LAST_FLUSH
+    with CSV_BUFFERED_LOCK:
+        for path, (fh, _) in list(CSV_BUFFERED_HANDLES.items()):
+            try:
+                fh.flush()
+                if close:
+                    fh.close()
+            except (OSError, ValueError) as exc:
+                log_event("csv.flush_error", path=path, error=str(exc))
+        if close:
+            CSV_BUFFERED_HANDLES.clear()
+        CSV_BUFFERED_LAST_FLUSH = time.monotonic()
+
+
+atexit.register(flush_buffered_csv, True)
+
+
 def make_signal_id(opp: "Opportunity", ts: Optional[int] = None) -> str:
     event_ts = int(ts or time.time())
     raw = f"{event_ts}|{opp.strategy}|{opp.pair}|{opp.buy_venue}|{opp.sell_venue}|{opp.buy_price:.8f}|{opp.sell_price:.8f}"
@@ -1596,7 +1789,7 @@ def record_signal_lifecycle_event(
     reason: str = "",
 ) -> None:
     pnl_delta = pnl_real_quote - est_pnl_quote
-    _append_csv_row(
+    _append_csv_row_buffered(
         str(CONFIG.get("signal_lifecycle_csv_path", "")),
         SIGNAL_LIFECYCLE_HEADER,
         [
@@ -1762,6 +1955,7 @@ COMMANDS_HELP: List[Tuple[str, str]] = [
 ]
 
 
+@lru_cache(maxsize=1)
 def format_command_help() -> str:
     command_lines = [f"- {command}: {description}" for command, description in COMMANDS_HELP]
     aliases = (
@@ -1771,8 +1965,28 @@ def format_command_help() -> str:
     return "📟 Comandos disponibles:\n" + "\n".join(command_lines) + f"\n{aliases}"
 
 
+# Token leído por nombre de variable: cada send/poll lo consulta y el entorno
+# no cambia en caliente. Un token vacío no se guarda para tomarlo si aparece.
+BOT_TOKEN_CACHE: Dict[str, str] = {}
+
+
 def get_bot_token() -> str:
-    return os.getenv(CONFIG["telegram"]["bot_token_env"], "").strip()
+    env_name = CONFIG["telegram"]["bot_token_env"]
+    token = BOT_TOKEN_CACHE.get(env_name)
+    if token is None:
+        token = os.getenv(env_name, "").strip()
+        if token:
+            BOT_TOKEN_CACHE[env_name] = token
+    return token
+
+
+def reset_bot_token_cache() -> None:
+    BOT_TOKEN_CACHE.clear()
+
+
+@lru_cache(maxsize=16)
+def tg_method_url(token: str, method: str) -> str:
+    return f"https://api.telegram.org/bot{token}/{method}"
 
 
 def tg_commands_reply_markup() -> Dict[str, Any]:
@@ -1806,14 +2020,16 @@ def tg_command_menu_payload() -> List[Dict[str, str]]:
 
 
 def set_pending_action(chat_id: str, action: Optional[str]) -> None:
-    if action:
-        PENDING_CHAT_ACTIONS[chat_id] = action
-    else:
-        PENDING_CHAT_ACTIONS.pop(chat_id, None)
+    with TELEGRAM_STATE_LOCK:
+        if action:
+            PENDING_CHAT_ACTIONS[chat_id] = action
+        else:
+            PENDING_CHAT_ACTIONS.pop(chat_id, None)
 
 
 def get_pending_action(chat_id: str) -> Optional[str]:
-    return PENDING_CHAT_ACTIONS.get(chat_id)
+    with TELEGRAM_STATE_LOCK:
+        return PENDING_CHAT_ACTIONS.get(chat_id)
 
 
 def normalize_pair_input(raw_value: str) -> Optional[str]:
@@ -1959,20 +2175,102 @@ def tg_sync_command_menu(enabled: bool = True) -> None:
         log_event("telegram.commands.cleared")
 
 
+def _invalidate_chat_ids_cache() -> None:
+    global TELEGRAM_CHAT_IDS_SORTED_CACHE
+    TELEGRAM_CHAT_IDS_SORTED_CACHE = None
+
+
+def _read_persisted_chat_ids(path: Path) -> List[str]:
+    try:
+        raw = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError) as exc:
+        log_event("telegram.chat_ids.load_error", path=str(path), error=str(exc))
+        return []
+    if not isinstance(raw, list):
+        return []
+    return [str(cid).strip() for cid in raw if str(cid).strip()]
+
+
 def _load_telegram_chat_ids_from_env() -> None:
+    """Une los chats del env con los persistidos en TELEGRAM_CHAT_IDS_PATH."""
     chat_ids_env = os.getenv(CONFIG["telegram"]["chat_ids_env"], "").strip()
-    if not chat_ids_env:
+    loaded = [cid.strip() for cid in chat_ids_env.split(",") if cid.strip()]
+    loaded.extend(_read_persisted_chat_ids(TELEGRAM_CHAT_IDS_PATH))
+    if not loaded:
         return
-    for cid in chat_ids_env.split(","):
-        cid = cid.strip()
-        if cid:
-            TELEGRAM_CHAT_IDS.add(cid)
-    os.environ[CONFIG["telegram"]["chat_ids_env"]] = ",".join(sorted(TELEGRAM_CHAT_IDS))
+    with TELEGRAM_STATE_LOCK:
+        TELEGRAM_CHAT_IDS.update(loaded)
+        _invalidate_chat_ids_cache()
 
 
 _load_telegram_chat_ids_from_env()
 
 
+def flush_telegram_chat_ids() -> None:
+    """Escribe de forma atómica (tmp + os.replace) los chats registrados."""
+    global TELEGRAM_CHAT_IDS_PERSIST_TIMER
+    with TELEGRAM_STATE_LOCK:
+        timer = TELEGRAM_CHAT_IDS_PERSIST_TIMER
+        TELEGRAM_CHAT_IDS_PERSIST_TIMER = None
+        snapshot = tuple(TELEGRAM_CHAT_IDS)
+        path = TELEGRAM_CHAT_IDS_PATH
+    if timer is not None:
+        timer.cancel()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(sorted(snapshot)), encoding="utf-8")
+        os.replace(tmp_path, path)
+    except OSError as exc:
+        log_event("telegram.chat_ids.persist_error", path=str(path), error=str(exc))
+
+
+def _schedule_chat_ids_persist() -> None:
+    global TELEGRAM_CHAT_IDS_PERSIST_TIMER
+    with TELEGRAM_STATE_LOCK:
+        if TELEGRAM_CHAT_IDS_PERSIST_TIMER is not None:
+            return
+        timer = threading.Timer(TELEGRAM_CHAT_IDS_PERSIST_DEBOUNCE_SECONDS, flush_telegram_chat_ids)
+        timer.daemon = True
+        TELEGRAM_CHAT_IDS_PERSIST_TIMER = timer
+    timer.start()
+
+
+def _load_telegram_offset() -> None:
+    global TELEGRAM_LAST_UPDATE_ID
+    try:
+        raw = TELEGRAM_OFFSET_PATH.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return
+    except OSError as exc:
+        log_event("telegram.offset.load_error", path=str(TELEGRAM_OFFSET_PATH), error=str(exc))
+        return
+    try:
+        offset = int(raw or 0)
+    except ValueError:
+        log_event("telegram.offset.load_error", path=str(TELEGRAM_OFFSET_PATH), error="invalid")
+        return
+    with TELEGRAM_STATE_LOCK:
+        TELEGRAM_LAST_UPDATE_ID = max(TELEGRAM_LAST_UPDATE_ID, offset)
+
+
+_load_telegram_offset()
+
+
+def persist_telegram_offset(update_id: int) -> None:
+    """Guarda el offset de getUpdates de forma atómica (tmp + os.replace)."""
+    path = TELEGRAM_OFFSET_PATH
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(str(int(update_id)), encoding="utf-8")
+        os.replace(tmp_path, path)
+    except OSError as exc:
+        log_event("telegram.offset.persist_error", path=str(path), error=str(exc))
+
+
 def _load_telegram_admin_ids_from_env() -> None:
     admin_ids_env = os.getenv("TG_ADMIN_IDS", "").strip()
     if not admin_ids_env:
@@ -2064,6 +2362,8 @@ def build_health_payload() -> Dict[str, Any]:
         "last_run_iso": summary.get("ts_str"),
         "run_latency_ms": summary.get("run_latency_ms"),
         "quote_latency_ms": quote_latency or summary.get("quote_latency_ms"),
+        "fetch_latency_ms": fetch_latency_snapshot(),
+        "open_circuits": circuit_snapshot(),
         "alerts_sent_last_run": summary.get("alerts_sent", 0),
         "triangular_alerts_last_run": summary.get("triangular_alerts", 0),
         "metrics": metrics,
@@ -2074,7 +2374,9 @@ def build_health_payload() -> Dict[str, Any]:
             "enabled": telegram_enabled,
             "last_send_ts": LAST_TELEGRAM_SEND_TS or None,
             "seconds_since_last_send": seconds_since_last_send,
-            "registered_chats": len(get_registered_chat_ids()),
+            "registered_chats": count_registered_chats(),
+            "recent_send_errors": len(TELEGRAM_SEND_ERRORS),
+            "last_send_error": TELEGRAM_SEND_ERRORS[-1] if TELEGRAM_SEND_ERRORS else None,
         },
         "process": {
             "role": PROCESS_ROLE,
@@ -2379,7 +2681,7 @@ class DashboardHandler(BaseHTTPRequestHandler):
         return False
 
     def _send_json(self, payload: Dict[str, Any], status: int = 200) -> None:
-        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        body = dumps_json_bytes(payload)
         self.send_response(status)
         self.send_header("Content-Type", "application/json; charset=utf-8")
         self.send_header("Cache-Control", "no-store, no-cache, must-revalidate")
@@ -2414,7 +2716,7 @@ class DashboardHandler(BaseHTTPRequestHandler):
     def do_GET(self):
         if self._is_healthcheck():
             payload = build_health_payload()
-            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            body = dumps_json_bytes(payload)
             self.send_response(health_status_code(self.path, payload))
             self.send_header("Content-Type", "application/json; charset=utf-8")
             self.send_header("Cache-Control", "no-store, no-cache, must-revalidate")
@@ -2428,7 +2730,7 @@ class DashboardHandler(BaseHTTPRequestHandler):
             self._send_html(DASHBOARD_HTML)
             return
         if self.path == "/metrics":
-            body = generate_latest(PROM_REGISTRY)
+            body = render_prometheus_metrics()
             self.send_response(200)
             self.send_header("Content-Type", CONTENT_TYPE_LATEST)
             self.send_header("Content-Length", str(len(body)))
@@ -2557,13 +2859,132 @@ def serve_http(port: int):
     log_event("web.listen_start", port=port)
     server.serve_forever()
 
+# Refresco en segundo plano: un hilo por venue mantiene QUOTE_CACHE caliente
+# con fetch_quotes_bulk, de modo que run_once lee cotizaciones sin I/O en el
+# camino crítico. Es el equivalente pull de un stream bookTicker por websocket.
+QUOTE_REFRESH_ENABLED = os.getenv("QUOTE_REFRESH_ENABLED", "").strip().lower() in {"1", "true", "yes", "on"}
+QUOTE_REFRESH_BACKOFF_MAX_SECONDS = 30.0
+QUOTE_REFRESH_THREADS: Dict[str, threading.Thread] = {}
+QUOTE_REFRESH_LOCK = threading.Lock()
+QUOTE_REFRESH_STOP = threading.Event()
+
+
+def _quote_refresh_loop(venue: str) -> None:
+    interval = max(0.5, QUOTE_CACHE_TTL_SECONDS / 2.0)
+    delay = interval
+    while not QUOTE_REFRESH_STOP.is_set():
+        adapter = build_adapters().get(venue)
+        if adapter is None:
+            log_event("quote.refresh.stopped", exchange=venue, reason="venue_disabled")
+            return
+        if is_circuit_open(venue):
+            QUOTE_REFRESH_STOP.wait(interval)
+            continue
+        # Mismo universo y normalización que run_once: de lo contrario la
+        # cache queda bajo claves que la corrida nunca lee.
+        with CONFIG_LOCK:
+            configured_pairs = list(CONFIG.get("pairs", []))
+        p2p_pairs_cfg = configured_p2p_pairs()
+        universe = quote_pair_universe(
+            normalize_pair_list(configured_pairs),
+            load_triangular_routes(),
+            {pair for venue_pairs in p2p_pairs_cfg.values() for pair in venue_pairs},
+        )
+        pairs = [pair for pair in universe if not _is_unsupported_spot_pair(venue, pair, p2p_pairs_cfg)]
+        # Cada request consume el rate limit del venue y sus errores cuentan
+        # para el circuit breaker, igual que en fetch_all_quotes.
+        batches = [pairs] if adapter.bulk_quotes_supported else [[pair] for pair in pairs]
+        failed = False
+        for batch in batches:
+            if not batch or QUOTE_REFRESH_STOP.is_set() or is_circuit_open(venue):
+                break
+            for pair in batch:
+                record_exchange_attempt(venue, pair)
+            throttle_venue_request(venue)
+            try:
+                if adapter.bulk_quotes_supported:
+                    quotes = adapter.fetch_quotes_bulk(batch)
+                else:
+                    quotes = {batch[0]: fetch_quote_coalesced(venue, batch[0], adapter)}
+            except Exception as exc:
+                if getattr(exc, "status_code", None) == 429:
+                    invalidate_quote_cache(venue)
+                for pair in batch:
+                    record_exchange_error(venue, str(exc), pair)
+                log_event("quote.refresh.error", exchange=venue, error=str(exc), retry_in=delay)
+                failed = True
+                continue
+            for pair in batch:
+                quote = quotes.get(pair)
+                if quote and str(getattr(quote, "source", "")).lower() != "offline":
+                    store_cached_quote(venue, pair, adapter, quote)
+                    record_exchange_success(venue, pair)
+                else:
+                    record_exchange_no_data(venue, pair)
+        if failed:
+            QUOTE_REFRESH_STOP.wait(delay)
+            delay = min(delay * 2.0, QUOTE_REFRESH_BACKOFF_MAX_SECONDS)
+            continue
+        delay = interval
+        QUOTE_REFRESH_STOP.wait(interval)
+
+
+def ensure_quote_refresh_threads() -> None:
+    """Arranca (o reanuda) un hilo de refresco por venue habilitado."""
+
+    if QUOTE_CACHE_TTL_SECONDS <= 0:
+        return
+    QUOTE_REFRESH_STOP.clear()
+    with QUOTE_REFRESH_LOCK:
+        for venue in build_adapters():
+            thread = QUOTE_REFRESH_THREADS.get(venue)
+            if thread and thread.is_alive():
+                continue
+            thread = threading.Thread(
+                target=_quote_refresh_loop,
+                args=(venue,),
+                daemon=True,
+                name=f"quote-refresh-{venue}",
+            )
+            QUOTE_REFRESH_THREADS[venue] = thread
+            thread.start()
+
+
+def stop_quote_refresh_threads(timeout: Optional[float] = None) -> None:
+    QUOTE_REFRESH_STOP.set()
+    with QUOTE_REFRESH_LOCK:
+        threads = list(QUOTE_REFRESH_THREADS.values())
+        QUOTE_REFRESH_THREADS.clear()
+    if timeout:
+        for thread in threads:
+            thread.join(timeout)
+
+
+def next_loop_tick(previous_tick: float, period: float, now: float) -> Tuple[float, int]:
+    """Próximo tick de la grilla fija y cuántos ticks se saltaron por atraso."""
+
+    next_tick = previous_tick + period
+    if next_tick > now:
+        return next_tick, 0
+    skipped = int((now - next_tick) // period) + 1
+    return next_tick + skipped * period, skipped
+
+
 def run_loop_forever(interval: int):
+    # Frecuencia fija sobre reloj monotónico: la duración de run_once no se
+    # suma al período. Si una corrida se pasa de uno o más ticks se salta al
+    # siguiente tick alineado en vez de encadenar corridas atrasadas.
+    period = float(max(5, interval))
+    tick = time.monotonic()
     while True:
         try:
             run_once()
         except Exception as e:
             log_event("loop.error", error=str(e))
-        time.sleep(max(5, interval))
+        tick, skipped = next_loop_tick(tick, period, time.monotonic())
+        if skipped:
+            log_event("loop.overrun", period_seconds=period, skipped_ticks=skipped)
+        time.sleep(max(0.0, tick - time.monotonic()))
 
 # =========================
 # HTTP helpers
@@ -2571,27 +2992,257 @@ def run_loop_forever(interval: int):
 class HttpError(Exception):
     """Error HTTP con código opcional."""
 
-    def __init__(self, message: str, status_code: Optional[int] = None, is_timeout: bool = False):
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        is_timeout: bool = False,
+        retry_after: Optional[float] = None,
+    ):
         super().__init__(message)
         self.status_code = status_code
         self.is_timeout = is_timeout
+        self.retry_after = retry_after
 
 def current_millis() -> int:
-    return int(time.time() * 1000)
+    # time_ns devuelve un int directo: sin float intermedio ni redondeo.
+    return time.time_ns() // 1_000_000
 
 
-@dataclass
+# Objetos de alta rotación (uno por venue/par/corrida): slots elimina el
+# __dict__ por instancia. No se congelan porque el pipeline los ajusta in situ
+# (profundidad, VWAP, net_percent).
+DATACLASS_SLOTS: Dict[str, Any] = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**DATACLASS_SLOTS)
 class HttpJsonResponse:
-    data: Dict[str, Any]
+    data: Union[Dict[str, Any], List[Any]]
     checksum: str
     received_ts: int
 
 
+def loads_json_bytes(raw: Union[bytes, str]) -> Any:
+    """Parsea el body crudo; orjson cuando está instalado (bastante más rápido en tickers bulk)."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def dumps_json_bytes(payload: Any) -> bytes:
+    """Serializa a UTF-8 para las respuestas HTTP; orjson si está, json estándar si no."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def dumps_cache_key(payload: Any) -> Union[bytes, str]:
+    """Serialización determinística de config para claves de caché (se calcula en cada corrida)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str)
+        except TypeError:
+            pass
+    return json.dumps(payload, sort_keys=True, default=str)
+
+
 LAST_CHECKSUMS: Dict[str, Tuple[str, int]] = {}
 MAX_CHECKSUM_STALENESS_MS = 60_000
 
 
 NON_RETRYABLE_STATUS_CODES = {401, 403, 451}
+# Tope para el Retry-After de un 429: más allá conviene dejar que el
+# circuit breaker y la próxima corrida se encarguen.
+HTTP_MAX_RETRY_AFTER_SECONDS = 10.0
+
+
+def _http_retry_after(response: requests.Response) -> Optional[float]:
+    """Segundos del header Retry-After de un 429 (solo la forma numérica)."""
+    if response.status_code != 429:
+        return None
+    raw = (response.headers.get("Retry-After") or "").strip()
+    try:
+        retry_after = float(raw)
+    except ValueError:
+        return None
+    return min(max(retry_after, 0.0), HTTP_MAX_RETRY_AFTER_SECONDS)
+
+
+def _http_retry_delay(exc: Exception, attempt: int) -> float:
+    if isinstance(exc, HttpError) and exc.retry_after is not None:
+        return exc.retry_after
+    return min(0.5 * (2 ** attempt), 5.0) + random.uniform(0, 0.25)
+
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "16"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "64"))
+# Con HTTP_TRUST_ENV=0 requests deja de consultar proxies/.netrc del entorno
+# en cada request (útil cuando el bot sale directo a los exchanges).
+HTTP_TRUST_ENV = os.getenv("HTTP_TRUST_ENV", "1").strip().lower() not in {"0", "false", "no", "off"}
+DEPTH_PREFETCH_WORKERS = 8
+
+
+def build_http_session(
+    pool_connections: int = HTTP_POOL_CONNECTIONS,
+    pool_maxsize: int = HTTP_POOL_MAXSIZE,
+    trust_env: Optional[bool] = None,
+) -> requests.Session:
+    """Sesión con keep-alive y pool por host; los reintentos los maneja http_get_json."""
+
+    session = requests.Session()
+    session.trust_env = HTTP_TRUST_ENV if trust_env is None else trust_env
+    adapter = HTTPAdapter(
+        pool_connections=max(1, pool_connections),
+        pool_maxsize=max(1, pool_maxsize),
+        max_retries=0,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class TokenBucket:
+    """Token bucket thread-safe: `rate` tokens por segundo con ráfagas de hasta `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        self.rate = max(float(rate), 1e-6)
+        self.capacity = max(1.0, float(burst if burst is not None else rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0, max_wait: Optional[float] = None) -> Optional[float]:
+        """Bloquea hasta obtener `tokens`; devuelve los segundos esperados.
+
+        Con `max_wait`, si la espera total lo superaría no consume nada y
+        devuelve None.
+        """
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait = (tokens - self._tokens) / self.rate
+                if max_wait is not None and waited + wait > max_wait:
+                    return None
+            time.sleep(wait)
+            waited += wait
+
+
+# Cada worker de quotes y de prefetch de depth puede tener una conexión viva
+# al mismo host; con menos slots urllib3 descarta sockets y repite el TLS.
+HTTP_SESSION = build_http_session(
+    pool_maxsize=max(HTTP_POOL_MAXSIZE, DEFAULT_QUOTE_WORKERS + DEPTH_PREFETCH_WORKERS)
+)
+TELEGRAM_SEND_WORKERS = 8
+TELEGRAM_COMMAND_WORKERS = 8
+# Telegram usa pools propios: los envíos no compiten con el getUpdates de
+# long polling, que mantiene su conexión ocupada hasta ~33 s. Los workers de
+# envío, de comandos y el despachador comparten TELEGRAM_SESSION: con menos
+# slots urllib3 descarta conexiones y el siguiente envío repite el TLS.
+TELEGRAM_SESSION = build_http_session(
+    pool_connections=1,
+    pool_maxsize=TELEGRAM_SEND_WORKERS + TELEGRAM_COMMAND_WORKERS + 1,
+)
+TELEGRAM_POLL_SESSION = build_http_session(pool_connections=1, pool_maxsize=2)
+
+# Telegram admite ~30 mensajes/s globales por bot; se deja margen.
+TELEGRAM_SEND_RATE_PER_SECOND = 28.0
+TELEGRAM_SEND_BUCKET = TokenBucket(TELEGRAM_SEND_RATE_PER_SECOND)
+TELEGRAM_SEND_POOL: Optional[ThreadPoolExecutor] = None
+TELEGRAM_SEND_POOL_LOCK = threading.Lock()
+
+
+def get_telegram_send_pool() -> ThreadPoolExecutor:
+    global TELEGRAM_SEND_POOL
+    with TELEGRAM_SEND_POOL_LOCK:
+        if TELEGRAM_SEND_POOL is None:
+            TELEGRAM_SEND_POOL = ThreadPoolExecutor(
+                max_workers=TELEGRAM_SEND_WORKERS,
+                thread_name_prefix="telegram-send",
+            )
+        return TELEGRAM_SEND_POOL
+
+
+# Despacho no bloqueante para el scanner: un único worker mantiene el orden de
+# las alertas mientras run_once sigue calculando el resto de oportunidades.
+TELEGRAM_DISPATCH_POOL: Optional[ThreadPoolExecutor] = None
+TELEGRAM_DISPATCH_POOL_LOCK = threading.Lock()
+
+
+def get_telegram_dispatch_pool() -> ThreadPoolExecutor:
+    global TELEGRAM_DISPATCH_POOL
+    with TELEGRAM_DISPATCH_POOL_LOCK:
+        if TELEGRAM_DISPATCH_POOL is None:
+            TELEGRAM_DISPATCH_POOL = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix="telegram-dispatch",
+            )
+        return TELEGRAM_DISPATCH_POOL
+
+
+def tg_send_message_nowait(text: str, **kwargs: Any) -> "Future[None]":
+    """Encola tg_send_message y devuelve enseguida; ver wait_for_telegram_sends."""
+    return get_telegram_dispatch_pool().submit(tg_send_message, text, **kwargs)
+
+
+# Límite práctico por mensaje (Telegram corta en 4096) para agrupar alertas.
+TELEGRAM_MESSAGE_MAX_CHARS = 3900
+
+
+def batch_telegram_texts(
+    texts: List[str],
+    limit: int = TELEGRAM_MESSAGE_MAX_CHARS,
+    separator: str = "\n\n",
+) -> List[str]:
+    """Agrupa textos en el menor número de mensajes que no superen `limit`."""
+
+    batches: List[str] = []
+    current: List[str] = []
+    current_len = 0
+    for text in texts:
+        extra = len(text) + (len(separator) if current else 0)
+        if current and current_len + extra > limit:
+            batches.append(separator.join(current))
+            current, current_len = [], 0
+            extra = len(text)
+        current.append(text)
+        current_len += extra
+    if current:
+        batches.append(separator.join(current))
+    return batches
+
+
+def wait_for_telegram_sends(pending: List["Future[None]"], timeout: Optional[float] = None) -> None:
+    for future in pending:
+        try:
+            future.result(timeout=timeout)
+        except Exception as exc:
+            log_event("telegram.send.dispatch_error", error=str(exc))
+
+
+# Pool separado del de envíos: los handlers de comandos envían mensajes y no
+# deben competir (ni bloquearse) contra los workers de broadcast.
+TELEGRAM_COMMAND_POOL: Optional[ThreadPoolExecutor] = None
+TELEGRAM_COMMAND_POOL_LOCK = threading.Lock()
+
+
+def get_telegram_command_pool() -> ThreadPoolExecutor:
+    global TELEGRAM_COMMAND_POOL
+    with TELEGRAM_COMMAND_POOL_LOCK:
+        if TELEGRAM_COMMAND_POOL is None:
+            TELEGRAM_COMMAND_POOL = ThreadPoolExecutor(
+                max_workers=TELEGRAM_COMMAND_WORKERS,
+                thread_name_prefix="telegram-command",
+            )
+        return TELEGRAM_COMMAND_POOL
 
 
 def _body_preview(response: requests.Response, limit: int = 200) -> str:
@@ -2610,6 +3261,7 @@ def http_get_json(
     integrity_key: Optional[str] = None,
     fallback_endpoints: Optional[List[Tuple[str, Optional[dict]]]] = None,
     headers: Optional[Dict[str, str]] = None,
+    allow_list: bool = False,
 ) -> HttpJsonResponse:
     last_exc: Optional[Exception] = None
     endpoints: List[Tuple[str, Optional[dict]]] = [(url, params)]
@@ -2620,7 +3272,7 @@ def http_get_json(
         non_retryable_error = False
         for attempt in range(retries):
             try:
-                r = requests.get(
+                r = HTTP_SESSION.get(
                     endpoint_url,
                     params=endpoint_params,
                     timeout=timeout,
@@ -2630,12 +3282,13 @@ def http_get_json(
                     raise HttpError(
                         f"HTTP {r.status_code} {endpoint_url} params={endpoint_params}",
                         status_code=r.status_code,
+                        retry_after=_http_retry_after(r),
                     )
 
                 received_ts = current_millis()
                 checksum = hashlib.sha256(r.content).hexdigest()
                 try:
-                    payload = r.json()
+                    payload = loads_json_bytes(r.content)
                 except ValueError as exc:
                     content_type = r.headers.get("Content-Type", "")
                     raise HttpError(
@@ -2645,7 +3298,7 @@ def http_get_json(
                         f"body_preview={_body_preview(r)!r}",
                         status_code=r.status_code,
                     ) from exc
-                if not isinstance(payload, dict):
+                if not isinstance(payload, dict) and not (allow_list and isinstance(payload, list)):
                     raise HttpError(f"Respuesta no es JSON objeto en {endpoint_url}")
 
                 if integrity_key:
@@ -2662,8 +3315,9 @@ def http_get_json(
                 if isinstance(e, HttpError) and e.status_code in NON_RETRYABLE_STATUS_CODES:
                     non_retryable_error = True
                     break
-                backoff = min(0.5 * (2 ** attempt), 5.0)
-                time.sleep(backoff + random.uniform(0, 0.25))
+                # Tras el último intento no se espera: sigue el fallback o el raise.
+                if attempt + 1 < retries:
+                    time.sleep(_http_retry_delay(e, attempt))
         if non_retryable_error:
             if fallback_endpoints and last_exc is not None:
                 print(f"[http] endpoint no reintentable {endpoint_url}: {last_exc}; probando fallback")
@@ -2697,7 +3351,7 @@ def http_post_json(
         non_retryable_error = False
         for attempt in range(retries):
             try:
-                r = requests.post(
+                r = HTTP_SESSION.post(
                     endpoint_url,
                     json=endpoint_payload,
                     headers=effective_headers,
@@ -2707,12 +3361,13 @@ def http_post_json(
                     raise HttpError(
                         f"HTTP {r.status_code} {endpoint_url} payload={endpoint_payload}",
                         status_code=r.status_code,
+                        retry_after=_http_retry_after(r),
                     )
 
                 received_ts = current_millis()
                 checksum = hashlib.sha256(r.content).hexdigest()
                 try:
-                    payload_json = r.json()
+                    payload_json = loads_json_bytes(r.content)
                 except ValueError as exc:
                     content_type = r.headers.get("Content-Type", "")
                     raise HttpError(
@@ -2731,8 +3386,8 @@ def http_post_json(
                 if isinstance(exc, HttpError) and exc.status_code in NON_RETRYABLE_STATUS_CODES:
                     non_retryable_error = True
                     break
-                backoff = min(0.5 * (2 ** attempt), 5.0)
-                time.sleep(backoff + random.uniform(0, 0.25))
+                if attempt + 1 < retries:
+                    time.sleep(_http_retry_delay(exc, attempt))
         if non_retryable_error:
             if fallback_endpoints and last_exc is not None:
                 print(f"[http] endpoint no reintentable {endpoint_url}: {last_exc}; probando fallback")
@@ -2821,7 +3476,7 @@ def _extract_json_path(data: Any, path: List[Union[str, int]]) -> Any:
     return current
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class DepthInfo:
     best_bid: float
     best_ask: float
@@ -2849,15 +3504,16 @@ def _parse_orderbook_levels(entries: Any, max_levels: int = 20) -> List[Tuple[fl
     return parsed
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class DepthCacheEntry:
     info: DepthInfo
     stored_ts: int
 
 
 class DepthCache:
-    def __init__(self, ttl_ms: int = 5_000):
+    def __init__(self, ttl_ms: int = 5_000, stale_ms: int = 10_000):
         self.ttl_ms = ttl_ms
+        self.stale_ms = stale_ms
         self._lock = threading.Lock()
         self._data: Dict[Tuple[str, str], DepthCacheEntry] = {}
 
@@ -2871,27 +3527,86 @@ class DepthCache:
                 return None
             return entry.info
 
+    def lookup(self, key: Tuple[str, str], now_ms: Optional[int] = None) -> Tuple[Optional[DepthInfo], bool]:
+        """Devuelve (info, fresca); vencido el TTL se sirve hasta `stale_ms` más."""
+        now = now_ms or current_millis()
+        with self._lock:
+            entry = self._data.get(key)
+        if not entry:
+            return None, False
+        age = now - entry.stored_ts
+        if age <= self.ttl_ms:
+            return entry.info, True
+        if age <= self.ttl_ms + self.stale_ms:
+            return entry.info, False
+        return None, False
+
     def set(self, key: Tuple[str, str], info: DepthInfo) -> None:
         with self._lock:
             self._data[key] = DepthCacheEntry(info=info, stored_ts=current_millis())
 
 
 DEPTH_CACHE = DepthCache()
+# Snapshots de depth en vuelo: fetch_all_quotes los dispara junto al ticker
+# y get_depth espera el mismo future en vez de repetir la request.
+DEPTH_INFLIGHT: Dict[Tuple[str, str], "Future[Optional[DepthInfo]]"] = {}
+DEPTH_INFLIGHT_LOCK = threading.Lock()
+DEPTH_PREFETCH_POOL: Optional[ThreadPoolExecutor] = None
+DEPTH_PREFETCH_POOL_LOCK = threading.Lock()
+
+
+def get_depth_prefetch_pool() -> ThreadPoolExecutor:
+    global DEPTH_PREFETCH_POOL
+    with DEPTH_PREFETCH_POOL_LOCK:
+        if DEPTH_PREFETCH_POOL is None:
+            DEPTH_PREFETCH_POOL = ThreadPoolExecutor(
+                max_workers=DEPTH_PREFETCH_WORKERS,
+                thread_name_prefix="depth-prefetch",
+            )
+        return DEPTH_PREFETCH_POOL
 
 # =========================
 # Telegram (HTTP API)
 # =========================
 def register_telegram_chat(chat_id) -> str:
     cid = str(chat_id)
-    if cid not in TELEGRAM_CHAT_IDS:
+    with TELEGRAM_STATE_LOCK:
+        if cid in TELEGRAM_CHAT_IDS:
+            return cid
         TELEGRAM_CHAT_IDS.add(cid)
-        os.environ[CONFIG["telegram"]["chat_ids_env"]] = ",".join(sorted(TELEGRAM_CHAT_IDS))
-        log_event("telegram.chat_registered", chat_id=cid)
+        _invalidate_chat_ids_cache()
+    _schedule_chat_ids_persist()
+    log_event("telegram.chat_registered", chat_id=cid)
     return cid
 
 
+def register_telegram_chats(chat_ids: Iterable[str]) -> None:
+    """Registra varios chats con una sola toma del lock y un solo persist."""
+    with TELEGRAM_STATE_LOCK:
+        new_ids = set(chat_ids) - TELEGRAM_CHAT_IDS
+        TELEGRAM_CHAT_IDS.update(new_ids)
+        if new_ids:
+            _invalidate_chat_ids_cache()
+    if not new_ids:
+        return
+    _schedule_chat_ids_persist()
+    for cid in sorted(new_ids):
+        log_event("telegram.chat_registered", chat_id=cid)
+
+
 def get_registered_chat_ids() -> List[str]:
-    return sorted(TELEGRAM_CHAT_IDS)
+    global TELEGRAM_CHAT_IDS_SORTED_CACHE
+    with TELEGRAM_STATE_LOCK:
+        cached = TELEGRAM_CHAT_IDS_SORTED_CACHE
+        if cached is None or cached[0] != id(TELEGRAM_CHAT_IDS):
+            cached = (id(TELEGRAM_CHAT_IDS), tuple(sorted(TELEGRAM_CHAT_IDS)))
+            TELEGRAM_CHAT_IDS_SORTED_CACHE = cached
+    return list(cached[1])
+
+
+def count_registered_chats() -> int:
+    with TELEGRAM_STATE_LOCK:
+        return len(TELEGRAM_CHAT_IDS)
 
 
 def is_admin_chat(chat_id: str) -> bool:
@@ -2911,6 +3626,31 @@ def ensure_admin(chat_id: str, enabled: bool) -> bool:
     return False
 
 
+def _is_telegram_parse_error(response: requests.Response) -> bool:
+    try:
+        description = str(response.text or "").lower()
+    except Exception:
+        return False
+    return "can't parse entities" in description or "can't find end" in description
+
+
+# Ante un 429 se respeta `parameters.retry_after` unas pocas veces antes de
+# dar el envío por fallido.
+TELEGRAM_SEND_MAX_429_RETRIES = 2
+TELEGRAM_SEND_MAX_RETRY_AFTER_SECONDS = 30.0
+
+
+def _telegram_retry_after(response: requests.Response) -> Optional[float]:
+    if response.status_code != 429:
+        return None
+    try:
+        payload = loads_json_bytes(response.content)
+        retry_after = float(payload["parameters"]["retry_after"])
+    except Exception:
+        return 1.0
+    return min(max(retry_after, 0.0), TELEGRAM_SEND_MAX_RETRY_AFTER_SECONDS)
+
+
 def tg_send_message(
     text: str,
     *,
@@ -2919,6 +3659,8 @@ def tg_send_message(
     preview: Optional[str] = None,
     reply_markup: Optional[Dict[str, Any]] = None,
 ) -> None:
+    global LAST_TELEGRAM_SEND_TS
+
     effective_preview = preview or (text if len(text) <= 400 else text[:400] + "…")
     if not enabled:
         log_event("telegram.send.skip", reason="disabled", preview=effective_preview)
@@ -2939,13 +3681,38 @@ def tg_send_message(
         log_event("telegram.send.skip", reason="no_targets", preview=effective_preview)
         return
 
-    base = f"https://api.telegram.org/bot{token}/sendMessage"
-    for cid in targets:
+    base = tg_method_url(token, "sendMessage")
+    encoded_markup = json.dumps(reply_markup) if reply_markup is not None else None
+
+    # Si Telegram rechaza el Markdown (p. ej. un "_" suelto en un par o venue)
+    # se reintenta una vez en texto plano, y el resto de los chats del mismo
+    # broadcast ya se envían sin parse_mode.
+    markdown_rejected = threading.Event()
+
+    def _send_one(cid: str) -> Optional[Dict[str, Any]]:
+        """Devuelve None si el envío fue exitoso, o el detalle del error."""
+        TELEGRAM_SEND_BUCKET.acquire()
         try:
-            payload = {"chat_id": cid, "text": text, "parse_mode": "Markdown"}
-            if reply_markup is not None:
-                payload["reply_markup"] = json.dumps(reply_markup)
-            r = requests.post(base, data=payload, timeout=8)
+            payload = {"chat_id": cid, "text": text}
+            if not markdown_rejected.is_set():
+                payload["parse_mode"] = "Markdown"
+            if encoded_markup is not None:
+                payload["reply_markup"] = encoded_markup
+            r = TELEGRAM_SESSION.post(base, data=payload, timeout=8)
+            if r.status_code == 400 and "parse_mode" in payload and _is_telegram_parse_error(r):
+                markdown_rejected.set()
+                log_event("telegram.send.markdown_fallback", chat_id=cid)
+                payload.pop("parse_mode", None)
+                TELEGRAM_SEND_BUCKET.acquire()
+                r = TELEGRAM_SESSION.post(base, data=payload, timeout=8)
+            for _ in range(TELEGRAM_SEND_MAX_429_RETRIES):
+                retry_after = _telegram_retry_after(r)
+                if retry_after is None:
+                    break
+                log_event("telegram.send.rate_limited", chat_id=cid, retry_after=retry_after)
+                time.sleep(retry_after)
+                TELEGRAM_SEND_BUCKET.acquire()
+                r = TELEGRAM_SESSION.post(base, data=payload, timeout=8)
             if r.status_code != 200:
                 log_event(
                     "telegram.send.error",
@@ -2953,11 +3720,25 @@ def tg_send_message(
                     status=r.status_code,
                     response=r.text[:200],
                 )
-            else:
-                log_event("telegram.send.success", chat_id=cid)
-                LAST_TELEGRAM_SEND_TS = time.time()
+                return {"chat_id": cid, "status": r.status_code, "error": r.text[:200]}
+            log_event("telegram.send.success", chat_id=cid)
+            return None
         except Exception as e:
             log_event("telegram.send.exception", chat_id=cid, error=str(e))
+            return {"chat_id": cid, "status": None, "error": str(e)}
+
+    # Con varios chats el broadcast va en paralelo (acotado por el bucket
+    # global), así un chat lento no bloquea al resto.
+    if len(targets) == 1:
+        results = [_send_one(targets[0])]
+    else:
+        results = list(get_telegram_send_pool().map(_send_one, targets))
+    now = time.time()
+    errors = [dict(result, ts=now) for result in results if result is not None]
+    with TELEGRAM_SEND_STATS_LOCK:
+        if len(errors) < len(results):
+            LAST_TELEGRAM_SEND_TS = now
+        TELEGRAM_SEND_ERRORS.extend(errors)
 
 
 def tg_api_request(
@@ -2970,23 +3751,34 @@ def tg_api_request(
     if not token:
         raise HttpError("Falta TG_BOT_TOKEN")
 
-    url = f"https://api.telegram.org/bot{token}/{method}"
+    url = tg_method_url(token, method)
     timeout_seconds = TELEGRAM_API_DEFAULT_TIMEOUT_SECONDS if request_timeout is None else request_timeout
-    try:
-        if http_method.lower() == "post":
-            r = requests.post(url, data=params or {}, timeout=timeout_seconds)
-        else:
-            r = requests.get(url, params=params or {}, timeout=timeout_seconds)
-    except requests.exceptions.Timeout as e:
-        raise HttpError(f"Timeout al invocar {method}: {e}", is_timeout=True) from e
-    except Exception as e:
-        raise HttpError(f"Error al invocar {method}: {e}") from e
+    session = TELEGRAM_POLL_SESSION if method == "getUpdates" else TELEGRAM_SESSION
+    for attempt in range(2):
+        try:
+            if http_method.lower() == "post":
+                r = session.post(url, data=params or {}, timeout=timeout_seconds)
+            else:
+                r = session.get(url, params=params or {}, timeout=timeout_seconds)
+        except requests.exceptions.Timeout as e:
+            raise HttpError(f"Timeout al invocar {method}: {e}", is_timeout=True) from e
+        except Exception as e:
+            raise HttpError(f"Error al invocar {method}: {e}") from e
+        retry_after = _telegram_retry_after(r)
+        if retry_after is None or attempt:
+            break
+        # Un único reintento tras el retry_after que indica Telegram.
+        log_event("telegram.api.rate_limited", method=method, retry_after=retry_after)
+        time.sleep(retry_after + 0.25)
 
     if r.status_code != 200:
         raise HttpError(f"HTTP {r.status_code} -> {r.text}", status_code=r.status_code)
 
-    data = r.json()
-    if not data.get("ok"):
+    try:
+        data = loads_json_bytes(r.content)
+    except ValueError as e:
+        raise HttpError(f"JSON inválido en {method}: {e}") from e
+    if not isinstance(data, dict) or not data.get("ok"):
         raise HttpError(f"Respuesta no OK en {method}: {data}")
     return data
 
@@ -3019,7 +3811,13 @@ def tg_handle_pending_input(chat_id: str, text: str, enabled: bool) -> bool:
 
     if action == "addpair":
         pair = value
-        if pair in CONFIG["pairs"]:
+        with CONFIG_LOCK:
+            already_present = pair in CONFIG["pairs"]
+            if not already_present:
+                # Copy-on-write: quien esté iterando la lista anterior no la ve mutar.
+                CONFIG["pairs"] = list(CONFIG["pairs"]) + [pair]
+                persist_runtime_config()
+        if already_present:
             tg_send_message(
                 (
                     f"{pair} ya está configurado. Ingresá otra cripto o "
@@ -3029,9 +3827,6 @@ def tg_handle_pending_input(chat_id: str, text: str, enabled: bool) -> bool:
                 chat_id=chat_id,
             )
             return True
-        with CONFIG_LOCK:
-            CONFIG["pairs"].append(pair)
-            persist_runtime_config()
         refresh_config_snapshot()
         set_pending_action(chat_id, None)
         tg_send_message(
@@ -3049,7 +3844,12 @@ def tg_handle_pending_input(chat_id: str, text: str, enabled: bool) -> bool:
                 candidates = [p for p in CONFIG["pairs"] if p.startswith(f"{base}/")]
                 if len(candidates) == 1:
                     target = candidates[0]
-        if target not in CONFIG["pairs"]:
+        with CONFIG_LOCK:
+            present = target in CONFIG["pairs"]
+            if present:
+                CONFIG["pairs"] = [p for p in CONFIG["pairs"] if p != target]
+                persist_runtime_config()
+        if not present:
             tg_send_message(
                 (
                     f"{target} no figura en la lista. Elegí otro de los botones "
@@ -3059,9 +3859,6 @@ def tg_handle_pending_input(chat_id: str, text: str, enabled: bool) -> bool:
                 chat_id=chat_id,
             )
             return True
-        with CONFIG_LOCK:
-            CONFIG["pairs"] = [p for p in CONFIG["pairs"] if p != target]
-            persist_runtime_config()
         refresh_config_snapshot()
         set_pending_action(chat_id, None)
         tg_send_message(
@@ -3194,193 +3991,203 @@ def settle_signal_result(payload: Dict[str, Any], settled_by: str = "manual") ->
     )
 
 
-def tg_handle_command(command: str, argument: str, chat_id: str, enabled: bool) -> None:
-    global DYNAMIC_THRESHOLD_PERCENT
-    command = command.lower()
-    register_telegram_chat(chat_id)
+def _threshold_snapshot() -> Tuple[float, float]:
+    """Umbral base y dinámico leídos una vez (el scanner los ajusta en paralelo)."""
+    return float(CONFIG.get("threshold_percent", 0.0)), float(DYNAMIC_THRESHOLD_PERCENT)
 
-    if command == "/start":
-        response = (
-            "Hola! Ya estás registrado para recibir señales.\n"
-            f"Threshold base: {CONFIG['threshold_percent']:.3f}% | dinámico: {DYNAMIC_THRESHOLD_PERCENT:.3f}%\n"
-            f"{format_command_help()}"
-        )
-        tg_send_message(
-            response,
-            enabled=enabled,
-            chat_id=chat_id,
-            reply_markup=tg_commands_reply_markup(),
-        )
-        return
 
-    if command == "/ping":
-        tg_send_message("pong", enabled=enabled, chat_id=chat_id)
-        return
+def _tg_cmd_start(argument: str, chat_id: str, enabled: bool) -> None:
+    base_threshold, dynamic_threshold = _threshold_snapshot()
+    response = (
+        "Hola! Ya estás registrado para recibir señales.\n"
+        f"Threshold base: {base_threshold:.3f}% | dinámico: {dynamic_threshold:.3f}%\n"
+        f"{format_command_help()}"
+    )
+    tg_send_message(
+        response,
+        enabled=enabled,
+        chat_id=chat_id,
+        reply_markup=tg_commands_reply_markup(),
+    )
 
-    if command == "/status":
-        pairs = CONFIG["pairs"]
-        analysis_summary = "Sin historial"
-        if LATEST_ANALYSIS and LATEST_ANALYSIS.rows_considered:
-            analysis_summary = (
-                f"SR: {LATEST_ANALYSIS.success_rate*100:.1f}%"
-                f" ({LATEST_ANALYSIS.rows_considered} señales)"
-            )
-        response = (
-            "Estado actual:\n"
-            f"Umbral mínimo de ganancia: {format_decimal_comma(CONFIG['threshold_percent'], decimals=2)}% en adelante\n"
-            f"Threshold dinámico actual: {DYNAMIC_THRESHOLD_PERCENT:.3f}%\n"
-            f"Histórico: {analysis_summary}\n"
-            f"Pares ({len(pairs)}): {', '.join(pairs) if pairs else 'sin pares'}"
+
+def _tg_cmd_ping(argument: str, chat_id: str, enabled: bool) -> None:
+    tg_send_message("pong", enabled=enabled, chat_id=chat_id)
+
+
+def _tg_cmd_status(argument: str, chat_id: str, enabled: bool) -> None:
+    pairs = CONFIG["pairs"]
+    base_threshold, dynamic_threshold = _threshold_snapshot()
+    analysis = LATEST_ANALYSIS
+    analysis_summary = "Sin historial"
+    if analysis and analysis.rows_considered:
+        analysis_summary = (
+            f"SR: {analysis.success_rate*100:.1f}%"
+            f" ({analysis.rows_considered} señales)"
         )
-        tg_send_message(response, enabled=enabled, chat_id=chat_id)
-        return
+    response = (
+        "Estado actual:\n"
+        f"Umbral mínimo de ganancia: {format_decimal_comma(base_threshold, decimals=2)}% en adelante\n"
+        f"Threshold dinámico actual: {dynamic_threshold:.3f}%\n"
+        f"Histórico: {analysis_summary}\n"
+        f"Pares ({len(pairs)}): {', '.join(pairs) if pairs else 'sin pares'}"
+    )
+    paused = circuit_snapshot()
+    if paused:
+        paused_text = ", ".join(
+            f"{venue} ({int(info['remaining_seconds'])}s)" for venue, info in sorted(paused.items())
+        )
+        response += f"\nVenues en pausa por errores: {paused_text}"
+    tg_send_message(response, enabled=enabled, chat_id=chat_id)
 
-    if command == "/capital":
-        if not argument:
-            capital = float(CONFIG.get("simulation_capital_quote", 0.0))
-            tg_send_message(
-                f"Capital simulado actual: {format_decimal_comma(capital, decimals=2)} USDT",
-                enabled=enabled,
-                chat_id=chat_id,
-            )
-            return
-        if not ensure_admin(chat_id, enabled):
-            return
-        cleaned = argument.lower().replace("usdt", "").strip()
-        cleaned = cleaned.replace(" ", "")
-        if "," in cleaned and "." in cleaned:
-            cleaned = cleaned.replace(",", "")
-        elif cleaned.count(",") == 1 and cleaned.count(".") == 0:
-            cleaned = cleaned.replace(",", ".")
-        try:
-            value = float(cleaned)
-        except ValueError:
-            tg_send_message(
-                "Valor inválido. Ej: /capital 2500 o /capital 2.500,50",
-                enabled=enabled,
-                chat_id=chat_id,
-            )
-            return
-        if value <= 0:
-            tg_send_message(
-                "El capital debe ser mayor a 0.",
-                enabled=enabled,
-                chat_id=chat_id,
-            )
-            return
-        with CONFIG_LOCK:
-            CONFIG["simulation_capital_quote"] = value
-            persist_runtime_config()
-        refresh_config_snapshot()
+
+def _tg_cmd_capital(argument: str, chat_id: str, enabled: bool) -> None:
+    if not argument:
+        capital = float(CONFIG.get("simulation_capital_quote", 0.0))
         tg_send_message(
-            (
-                "Nuevo capital simulado guardado: "
-                f"{format_decimal_comma(value, decimals=2)} USDT"
-            ),
+            f"Capital simulado actual: {format_decimal_comma(capital, decimals=2)} USDT",
             enabled=enabled,
             chat_id=chat_id,
         )
         return
-
-    if command in ("/pairs", "/listapares"):
-        pairs = CONFIG["pairs"]
-        if not pairs:
-            tg_send_message("No hay pares configurados.", enabled=enabled, chat_id=chat_id)
-        else:
-            formatted = "\n".join(f"- {p}" for p in pairs)
-            tg_send_message(f"Pares actuales:\n{formatted}", enabled=enabled, chat_id=chat_id)
+    if not ensure_admin(chat_id, enabled):
         return
-
-    if command in ("/addpair", "/adherirpar"):
-        if not ensure_admin(chat_id, enabled):
-            return
-        set_pending_action(chat_id, "addpair")
-        default_quote = DEFAULT_QUOTE_ASSET
-        prompt = (
-            "Ingresá la cripto que querés adherir."
-            f" Se agregará como BASE/{default_quote}."
+    cleaned = argument.lower().replace("usdt", "").strip()
+    cleaned = cleaned.replace(" ", "")
+    if "," in cleaned and "." in cleaned:
+        cleaned = cleaned.replace(",", "")
+    elif cleaned.count(",") == 1 and cleaned.count(".") == 0:
+        cleaned = cleaned.replace(",", ".")
+    try:
+        value = float(cleaned)
+    except ValueError:
+        tg_send_message(
+            "Valor inválido. Ej: /capital 2500 o /capital 2.500,50",
+            enabled=enabled,
+            chat_id=chat_id,
         )
-        tg_send_message(prompt, enabled=enabled, chat_id=chat_id)
         return
-
-    if command in ("/delpair", "/eliminarpar"):
-        if not ensure_admin(chat_id, enabled):
-            return
-        pairs = CONFIG["pairs"]
-        if not pairs:
-            tg_send_message("No hay pares configurados para eliminar.", enabled=enabled, chat_id=chat_id)
-            return
-        set_pending_action(chat_id, "delpair")
-        keyboard = build_pairs_reply_keyboard(pairs)
+    if value <= 0:
         tg_send_message(
-            (
-                "Elegí el par a eliminar desde los botones o ingresá "
-                "manual la cripto/par a remover."
-            ),
+            "El capital debe ser mayor a 0.",
             enabled=enabled,
             chat_id=chat_id,
-            reply_markup=keyboard,
         )
         return
+    with CONFIG_LOCK:
+        CONFIG["simulation_capital_quote"] = value
+        persist_runtime_config()
+    refresh_config_snapshot()
+    tg_send_message(
+        (
+            "Nuevo capital simulado guardado: "
+            f"{format_decimal_comma(value, decimals=2)} USDT"
+        ),
+        enabled=enabled,
+        chat_id=chat_id,
+    )
 
-    if command in ("/test", "/senalprueba"):
-        link_items = build_trade_link_items("binance", "bybit", "BTC/USDT")
-        test_items: List[Dict[str, str]] = []
-        for item in link_items:
-            if item.get("device") != "desktop":
-                continue
-            side = str(item.get("side", "")).lower()
-            venue = format_venue_label(str(item.get("venue", ""))).title()
-            url = str(item.get("url", "")).strip()
-            if side == "buy" and url:
-                test_items.append({"label": f"Comprar en {venue}", "url": url})
-            if side == "sell" and url:
-                test_items.append({"label": f"Vender en {venue}", "url": url})
-        reply_markup = tg_inline_keyboard_from_link_items(test_items)
-        message = build_test_signal_message()
-        if test_items:
-            labels = " · ".join(item.get("label", "") for item in test_items if item.get("label"))
-            if labels:
-                message = f"{message}\n\n*Acciones rápidas:* {labels}"
+
+def _tg_cmd_pairs(argument: str, chat_id: str, enabled: bool) -> None:
+    pairs = CONFIG["pairs"]
+    if not pairs:
+        tg_send_message("No hay pares configurados.", enabled=enabled, chat_id=chat_id)
+    else:
+        formatted = "\n".join(f"- {p}" for p in pairs)
+        tg_send_message(f"Pares actuales:\n{formatted}", enabled=enabled, chat_id=chat_id)
+
+
+def _tg_cmd_addpair(argument: str, chat_id: str, enabled: bool) -> None:
+    if not ensure_admin(chat_id, enabled):
+        return
+    set_pending_action(chat_id, "addpair")
+    default_quote = DEFAULT_QUOTE_ASSET
+    prompt = (
+        "Ingresá la cripto que querés adherir."
+        f" Se agregará como BASE/{default_quote}."
+    )
+    tg_send_message(prompt, enabled=enabled, chat_id=chat_id)
+
+
+def _tg_cmd_delpair(argument: str, chat_id: str, enabled: bool) -> None:
+    if not ensure_admin(chat_id, enabled):
+        return
+    pairs = CONFIG["pairs"]
+    if not pairs:
+        tg_send_message("No hay pares configurados para eliminar.", enabled=enabled, chat_id=chat_id)
+        return
+    set_pending_action(chat_id, "delpair")
+    keyboard = build_pairs_reply_keyboard(pairs)
+    tg_send_message(
+        (
+            "Elegí el par a eliminar desde los botones o ingresá "
+            "manual la cripto/par a remover."
+        ),
+        enabled=enabled,
+        chat_id=chat_id,
+        reply_markup=keyboard,
+    )
+
+
+def _tg_cmd_test(argument: str, chat_id: str, enabled: bool) -> None:
+    link_items = build_trade_link_items("binance", "bybit", "BTC/USDT")
+    test_items: List[Dict[str, str]] = []
+    for item in link_items:
+        if item.get("device") != "desktop":
+            continue
+        side = str(item.get("side", "")).lower()
+        venue = format_venue_label(str(item.get("venue", ""))).title()
+        url = str(item.get("url", "")).strip()
+        if side == "buy" and url:
+            test_items.append({"label": f"Comprar en {venue}", "url": url})
+        if side == "sell" and url:
+            test_items.append({"label": f"Vender en {venue}", "url": url})
+    reply_markup = tg_inline_keyboard_from_link_items(test_items)
+    message = build_test_signal_message()
+    if test_items:
+        labels = " · ".join(item.get("label", "") for item in test_items if item.get("label"))
+        if labels:
+            message = f"{message}\n\n*Acciones rápidas:* {labels}"
+    tg_send_message(
+        message,
+        enabled=enabled,
+        chat_id=chat_id,
+        reply_markup=reply_markup,
+    )
+
+
+def _tg_cmd_settle(argument: str, chat_id: str, enabled: bool) -> None:
+    if not ensure_admin(chat_id, enabled):
+        return
+    parsed = parse_manual_settlement(argument)
+    if not parsed:
         tg_send_message(
-            message,
+            "Uso: /settle <signal_id> <gano|perdio> <pnl_real> [motivo]",
             enabled=enabled,
             chat_id=chat_id,
-            reply_markup=reply_markup,
         )
         return
-
-    if command == "/settle":
-        if not ensure_admin(chat_id, enabled):
-            return
-        parsed = parse_manual_settlement(argument)
-        if not parsed:
-            tg_send_message(
-                "Uso: /settle <signal_id> <gano|perdio> <pnl_real> [motivo]",
-                enabled=enabled,
-                chat_id=chat_id,
+    ok, message = settle_signal_result(parsed, settled_by=f"telegram:{chat_id}")
+    tg_send_message(message, enabled=enabled, chat_id=chat_id)
+
+
+def _tg_cmd_ranking(argument: str, chat_id: str, enabled: bool) -> None:
+    rankings = compute_reliability_rankings(limit=3)
+    lines = ["🏆 Ranking de confiabilidad"]
+    for kind, title in (("strategy", "Estrategia"), ("pair", "Par"), ("venue", "Venue")):
+        lines.append(f"\n*{title}:*")
+        entries = rankings.get(kind, [])
+        if not entries:
+            lines.append("- Sin datos")
+            continue
+        for item in entries:
+            lines.append(
+                f"- `{item['key']}` | win={item['win_rate']*100:.1f}% | n={item['trades']} | Δ%={item['avg_delta_percent']:.2f}"
             )
-            return
-        ok, message = settle_signal_result(parsed, settled_by=f"telegram:{chat_id}")
-        tg_send_message(message, enabled=enabled, chat_id=chat_id)
-        return
+    tg_send_message("\n".join(lines), enabled=enabled, chat_id=chat_id)
 
-    if command == "/ranking":
-        rankings = compute_reliability_rankings(limit=3)
-        lines = ["🏆 Ranking de confiabilidad"]
-        for kind, title in (("strategy", "Estrategia"), ("pair", "Par"), ("venue", "Venue")):
-            lines.append(f"\n*{title}:*")
-            entries = rankings.get(kind, [])
-            if not entries:
-                lines.append("- Sin datos")
-                continue
-            for item in entries:
-                lines.append(
-                    f"- `{item['key']}` | win={item['win_rate']*100:.1f}% | n={item['trades']} | Δ%={item['avg_delta_percent']:.2f}"
-                )
-        tg_send_message("\n".join(lines), enabled=enabled, chat_id=chat_id)
-        return
 
+def _tg_cmd_unknown(argument: str, chat_id: str, enabled: bool) -> None:
     tg_send_message(
         "Comando no reconocido. Usá el botón de menú para ver las opciones disponibles.",
         enabled=enabled,
@@ -3388,6 +4195,33 @@ def tg_handle_command(command: str, argument: str, chat_id: str, enabled: bool)
     )
 
 
+# Tabla de despacho: lookup O(1) en lugar de la cadena de if por comando.
+COMMAND_HANDLERS: Dict[str, Callable[[str, str, bool], None]] = {
+    "/start": _tg_cmd_start,
+    "/ping": _tg_cmd_ping,
+    "/status": _tg_cmd_status,
+    "/capital": _tg_cmd_capital,
+    "/pairs": _tg_cmd_pairs,
+    "/listapares": _tg_cmd_pairs,
+    "/addpair": _tg_cmd_addpair,
+    "/adherirpar": _tg_cmd_addpair,
+    "/delpair": _tg_cmd_delpair,
+    "/eliminarpar": _tg_cmd_delpair,
+    "/test": _tg_cmd_test,
+    "/senalprueba": _tg_cmd_test,
+    "/settle": _tg_cmd_settle,
+    "/ranking": _tg_cmd_ranking,
+}
+
+
+def tg_handle_command(command: str, argument: str, chat_id: str, enabled: bool) -> None:
+    # En grupos Telegram envía "/status@NombreBot": la mención no forma parte
+    # de la clave de despacho.
+    command = command.partition("@")[0].lower()
+    register_telegram_chat(chat_id)
+    COMMAND_HANDLERS.get(command, _tg_cmd_unknown)(argument, chat_id, enabled)
+
+
 def _reset_telegram_webhook_after_conflict(now: Optional[float] = None) -> None:
     """Intenta limpiar un webhook residual que impide la lectura por getUpdates."""
 
@@ -3416,22 +4250,60 @@ def _reset_telegram_webhook_after_conflict(now: Optional[float] = None) -> None:
         log_event("telegram.poll.reset_webhook.success")
 
 
-def tg_process_updates(enabled: bool = True) -> None:
+def _tg_handle_chat_texts(chat_id: str, texts: List[str], enabled: bool) -> None:
+    """Procesa en orden los textos de un mismo chat."""
+    for text in texts:
+        try:
+            if text.startswith("/"):
+                set_pending_action(chat_id, None)
+                parts = text.split(maxsplit=1)
+                command = parts[0]
+                argument = parts[1] if len(parts) > 1 else ""
+                tg_handle_command(command, argument, chat_id, enabled)
+                continue
+            tg_handle_pending_input(chat_id, text, enabled)
+        except Exception as exc:
+            log_event("telegram.command.error", chat_id=chat_id, error=str(exc))
+
+
+# Evita dos getUpdates simultáneos en el mismo proceso (p. ej. el hilo de
+# polling y un llamado manual): Telegram devolvería el mismo lote dos veces.
+TELEGRAM_POLL_LOCK = threading.Lock()
+
+
+def tg_process_updates(enabled: bool = True) -> bool:
+    """Procesa un ciclo de getUpdates (long polling).
+
+    Devuelve True si la llamada llegó a bloquear en el servidor (con o sin
+    updates), de modo que el hilo de polling puede reintentar sin dormir.
+    """
+    if not TELEGRAM_POLL_LOCK.acquire(blocking=False):
+        log_event("telegram.poll.skip", reason="in_flight")
+        return False
+    try:
+        return _tg_process_updates_locked(enabled)
+    finally:
+        TELEGRAM_POLL_LOCK.release()
+
+
+def _tg_process_updates_locked(enabled: bool) -> bool:
     global TELEGRAM_LAST_UPDATE_ID, TELEGRAM_POLL_BACKOFF_UNTIL, TELEGRAM_POLL_HEARTBEAT_TS
 
     if not get_bot_token():
-        return
+        return False
 
     if TELEGRAM_POLL_BACKOFF_UNTIL:
         now = time.monotonic()
         if now < TELEGRAM_POLL_BACKOFF_UNTIL:
-            return
+            return False
         TELEGRAM_POLL_BACKOFF_UNTIL = 0.0
 
-    params: Dict[str, int] = {}
+    params: Dict[str, Any] = {}
     if TELEGRAM_LAST_UPDATE_ID:
         params["offset"] = TELEGRAM_LAST_UPDATE_ID + 1
     params["timeout"] = TELEGRAM_POLL_TIMEOUT_SECONDS
+    params["limit"] = TELEGRAM_POLL_LIMIT
+    params["allowed_updates"] = TELEGRAM_POLL_ALLOWED_UPDATES
     poll_request_timeout = max(
         TELEGRAM_API_DEFAULT_TIMEOUT_SECONDS,
         params["timeout"] + TELEGRAM_POLL_HTTP_TIMEOUT_GRACE_SECONDS,
@@ -3451,7 +4323,8 @@ def tg_process_updates(enabled: bool = True) -> None:
                 polling_timeout_seconds=params["timeout"],
                 request_timeout_seconds=poll_request_timeout,
             )
-        elif getattr(e, "status_code", None) == 409:
+            return True
+        if getattr(e, "status_code", None) == 409:
             TELEGRAM_POLL_BACKOFF_UNTIL = time.monotonic() + TELEGRAM_POLL_CONFLICT_BACKOFF_SECONDS
             log_event(
                 "telegram.poll.conflict",
@@ -3461,38 +4334,73 @@ def tg_process_updates(enabled: bool = True) -> None:
             _reset_telegram_webhook_after_conflict()
         else:
             log_event("telegram.poll.error", error=str(e))
-        return
+        return False
     except Exception as e:
         log_event("telegram.poll.error", error=str(e))
-        return
+        return False
 
     TELEGRAM_POLL_HEARTBEAT_TS = time.monotonic()
 
+    # Agrupamos por chat: cada chat conserva su orden, pero un handler lento
+    # en un chat no demora los comandos de los demás.
+    by_chat: Dict[str, List[str]] = {}
+    seen_chats: Set[str] = set()
+    batch_max_update_id = 0
     for update in data.get("result", []):
         update_id = update.get("update_id")
-        if isinstance(update_id, int):
-            TELEGRAM_LAST_UPDATE_ID = max(TELEGRAM_LAST_UPDATE_ID, update_id)
+        if isinstance(update_id, int) and update_id > batch_max_update_id:
+            batch_max_update_id = update_id
         message = update.get("message") or update.get("channel_post")
         if not message:
             continue
         chat = message.get("chat") or {}
         chat_id = chat.get("id")
-        text = (message.get("text") or "").strip()
-        if not chat_id or not text:
+        raw_text = message.get("text")
+        if not chat_id or not raw_text:
             continue
-
-        chat_id_str = register_telegram_chat(chat_id)
-        if text.startswith("/"):
-            set_pending_action(chat_id_str, None)
-            parts = text.split(maxsplit=1)
-            command = parts[0]
-            argument = parts[1] if len(parts) > 1 else ""
-            tg_handle_command(command, argument, chat_id_str, enabled)
+        text = raw_text if raw_text[0] == "/" else raw_text.strip()
+        if not text:
             continue
 
-        if tg_handle_pending_input(chat_id_str, text, enabled):
+        chat_id_str = str(chat_id)
+        seen_chats.add(chat_id_str)
+        # El texto libre solo importa si el chat espera un valor (acción
+        # pendiente, o un comando previo de este mismo lote que la abra); el
+        # resto es charla del grupo y no se despacha.
+        if text[0] != "/" and chat_id_str not in by_chat and not get_pending_action(chat_id_str):
             continue
+        by_chat.setdefault(chat_id_str, []).append(text)
+
+    if seen_chats:
+        register_telegram_chats(seen_chats)
+
+    advanced_offset = False
+    if batch_max_update_id:
+        with TELEGRAM_STATE_LOCK:
+            if batch_max_update_id > TELEGRAM_LAST_UPDATE_ID:
+                TELEGRAM_LAST_UPDATE_ID = batch_max_update_id
+                advanced_offset = True
+
+    if len(by_chat) == 1:
+        chat_id_str, texts = next(iter(by_chat.items()))
+        _tg_handle_chat_texts(chat_id_str, texts, enabled)
+    elif by_chat:
+        pool = get_telegram_command_pool()
+        futures = [
+            pool.submit(_tg_handle_chat_texts, chat_id_str, texts, enabled)
+            for chat_id_str, texts in by_chat.items()
+        ]
+        # Esperamos al lote completo para que el próximo poll no intercale
+        # comandos de un chat que todavía se está procesando.
+        for future in futures:
+            future.result()
 
+    # Se persiste después de atender el lote: ante un corte a mitad de lote
+    # se prefiere reprocesar a perder comandos.
+    if advanced_offset:
+        persist_telegram_offset(batch_max_update_id)
+
+    return True
 
 
 def ensure_telegram_polling_thread(enabled: bool, interval: float = 0.2) -> None:
@@ -3505,13 +4413,31 @@ def ensure_telegram_polling_thread(enabled: bool, interval: float = 0.2) -> None
     if TELEGRAM_POLLING_THREAD and TELEGRAM_POLLING_THREAD.is_alive():
         return
 
+    TELEGRAM_POLL_STOP.clear()
+
     def _loop():
-        while True:
+        base_delay = max(0.5, interval)
+        delay = base_delay
+        while not TELEGRAM_POLL_STOP.is_set():
+            polled = False
             try:
-                tg_process_updates(enabled=True)
+                polled = tg_process_updates(enabled=True)
             except Exception as exc:  # pragma: no cover - logging only
                 log_event("telegram.poll.exception", error=str(exc))
-            time.sleep(max(0.5, interval))
+            # getUpdates ya espera del lado del servidor: tras un long poll se
+            # vuelve a llamar enseguida. Ante errores se espera con backoff
+            # exponencial, interrumpible por stop_telegram_polling_thread().
+            if polled:
+                delay = base_delay
+                continue
+            # Durante el backoff por 409 no tiene sentido despertar antes:
+            # tg_process_updates volvería sin consultar a Telegram.
+            remaining = TELEGRAM_POLL_BACKOFF_UNTIL - time.monotonic() if TELEGRAM_POLL_BACKOFF_UNTIL else 0.0
+            if remaining > delay:
+                TELEGRAM_POLL_STOP.wait(remaining)
+                continue
+            TELEGRAM_POLL_STOP.wait(delay)
+            delay = min(delay * 2, TELEGRAM_POLL_ERROR_BACKOFF_MAX_SECONDS)
 
     TELEGRAM_POLLING_THREAD = threading.Thread(
         target=_loop,
@@ -3521,6 +4447,17 @@ def ensure_telegram_polling_thread(enabled: bool, interval: float = 0.2) -> None
     TELEGRAM_POLLING_THREAD.start()
 
 
+def stop_telegram_polling_thread(timeout: Optional[float] = None) -> None:
+    """Pide al hilo de polling que termine tras el getUpdates en curso."""
+
+    TELEGRAM_POLL_STOP.set()
+    thread = TELEGRAM_POLLING_THREAD
+    if thread and thread.is_alive() and timeout:
+        thread.join(timeout)
+    if TELEGRAM_CHAT_IDS_PERSIST_TIMER is not None:
+        flush_telegram_chat_ids()
+
+
 def _env_flag(name: str, default: bool = False) -> bool:
     raw_value = os.getenv(name)
     if raw_value is None:
@@ -3558,10 +4495,13 @@ def ensure_keepalive_thread() -> None:
     interval_seconds = max(60, int(os.getenv("KEEPALIVE_INTERVAL_SECONDS", "240") or "240"))
     timeout_seconds = max(2, int(os.getenv("KEEPALIVE_TIMEOUT_SECONDS", "8") or "8"))
 
+    # Sesión propia: el ping reutiliza la conexión TLS entre intervalos.
+    session = build_http_session(pool_connections=1, pool_maxsize=1)
+
     def _loop() -> None:
         while True:
             try:
-                response = requests.get(
+                response = session.get(
                     keepalive_url,
                     timeout=timeout_seconds,
                     headers={"User-Agent": "arbitrage-telebot-keepalive/1.0"},
@@ -3587,7 +4527,7 @@ def ensure_keepalive_thread() -> None:
 # =========================
 # Modelo y Fees
 # =========================
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class Quote:
     symbol: str
     bid: float
@@ -3598,7 +4538,7 @@ class Quote:
     source: str = ""
     metadata: Dict[str, Any] = field(default_factory=dict)
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class FeeSchedule:
     taker_fee_percent: float = 0.10
     maker_fee_percent: float = 0.0
@@ -3623,7 +4563,7 @@ class FeeSchedule:
         )
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class VenueFees:
     venue: str
     default: FeeSchedule
@@ -3632,6 +4572,11 @@ class VenueFees:
     vip_multipliers: Dict[str, float] = field(default_factory=dict)
     native_token_discount_percent: float = 0.0
     last_updated: float = field(default_factory=lambda: time.time())
+    # El fee map se reutiliza entre corridas: cada par resuelve su schedule
+    # (VIP, descuento nativo) una sola vez en lugar de una por scan.
+    _schedule_cache: Dict[Tuple[str, str, float], FeeSchedule] = field(
+        default_factory=dict, repr=False, compare=False
+    )
 
     @classmethod
     def from_config(cls, venue: str, cfg: Dict) -> "VenueFees":
@@ -3674,6 +4619,15 @@ class VenueFees:
         return self.vip_multipliers.get("default", 1.0)
 
     def schedule_for_pair(self, pair: str) -> FeeSchedule:
+        cache_key = (pair, self.vip_level, self.native_token_discount_percent)
+        cached = self._schedule_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        resolved = self._resolve_schedule(pair)
+        self._schedule_cache[cache_key] = resolved
+        return resolved
+
+    def _resolve_schedule(self, pair: str) -> FeeSchedule:
         schedule = self.per_pair.get(pair, self.default)
         multiplier = self._vip_multiplier()
         taker = schedule.taker_fee_percent * multiplier
@@ -3691,6 +4645,7 @@ class VenueFees:
 
     def register_pair_fee(self, pair: str, schedule: FeeSchedule) -> None:
         self.per_pair[pair] = schedule
+        self._schedule_cache.clear()
         self.last_updated = time.time()
 
     @property
@@ -3700,7 +4655,7 @@ class VenueFees:
         return float(self.default.taker_fee_percent)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class TransferProfile:
     withdraw_fee: float = 0.0
     withdraw_percent: float = 0.0
@@ -3721,7 +4676,7 @@ class TransferProfile:
         )
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class VenueTransfers:
     assets: Dict[str, TransferProfile] = field(default_factory=dict)
 
@@ -3732,7 +4687,7 @@ class VenueTransfers:
         return self.assets.get(asset)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class TransferEstimate:
     total_cost_quote: float = 0.0
     total_minutes: float = 0.0
@@ -3740,7 +4695,7 @@ class TransferEstimate:
     quote_asset_loss: float = 0.0
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class AccountLimitProfile:
     monthly_fiat_limit: float = 0.0
     daily_payment_method_volume: Dict[str, float] = field(default_factory=dict)
@@ -3761,6 +4716,12 @@ def normalize_account_venue(venue: str) -> str:
     return str(venue or "").strip().lower().replace("_p2p", "")
 
 
+def account_limits_configured() -> bool:
+    """True si algún venue tiene perfil de límites; sin perfiles todo chequeo aprueba."""
+    limits_cfg = CONFIG.get("account_limits", {}) or {}
+    return any((limits_cfg.get("venues", {}) or {}).values())
+
+
 def get_account_limit_profile(venue: str, account: str = "default") -> Optional[AccountLimitProfile]:
     limits_cfg = CONFIG.get("account_limits", {}) or {}
     venues_cfg = limits_cfg.get("venues", {}) or {}
@@ -3784,10 +4745,25 @@ def _account_ledger_path() -> Path:
     return Path(path)
 
 
+# El chequeo de límites corre dos veces por oportunidad candidata: el ledger
+# se mantiene en memoria junto a la firma (mtime_ns, tamaño) del archivo y,
+# mientras no cambie en disco, cada consulta cuesta un stat en vez de
+# leer y parsear el JSON.
+ACCOUNT_LEDGER_CACHE: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+ACCOUNT_LEDGER_LOCK = threading.Lock()
+
+
 def load_account_limit_ledger() -> Dict[str, Any]:
     ledger_path = _account_ledger_path()
-    if not ledger_path.exists():
+    try:
+        stat_result = ledger_path.stat()
+    except OSError:
         return {"accounts": {}}
+    signature = (stat_result.st_mtime_ns, stat_result.st_size)
+    with ACCOUNT_LEDGER_LOCK:
+        cached = ACCOUNT_LEDGER_CACHE.get(str(ledger_path))
+    if cached is not None and cached[0] == signature:
+        return cached[1]
     try:
         data = json.loads(ledger_path.read_text(encoding="utf-8"))
     except Exception:
@@ -3795,6 +4771,8 @@ def load_account_limit_ledger() -> Dict[str, Any]:
     if not isinstance(data, dict):
         return {"accounts": {}}
     data.setdefault("accounts", {})
+    with ACCOUNT_LEDGER_LOCK:
+        ACCOUNT_LEDGER_CACHE[str(ledger_path)] = (signature, data)
     return data
 
 
@@ -3802,6 +4780,12 @@ def save_account_limit_ledger(ledger: Dict[str, Any]) -> None:
     ledger_path = _account_ledger_path()
     ledger_path.parent.mkdir(parents=True, exist_ok=True)
     ledger_path.write_text(json.dumps(ledger, ensure_ascii=False, indent=2, sort_keys=True), encoding="utf-8")
+    stat_result = ledger_path.stat()
+    with ACCOUNT_LEDGER_LOCK:
+        ACCOUNT_LEDGER_CACHE[str(ledger_path)] = (
+            (stat_result.st_mtime_ns, stat_result.st_size),
+            ledger,
+        )
 
 
 def check_account_limit(
@@ -3821,22 +4805,15 @@ def check_account_limit(
     day_key = _utc_day(now)
     method_key = str(payment_method or "SPOT").upper()
 
+    # El ledger puede venir del cache compartido: solo se modifica al consumir.
     ledger = load_account_limit_ledger()
     account_key = f"{normalize_account_venue(venue)}::{account}"
-    account_state = ledger.setdefault("accounts", {}).setdefault(account_key, {})
-
-    current_month = str(account_state.get("monthly_period", ""))
-    if current_month != month_key:
-        account_state["monthly_period"] = month_key
-        account_state["monthly_consumed"] = 0.0
-
-    current_day = str(account_state.get("daily_period", ""))
-    if current_day != day_key:
-        account_state["daily_period"] = day_key
-        account_state["daily_consumed"] = {}
+    account_state = (ledger.get("accounts") or {}).get(account_key) or {}
 
-    monthly_consumed = float(account_state.get("monthly_consumed", 0.0) or 0.0)
-    daily_consumed_map = account_state.setdefault("daily_consumed", {})
+    same_month = str(account_state.get("monthly_period", "")) == month_key
+    same_day = str(account_state.get("daily_period", "")) == day_key
+    monthly_consumed = float(account_state.get("monthly_consumed", 0.0) or 0.0) if same_month else 0.0
+    daily_consumed_map = (account_state.get("daily_consumed") or {}) if same_day else {}
     daily_consumed = float(daily_consumed_map.get(method_key, 0.0) or 0.0)
     last_operation_ts = float(account_state.get("last_operation_ts", 0.0) or 0.0)
 
@@ -3874,8 +4851,11 @@ def check_account_limit(
             }
 
     if consume:
+        account_state = ledger.setdefault("accounts", {}).setdefault(account_key, {})
+        account_state["monthly_period"] = month_key
         account_state["monthly_consumed"] = monthly_consumed + fiat_amount
-        daily_consumed_map[method_key] = daily_consumed + fiat_amount
+        account_state["daily_period"] = day_key
+        account_state["daily_consumed"] = {**daily_consumed_map, method_key: daily_consumed + fiat_amount}
         account_state["last_operation_ts"] = now
         save_account_limit_ledger(ledger)
 
@@ -3973,29 +4953,74 @@ def update_fee_registry(venue_fees: VenueFees, pairs: List[str]) -> None:
             print(f"[FEE] {venue_fees.venue} {pair} taker fee actualizado: {prev_fmt} -> {current:.4f}")
 
 
+FEE_MAP_CACHE: Optional[Tuple[Union[bytes, str], Dict[str, VenueFees]]] = None
+FEE_MAP_CACHE_LOCK = threading.Lock()
+
+
+def _fee_map_cache_key(pairs: List[str]) -> Union[bytes, str]:
+    venues = {
+        vname: {
+            "taker_fee_percent": vcfg.get("taker_fee_percent"),
+            "fees": vcfg.get("fees"),
+        }
+        for vname, vcfg in CONFIG["venues"].items()
+        if vcfg.get("enabled", False)
+    }
+    return dumps_cache_key({"pairs": list(pairs), "venues": venues})
+
+
 def build_fee_map(pairs: List[str]) -> Dict[str, VenueFees]:
-    fee_map: Dict[str, VenueFees] = {}
-    for vname, vcfg in CONFIG["venues"].items():
-        if not vcfg.get("enabled", False):
-            continue
-        venue_fees = VenueFees.from_config(vname, vcfg)
-        fee_map[vname] = venue_fees
-        update_fee_registry(venue_fees, pairs)
-    return fee_map
+    """Construye (o reutiliza) el mapa de fees; se reconstruye solo si cambian pares o fees."""
+
+    global FEE_MAP_CACHE
+    key = _fee_map_cache_key(pairs)
+    with FEE_MAP_CACHE_LOCK:
+        if FEE_MAP_CACHE is not None and FEE_MAP_CACHE[0] == key:
+            return dict(FEE_MAP_CACHE[1])
+        fee_map: Dict[str, VenueFees] = {}
+        for vname, vcfg in CONFIG["venues"].items():
+            if not vcfg.get("enabled", False):
+                continue
+            venue_fees = VenueFees.from_config(vname, vcfg)
+            fee_map[vname] = venue_fees
+            update_fee_registry(venue_fees, pairs)
+        FEE_MAP_CACHE = (key, fee_map)
+        return dict(fee_map)
+
+
+TRANSFER_PROFILES_CACHE: Optional[Tuple[Union[bytes, str], Dict[str, VenueTransfers]]] = None
+TRANSFER_PROFILES_CACHE_LOCK = threading.Lock()
+
+
+def _transfer_profiles_cache_key() -> Union[bytes, str]:
+    transfers = {
+        vname: vcfg.get("transfers")
+        for vname, vcfg in CONFIG["venues"].items()
+        if vcfg.get("enabled", False)
+    }
+    return dumps_cache_key(transfers)
 
 
 def build_transfer_profiles() -> Dict[str, VenueTransfers]:
-    profiles: Dict[str, VenueTransfers] = {}
-    for vname, vcfg in CONFIG["venues"].items():
-        if not vcfg.get("enabled", False):
-            continue
-        transfers_cfg = vcfg.get("transfers") or {}
-        assets: Dict[str, TransferProfile] = {}
-        for asset, cfg in transfers_cfg.items():
-            assets[asset.upper()] = TransferProfile.from_config(cfg or {})
-        if assets:
-            profiles[vname] = VenueTransfers(assets=assets)
-    return profiles
+    """Igual que build_fee_map: se reconstruye solo si cambia la config de transferencias."""
+
+    global TRANSFER_PROFILES_CACHE
+    key = _transfer_profiles_cache_key()
+    with TRANSFER_PROFILES_CACHE_LOCK:
+        if TRANSFER_PROFILES_CACHE is not None and TRANSFER_PROFILES_CACHE[0] == key:
+            return dict(TRANSFER_PROFILES_CACHE[1])
+        profiles: Dict[str, VenueTransfers] = {}
+        for vname, vcfg in CONFIG["venues"].items():
+            if not vcfg.get("enabled", False):
+                continue
+            transfers_cfg = vcfg.get("transfers") or {}
+            assets: Dict[str, TransferProfile] = {}
+            for asset, cfg in transfers_cfg.items():
+                assets[asset.upper()] = TransferProfile.from_config(cfg or {})
+            if assets:
+                profiles[vname] = VenueTransfers(assets=assets)
+        TRANSFER_PROFILES_CACHE = (key, profiles)
+        return dict(profiles)
 
 
 def _asset_transfer_loss(
@@ -4464,20 +5489,49 @@ def build_effective_p2p_quotes(
 class ExchangeAdapter:
     name: str
     depth_supported: bool = False
+    # True si fetch_quotes_bulk resuelve varios pares con una sola request.
+    bulk_quotes_supported: bool = False
 
     def normalize_symbol(self, pair: str) -> str:
         raise NotImplementedError
 
+    def symbol_for(self, pair: str) -> str:
+        """normalize_symbol memoizado: los pares configurados son pocos y fijos."""
+        try:
+            return self._symbol_map[pair]
+        except AttributeError:
+            self._symbol_map: Dict[str, str] = {}
+        except KeyError:
+            pass
+        symbol = self.normalize_symbol(pair)
+        self._symbol_map[pair] = symbol
+        return symbol
+
+    def prime_symbols(self, pairs: Iterable[str]) -> None:
+        """Precalcula la tabla de símbolos al crear el adapter."""
+        for pair in pairs:
+            self.symbol_for(pair)
+
     def fetch_quote(self, pair: str) -> Optional[Quote]:
         raise NotImplementedError
 
+    def fetch_quotes_bulk(self, pairs: List[str]) -> Dict[str, Optional[Quote]]:
+        """Cotiza varios pares; por defecto una request por par."""
+        return {pair: self.fetch_quote(pair) for pair in pairs}
+
+    def _finalize_ticker_quote(self, pair: str, quote: Optional[Quote]) -> Optional[Quote]:
+        quote = self._attach_depth(pair, quote)
+        if quote and quote.bid >= quote.ask:
+            return None
+        return quote
+
     def fetch_depth_snapshot(self, pair: str) -> Optional[DepthInfo]:
         return None
 
     def _depth_disable_key(self, pair: str, venue_wide: bool = False) -> Tuple[str, str]:
         if venue_wide:
             return (self.name, "*")
-        return (self.name, self.normalize_symbol(pair))
+        return (self.name, self.symbol_for(pair))
 
     def _depth_disable_cooldown_ms(self) -> int:
         venue_cfg = CONFIG.get("venues", {}).get(self.name, {})
@@ -4511,7 +5565,7 @@ class ExchangeAdapter:
         log_event(
             "exchange.depth.blocked",
             venue=self.name,
-            pair=self.normalize_symbol(pair),
+            pair=self.symbol_for(pair),
             status_code=status_code,
             cooldown_ms=self._depth_disable_cooldown_ms(),
             disabled_until_ts=until_ts,
@@ -4545,7 +5599,7 @@ class ExchangeAdapter:
             log_event(
                 "exchange.depth.cooldown_active",
                 venue=self.name,
-                pair=self.normalize_symbol(pair),
+                pair=self.symbol_for(pair),
                 disabled_until_ts=active_until,
                 cooldown_remaining_ms=max(0, active_until - now),
             )
@@ -4588,7 +5642,7 @@ class ExchangeAdapter:
         ts = int(ts_raw) if ts_raw is not None else current_millis()
         source = str(data.get("source") or "test")
         return Quote(
-            self.normalize_symbol(pair),
+            self.symbol_for(pair),
             bid,
             ask,
             ts,
@@ -4636,35 +5690,82 @@ class ExchangeAdapter:
         if reason:
             print(f"[{self.name}] usando cotización offline para {pair}: {reason}")
         return Quote(
-            self.normalize_symbol(pair),
+            self.symbol_for(pair),
             bid,
             ask,
             current_millis(),
             source=str(data.get("source") or "offline"),
         )
 
-    def get_depth(self, pair: str) -> Optional[DepthInfo]:
+    def _depth_available(self, pair: str) -> bool:
         if not self.depth_supported:
-            return None
+            return False
         if self._is_test_mode_enabled() and self._test_mode_paused():
-            return None
-        if self._is_depth_temporarily_disabled(pair):
-            return None
-        symbol = self.normalize_symbol(pair)
-        cache_key = (self.name, symbol)
-        cached = DEPTH_CACHE.get(cache_key)
-        if cached:
-            return cached
+            return False
+        return not self._is_depth_temporarily_disabled(pair)
+
+    def _load_depth(self, pair: str, cache_key: Tuple[str, str]) -> Optional[DepthInfo]:
         depth = self.fetch_depth_snapshot(pair)
         if depth:
             DEPTH_CACHE.set(cache_key, depth)
         return depth
 
+    def _load_depth_inflight(self, pair: str, cache_key: Tuple[str, str]) -> Optional[DepthInfo]:
+        try:
+            return self._load_depth(pair, cache_key)
+        finally:
+            with DEPTH_INFLIGHT_LOCK:
+                DEPTH_INFLIGHT.pop(cache_key, None)
+
+    def prefetch_depth(self, pair: str) -> None:
+        """Dispara el snapshot de depth en segundo plano para solaparlo con el ticker."""
+        if not self._depth_available(pair):
+            return
+        cache_key = (self.name, self.symbol_for(pair))
+        if DEPTH_CACHE.get(cache_key):
+            return
+        with DEPTH_INFLIGHT_LOCK:
+            if cache_key in DEPTH_INFLIGHT:
+                return
+            DEPTH_INFLIGHT[cache_key] = get_depth_prefetch_pool().submit(
+                self._load_depth_inflight, pair, cache_key
+            )
+
+    def _get_depth_with_state(self, pair: str) -> Tuple[Optional[DepthInfo], bool]:
+        """Devuelve (depth, fresca). Un snapshot vencido se sirve mientras se refresca."""
+        if not self._depth_available(pair):
+            return None, False
+        symbol = self.symbol_for(pair)
+        cache_key = (self.name, symbol)
+        cached, fresh = DEPTH_CACHE.lookup(cache_key)
+        if cached:
+            if not fresh:
+                self.prefetch_depth(pair)
+            return cached, fresh
+        with DEPTH_INFLIGHT_LOCK:
+            pending = DEPTH_INFLIGHT.get(cache_key)
+        if pending is not None:
+            try:
+                return pending.result(), True
+            except Exception as exc:
+                print(f"[{self.name}] depth prefetch error {pair}: {exc}")
+                return None, False
+        return self._load_depth(pair, cache_key), True
+
+    def get_depth(self, pair: str) -> Optional[DepthInfo]:
+        return self._get_depth_with_state(pair)[0]
+
     def _attach_depth(self, pair: str, quote: Optional[Quote]) -> Optional[Quote]:
-        depth = self.get_depth(pair)
+        depth, fresh = self._get_depth_with_state(pair)
         if not depth:
             return quote
-        symbol = self.normalize_symbol(pair)
+        if not fresh:
+            # El volumen de un snapshot vencido sirve para dimensionar, pero
+            # sus precios no deben pisar los del ticker actual.
+            if quote is not None:
+                quote.depth = depth
+            return quote
+        symbol = self.symbol_for(pair)
         if quote is None:
             return Quote(
                 symbol,
@@ -4687,10 +5788,70 @@ class ExchangeAdapter:
 class Binance(ExchangeAdapter):
     name = "binance"
     depth_supported = True
+    bulk_quotes_supported = True
 
     def normalize_symbol(self, pair: str) -> str:
         return pair.replace("/", "")
 
+    def fetch_quotes_bulk(self, pairs: List[str]) -> Dict[str, Optional[Quote]]:
+        if self._is_test_mode_enabled():
+            return super().fetch_quotes_bulk(pairs)
+        results: Dict[str, Optional[Quote]] = {}
+        bulk_pairs: List[str] = []
+        for pair in pairs:
+            if self._p2p_pair_config(pair):
+                results[pair] = self.fetch_quote(pair)
+            else:
+                bulk_pairs.append(pair)
+        if len(bulk_pairs) < 2:
+            results.update(super().fetch_quotes_bulk(bulk_pairs))
+            return results
+
+        # Sin parámetros bookTicker devuelve todo el spot y se filtra acá: con
+        # "symbols" un solo par no listado hace fallar la request entera (400,
+        # código -1121) y http_get_json la reintentaría en cada endpoint.
+        symbols = {self.symbol_for(pair): pair for pair in bulk_pairs}
+        url, fallbacks = self._endpoint_config(
+            "ticker", "https://api.binance.com/api/v3/ticker/bookTicker"
+        )
+        try:
+            response = http_get_json(
+                url,
+                fallback_endpoints=[(fallback, None) for fallback in fallbacks],
+                allow_list=True,
+            )
+        except Exception as exc:
+            print(f"[binance] bulk ticker fallback: {exc}")
+            results.update(super().fetch_quotes_bulk(bulk_pairs))
+            return results
+
+        rows = response.data if isinstance(response.data, list) else []
+        if not rows:
+            print("[binance] bulk ticker sin lista; fallback por par")
+            results.update(super().fetch_quotes_bulk(bulk_pairs))
+            return results
+        by_symbol = {
+            str(row.get("symbol")): row
+            for row in rows
+            if isinstance(row, dict) and row.get("symbol") in symbols
+        }
+        for sym, pair in symbols.items():
+            row = by_symbol.get(sym)
+            if row is None:
+                # La respuesta trae todo el spot: si el símbolo falta, el venue
+                # no lo lista y el ticker individual solo sumaría reintentos.
+                results[pair] = None
+                continue
+            bid = safe_float(row.get("bidPrice"))
+            ask = safe_float(row.get("askPrice"))
+            if bid <= 0 or ask <= 0 or bid >= ask:
+                # El símbolo faltó o vino inválido: resolvemos solo ese par.
+                results[pair] = self.fetch_quote(pair)
+                continue
+            quote = Quote(sym, bid, ask, int(response.received_ts), checksum=response.checksum, source="bookTicker")
+            results[pair] = self._finalize_ticker_quote(pair, quote)
+        return results
+
     def fetch_quote(self, pair: str) -> Optional[Quote]:
         test_quote = self._test_mode_quote(pair)
         if test_quote is not None:
@@ -4702,7 +5863,7 @@ class Binance(ExchangeAdapter):
             p2p_quote = self._fetch_p2p_quote(pair, p2p_cfg)
             if p2p_quote:
                 return p2p_quote
-        sym = self.normalize_symbol(pair)
+        sym = self.symbol_for(pair)
         url, fallbacks = self._endpoint_config(
             "ticker", "https://api.binance.com/api/v3/ticker/bookTicker"
         )
@@ -4734,7 +5895,7 @@ class Binance(ExchangeAdapter):
         return quote
 
     def fetch_depth_snapshot(self, pair: str) -> Optional[DepthInfo]:
-        sym = self.normalize_symbol(pair)
+        sym = self.symbol_for(pair)
         url, fallbacks = self._endpoint_config(
             "depth", "https://api.binance.com/api/v3/depth"
         )
@@ -4842,7 +6003,7 @@ class Binance(ExchangeAdapter):
         if bid_price <= 0 or ask_price <= 0 or bid_price >= ask_price:
             return None
 
-        symbol = self.normalize_symbol(pair)
+        symbol = self.symbol_for(pair)
         metadata = {
             "asset": asset,
             "fiat": fiat,
@@ -4854,10 +6015,80 @@ class Binance(ExchangeAdapter):
 class Bybit(ExchangeAdapter):
     name = "bybit"
     depth_supported = True
+    bulk_quotes_supported = True
 
     def normalize_symbol(self, pair: str) -> str:
         return pair.replace("/", "")
 
+    def fetch_quotes_bulk(self, pairs: List[str]) -> Dict[str, Optional[Quote]]:
+        if self._is_test_mode_enabled():
+            return super().fetch_quotes_bulk(pairs)
+        results: Dict[str, Optional[Quote]] = {}
+        bulk_pairs: List[str] = []
+        for pair in pairs:
+            if self._p2p_pair_config(pair):
+                results[pair] = self.fetch_quote(pair)
+            else:
+                bulk_pairs.append(pair)
+        if len(bulk_pairs) < 2:
+            results.update(super().fetch_quotes_bulk(bulk_pairs))
+            return results
+
+        # Sin "symbol", /v5/market/tickers devuelve todo el spot en una request.
+        symbols = {self.symbol_for(pair): pair for pair in bulk_pairs}
+        params = {"category": "spot"}
+        url, fallbacks = self._endpoint_config(
+            "ticker", "https://api.bybit.com/v5/market/tickers"
+        )
+        try:
+            response = http_get_json(
+                url,
+                params=params,
+                fallback_endpoints=[(fallback, params) for fallback in fallbacks],
+            )
+        except Exception as exc:
+            print(f"[bybit] bulk ticker fallback: {exc}")
+            results.update(super().fetch_quotes_bulk(bulk_pairs))
+            return results
+
+        data = response.data if isinstance(response.data, dict) else {}
+        items = (data.get("result") or {}).get("list") or []
+        if not items:
+            # Sin lista (p. ej. retCode de error con HTTP 200) no se puede
+            # inferir que falten símbolos: el ticker por par registra el error.
+            print(f"[bybit] bulk ticker sin lista (retCode={data.get('retCode')}); fallback por par")
+            results.update(super().fetch_quotes_bulk(bulk_pairs))
+            return results
+        by_symbol = {
+            str(item.get("symbol")): item
+            for item in items
+            if isinstance(item, dict) and item.get("symbol") in symbols
+        }
+        ts_field = safe_float(data.get("time"))
+        for sym, pair in symbols.items():
+            item = by_symbol.get(sym)
+            if item is None:
+                # La respuesta trae todo el spot: si el símbolo falta, el venue
+                # no lo lista y el ticker individual solo sumaría reintentos.
+                results[pair] = None
+                continue
+            bid = safe_float(item.get("bid1Price"))
+            ask = safe_float(item.get("ask1Price"))
+            if bid <= 0 or ask <= 0 or bid >= ask:
+                results[pair] = self.fetch_quote(pair)
+                continue
+            try:
+                if ts_field > 0:
+                    ts_val = ensure_fresh_timestamp(int(ts_field), response.received_ts, "bybit:tickers")
+                else:
+                    ts_val = response.received_ts
+            except HttpError:
+                results[pair] = self.fetch_quote(pair)
+                continue
+            quote = Quote(sym, bid, ask, int(ts_val), checksum=response.checksum, source="ticker")
+            results[pair] = self._finalize_ticker_quote(pair, quote)
+        return results
+
     def fetch_quote(self, pair: str) -> Optional[Quote]:
         test_quote = self._test_mode_quote(pair)
         if test_quote is not None:
@@ -4869,7 +6100,7 @@ class Bybit(ExchangeAdapter):
             p2p_quote = self._fetch_p2p_quote(pair, p2p_cfg)
             if p2p_quote:
                 return p2p_quote
-        sym = self.normalize_symbol(pair)
+        sym = self.symbol_for(pair)
         url, fallbacks = self._endpoint_config(
             "ticker", "https://api.bybit.com/v5/market/tickers"
         )
@@ -4907,7 +6138,7 @@ class Bybit(ExchangeAdapter):
         return quote
 
     def fetch_depth_snapshot(self, pair: str) -> Optional[DepthInfo]:
-        sym = self.normalize_symbol(pair)
+        sym = self.symbol_for(pair)
         url, fallbacks = self._endpoint_config(
             "depth", "https://api.bybit.com/v5/market/orderbook"
         )
@@ -5013,7 +6244,7 @@ class Bybit(ExchangeAdapter):
         if bid_price <= 0 or ask_price <= 0 or bid_price >= ask_price:
             return None
 
-        symbol = self.normalize_symbol(pair)
+        symbol = self.symbol_for(pair)
         metadata = {
             "asset": asset,
             "fiat": fiat,
@@ -5085,7 +6316,7 @@ class GenericP2PMarketplace(ExchangeAdapter):
         retries = int(cfg.get("retries", p2p_cfg.get("retries", 3)))
 
         response: Optional[HttpJsonResponse] = None
-        symbol = self.normalize_symbol(pair)
+        symbol = self.symbol_for(pair)
         integrity_key = self._integrity_key(symbol, "p2p_gateway")
 
         def _format_fallbacks() -> List[Tuple[str, Optional[dict]]]:
@@ -5253,7 +6484,7 @@ class GenericP2PMarketplace(ExchangeAdapter):
         quote_source = str(cfg.get("source") or p2p_cfg.get("source") or "p2p")
 
         return Quote(
-            self.normalize_symbol(pair),
+            self.symbol_for(pair),
             bid,
             ask,
             timestamp_ms,
@@ -5265,17 +6496,74 @@ class GenericP2PMarketplace(ExchangeAdapter):
 class KuCoin(ExchangeAdapter):
     name = "kucoin"
     depth_supported = True
+    bulk_quotes_supported = True
 
     def normalize_symbol(self, pair: str) -> str:
         return pair.replace("/", "-")
 
+    def fetch_quotes_bulk(self, pairs: List[str]) -> Dict[str, Optional[Quote]]:
+        if self._is_test_mode_enabled() or len(pairs) < 2:
+            return super().fetch_quotes_bulk(pairs)
+
+        symbols = {self.symbol_for(pair): pair for pair in pairs}
+        url, fallbacks = self._endpoint_config(
+            "tickers", "https://api.kucoin.com/api/v1/market/allTickers"
+        )
+        try:
+            response = http_get_json(
+                url,
+                fallback_endpoints=[(fallback, None) for fallback in fallbacks],
+            )
+        except Exception as exc:
+            print(f"[kucoin] bulk ticker fallback: {exc}")
+            return super().fetch_quotes_bulk(pairs)
+
+        data = (response.data.get("data") or {}) if isinstance(response.data, dict) else {}
+        items = data.get("ticker") or []
+        if not items:
+            # Sin lista (p. ej. code de error con HTTP 200) no se puede inferir
+            # que falten símbolos: el ticker por par registra el error.
+            code = response.data.get("code") if isinstance(response.data, dict) else None
+            print(f"[kucoin] bulk ticker sin lista (code={code}); fallback por par")
+            return super().fetch_quotes_bulk(pairs)
+        by_symbol = {
+            str(item.get("symbol")): item
+            for item in items
+            if isinstance(item, dict) and item.get("symbol") in symbols
+        }
+        ts_field = safe_float(data.get("time"))
+        results: Dict[str, Optional[Quote]] = {}
+        for sym, pair in symbols.items():
+            item = by_symbol.get(sym)
+            if item is None:
+                # La respuesta trae todo el spot: si el símbolo falta, el venue
+                # no lo lista y el ticker individual solo sumaría reintentos.
+                results[pair] = None
+                continue
+            bid = safe_float(item.get("buy"))
+            ask = safe_float(item.get("sell"))
+            if bid <= 0 or ask <= 0 or bid >= ask:
+                results[pair] = self.fetch_quote(pair)
+                continue
+            try:
+                if ts_field > 0:
+                    ts_val = ensure_fresh_timestamp(int(ts_field), response.received_ts, "kucoin:tickers")
+                else:
+                    ts_val = response.received_ts
+            except HttpError:
+                results[pair] = self.fetch_quote(pair)
+                continue
+            quote = Quote(sym, bid, ask, int(ts_val), checksum=response.checksum, source="allTickers")
+            results[pair] = self._finalize_ticker_quote(pair, quote)
+        return results
+
     def fetch_quote(self, pair: str) -> Optional[Quote]:
         test_quote = self._test_mode_quote(pair)
         if test_quote is not None:
             return self._attach_depth(pair, test_quote)
         if self._is_test_mode_enabled() and self._test_mode_paused():
             return self._attach_depth(pair, self._offline_quote(pair, reason="test_mode_paused"))
-        sym = self.normalize_symbol(pair)
+        sym = self.symbol_for(pair)
         url, fallbacks = self._endpoint_config(
             "ticker", "https://api.kucoin.com/api/v1/market/orderbook/level1"
         )
@@ -5307,7 +6595,7 @@ class KuCoin(ExchangeAdapter):
         return quote
 
     def fetch_depth_snapshot(self, pair: str) -> Optional[DepthInfo]:
-        sym = self.normalize_symbol(pair)
+        sym = self.symbol_for(pair)
         url, fallbacks = self._endpoint_config(
             "depth", "https://api.kucoin.com/api/v1/market/orderbook/level2_20"
         )
@@ -5352,17 +6640,75 @@ class KuCoin(ExchangeAdapter):
 class OKX(ExchangeAdapter):
     name = "okx"
     depth_supported = True
+    bulk_quotes_supported = True
 
     def normalize_symbol(self, pair: str) -> str:
         return pair.replace("/", "-")
 
+    def fetch_quotes_bulk(self, pairs: List[str]) -> Dict[str, Optional[Quote]]:
+        if self._is_test_mode_enabled() or len(pairs) < 2:
+            return super().fetch_quotes_bulk(pairs)
+
+        symbols = {self.symbol_for(pair): pair for pair in pairs}
+        params = {"instType": "SPOT"}
+        url, fallbacks = self._endpoint_config(
+            "tickers", "https://www.okx.com/api/v5/market/tickers"
+        )
+        try:
+            response = http_get_json(
+                url,
+                params=params,
+                fallback_endpoints=[(fallback, params) for fallback in fallbacks],
+            )
+        except Exception as exc:
+            print(f"[okx] bulk ticker fallback: {exc}")
+            return super().fetch_quotes_bulk(pairs)
+
+        items = (response.data.get("data") or []) if isinstance(response.data, dict) else []
+        if not items:
+            # Sin lista (p. ej. code de error con HTTP 200) no se puede inferir
+            # que falten símbolos: el ticker por par registra el error.
+            code = response.data.get("code") if isinstance(response.data, dict) else None
+            print(f"[okx] bulk ticker sin lista (code={code}); fallback por par")
+            return super().fetch_quotes_bulk(pairs)
+        by_symbol = {
+            str(item.get("instId")): item
+            for item in items
+            if isinstance(item, dict) and item.get("instId") in symbols
+        }
+        results: Dict[str, Optional[Quote]] = {}
+        for sym, pair in symbols.items():
+            item = by_symbol.get(sym)
+            if item is None:
+                # La respuesta trae todo el spot: si el símbolo falta, el venue
+                # no lo lista y el ticker individual solo sumaría reintentos.
+                results[pair] = None
+                continue
+            bid = safe_float(item.get("bidPx"))
+            ask = safe_float(item.get("askPx"))
+            if bid <= 0 or ask <= 0 or bid >= ask:
+                results[pair] = self.fetch_quote(pair)
+                continue
+            try:
+                ts_field = safe_float(item.get("ts"))
+                if ts_field > 0:
+                    ts_val = ensure_fresh_timestamp(int(ts_field), response.received_ts, "okx:tickers")
+                else:
+                    ts_val = response.received_ts
+            except HttpError:
+                results[pair] = self.fetch_quote(pair)
+                continue
+            quote = Quote(sym, bid, ask, int(ts_val), checksum=response.checksum, source="ticker")
+            results[pair] = self._finalize_ticker_quote(pair, quote)
+        return results
+
     def fetch_quote(self, pair: str) -> Optional[Quote]:
         test_quote = self._test_mode_quote(pair)
         if test_quote is not None:
             return self._attach_depth(pair, test_quote)
         if self._is_test_mode_enabled() and self._test_mode_paused():
             return self._attach_depth(pair, self._offline_quote(pair, reason="test_mode_paused"))
-        sym = self.normalize_symbol(pair)
+        sym = self.symbol_for(pair)
         url, fallbacks = self._endpoint_config(
             "ticker", "https://www.okx.com/api/v5/market/ticker"
         )
@@ -5397,7 +6743,7 @@ class OKX(ExchangeAdapter):
         return quote
 
     def fetch_depth_snapshot(self, pair: str) -> Optional[DepthInfo]:
-        sym = self.normalize_symbol(pair)
+        sym = self.symbol_for(pair)
         url, fallbacks = self._endpoint_config(
             "depth", "https://www.okx.com/api/v5/market/books"
         )
@@ -5451,8 +6797,31 @@ ADAPTER_REGISTRY: Dict[str, Type[ExchangeAdapter]] = {
 }
 
 
+def quote_pair_universe(
+    pairs: Iterable[str],
+    routes: Iterable["TriangularRoute"],
+    p2p_pairs: Iterable[str],
+) -> List[str]:
+    """Todos los pares que cotiza una corrida: configurados, patas triangulares y P2P."""
+    universe = set(pairs)
+    universe.update(leg.pair for route in routes for leg in route.legs)
+    universe.update(p2p_pairs)
+    return sorted(universe)
+
+
+ADAPTERS_CACHE: Optional[Tuple[Tuple[Tuple[str, Type[ExchangeAdapter]], ...], Dict[str, ExchangeAdapter]]] = None
+ADAPTERS_CACHE_LOCK = threading.Lock()
+
+
 def build_adapters() -> Dict[str, ExchangeAdapter]:
-    adapters: Dict[str, ExchangeAdapter] = {}
+    """Instancia los adapters habilitados, reutilizándolos mientras no cambie la selección.
+
+    Los adapters leen su configuración de CONFIG en cada fetch, por lo que la
+    clave de caché solo necesita el par (venue, clase) de los habilitados.
+    """
+
+    global ADAPTERS_CACHE
+    selected: List[Tuple[str, Type[ExchangeAdapter]]] = []
     for venue_name, cfg in CONFIG.get("venues", {}).items():
         if not cfg or not cfg.get("enabled", False):
             continue
@@ -5462,11 +6831,41 @@ def build_adapters() -> Dict[str, ExchangeAdapter]:
             adapter_cls = ADAPTER_REGISTRY.get(venue_name.lower())
         if adapter_cls is None:
             continue
-        if adapter_cls is GenericP2PMarketplace:
-            adapters[venue_name] = adapter_cls(venue_name)
-        else:
-            adapters[venue_name] = adapter_cls()
-    return adapters
+        selected.append((venue_name, adapter_cls))
+    key = tuple(selected)
+
+    with ADAPTERS_CACHE_LOCK:
+        if ADAPTERS_CACHE is not None and ADAPTERS_CACHE[0] == key:
+            return dict(ADAPTERS_CACHE[1])
+        # La tabla de símbolos se arma con el mismo universo que cotiza
+        # run_once, incluidas las patas triangulares y los pares P2P.
+        universe = quote_pair_universe(
+            normalize_pair_list(CONFIG.get("pairs", [])),
+            load_triangular_routes(),
+            {pair for venue_pairs in configured_p2p_pairs().values() for pair in venue_pairs},
+        )
+        adapters: Dict[str, ExchangeAdapter] = {}
+        for venue_name, adapter_cls in selected:
+            if adapter_cls is GenericP2PMarketplace:
+                adapters[venue_name] = adapter_cls(venue_name)
+            else:
+                adapters[venue_name] = adapter_cls()
+            adapters[venue_name].prime_symbols(universe)
+        ADAPTERS_CACHE = (key, adapters)
+        return dict(adapters)
+
+
+def rebuild_adapters() -> Dict[str, ExchangeAdapter]:
+    """Descarta adapters, fees y transferencias cacheados y reconstruye los adapters."""
+
+    global ADAPTERS_CACHE, FEE_MAP_CACHE, TRANSFER_PROFILES_CACHE
+    with ADAPTERS_CACHE_LOCK:
+        ADAPTERS_CACHE = None
+    with FEE_MAP_CACHE_LOCK:
+        FEE_MAP_CACHE = None
+    with TRANSFER_PROFILES_CACHE_LOCK:
+        TRANSFER_PROFILES_CACHE = None
+    return build_adapters()
 
 
 def _normalize_discard_reason(reason: str) -> str:
@@ -5581,24 +6980,173 @@ def validate_quote_quality(
     return (len(unique_reasons) == 0), unique_reasons, quality_score
 
 
-def fetch_all_quotes(pairs: List[str], adapters: Dict[str, ExchangeAdapter]) -> Tuple[Dict[str, Dict[str, Quote]], List[Dict[str, Any]]]:
-    pair_quotes: Dict[str, Dict[str, Quote]] = {pair: {} for pair in pairs}
-    quote_discards: List[Dict[str, Any]] = []
-    if not pairs or not adapters:
-        return pair_quotes, quote_discards
+QUOTE_EXECUTOR: Optional[ThreadPoolExecutor] = None
+QUOTE_EXECUTOR_LOCK = threading.Lock()
 
-    p2p_pairs_cfg = configured_p2p_pairs()
-    futures_map: Dict[Any, Tuple[str, str]] = {}
 
-    def _task(adapter: ExchangeAdapter, pair: str, venue: str) -> Optional[Quote]:
-        record_exchange_attempt(venue, pair)
-        try:
-            quote = adapter.fetch_quote(pair)
-        except Exception as exc:
-            record_exchange_error(venue, str(exc), pair)
-            return None
+def get_quote_executor() -> ThreadPoolExecutor:
+    """Pool de hilos compartido entre corridas para no recrear workers en cada run_once."""
+
+    global QUOTE_EXECUTOR
+    with QUOTE_EXECUTOR_LOCK:
+        if QUOTE_EXECUTOR is None:
+            QUOTE_EXECUTOR = ThreadPoolExecutor(
+                max_workers=max(1, DEFAULT_QUOTE_WORKERS),
+                thread_name_prefix="quote-fetch",
+            )
+        return QUOTE_EXECUTOR
+
+
+def split_venue_lanes(venue_pairs: List[str], lanes: int) -> List[List[str]]:
+    """Reparte los pares de un venue en `lanes` tareas (0 = una por par)."""
+
+    if lanes <= 0 or lanes >= len(venue_pairs):
+        return [[pair] for pair in venue_pairs]
+    return [venue_pairs[idx::lanes] for idx in range(lanes)]
+
+
+VENUE_RATE_BUCKETS: Dict[str, Tuple[float, TokenBucket]] = {}
+VENUE_RATE_BUCKETS_LOCK = threading.Lock()
+
+
+def throttle_venue_request(venue: str, max_wait: Optional[float] = None) -> Optional[float]:
+    """Toma un token del bucket del venue; devuelve los segundos esperados.
+
+    Devuelve None si obtenerlo llevaría más de `max_wait` segundos.
+    """
+
+    with CONFIG_LOCK:
+        venue_cfg = dict((CONFIG.get("venues") or {}).get(venue) or {})
+    rate = safe_float(venue_cfg.get("requests_per_second", QUOTE_VENUE_RATE_PER_SECOND))
+    if rate <= 0:
+        return 0.0
+    with VENUE_RATE_BUCKETS_LOCK:
+        entry = VENUE_RATE_BUCKETS.get(venue)
+        if entry is None or entry[0] != rate:
+            # Ráfaga de 2 s: el primer lote de la corrida sale sin esperas.
+            entry = (rate, TokenBucket(rate, burst=rate * 2))
+            VENUE_RATE_BUCKETS[venue] = entry
+    return entry[1].acquire(max_wait=max_wait)
+
+
+# Cache de cotizaciones por (venue, par): en modo loop evita repetir requests
+# si la corrida anterior es más reciente que el TTL. Guardamos el adapter para
+# que solo reutilice la entrada la misma instancia que la produjo.
+QUOTE_CACHE_TTL_SECONDS = float(os.getenv("QUOTE_CACHE_TTL_SECONDS", "5"))
+QUOTE_CACHE: Dict[Tuple[str, str], Tuple[float, ExchangeAdapter, Quote]] = {}
+QUOTE_CACHE_LOCK = threading.Lock()
+# Los pares entre stablecoins casi no se mueven: toleran un TTL más largo.
+QUOTE_CACHE_STABLE_TTL_SECONDS = float(os.getenv("QUOTE_CACHE_STABLE_TTL_SECONDS", "15"))
+STABLE_ASSETS = frozenset({"USDT", "USDC", "DAI", "FDUSD", "TUSD"})
+# Requests de ticker en vuelo por (venue, par): corridas solapadas esperan
+# el mismo future en vez de repetir la llamada HTTP.
+QUOTE_INFLIGHT: Dict[Tuple[str, str], Tuple[ExchangeAdapter, "Future[Optional[Quote]]"]] = {}
+QUOTE_INFLIGHT_LOCK = threading.Lock()
+
+
+def quote_cache_ttl_for_pair(pair: str) -> float:
+    if QUOTE_CACHE_TTL_SECONDS <= 0:
+        return 0.0
+    pair_key = normalize_pair_input(pair) or pair.upper()
+    # CONFIG["quote_cache_ttl_by_pair"] permite TTLs propios (p. ej. pares
+    # muy volátiles más cortos); el TTL global en 0 sigue apagando la cache.
+    # Las claves se normalizan igual que los pares: "btc/usdt" también vale.
+    with CONFIG_LOCK:
+        overrides = dict(CONFIG.get("quote_cache_ttl_by_pair") or {})
+    for raw_key, ttl in overrides.items():
+        if (normalize_pair_input(str(raw_key)) or str(raw_key).upper()) == pair_key:
+            return max(0.0, safe_float(ttl))
+    base, _, quote = pair_key.partition("/")
+    if base in STABLE_ASSETS and quote in STABLE_ASSETS:
+        return max(QUOTE_CACHE_TTL_SECONDS, QUOTE_CACHE_STABLE_TTL_SECONDS)
+    return QUOTE_CACHE_TTL_SECONDS
+
+
+def get_cached_quote(
+    venue: str,
+    pair: str,
+    adapter: ExchangeAdapter,
+    ttl: Optional[float] = None,
+) -> Optional[Quote]:
+    ttl = quote_cache_ttl_for_pair(pair) if ttl is None else ttl
+    if ttl <= 0:
+        return None
+    with QUOTE_CACHE_LOCK:
+        entry = QUOTE_CACHE.get((venue, pair))
+    if entry is None:
+        return None
+    stored_at, cached_adapter, quote = entry
+    if cached_adapter is not adapter or time.monotonic() - stored_at > ttl:
+        return None
+    return quote
+
+
+def store_cached_quote(venue: str, pair: str, adapter: ExchangeAdapter, quote: Quote) -> None:
+    if QUOTE_CACHE_TTL_SECONDS <= 0:
+        return
+    with QUOTE_CACHE_LOCK:
+        QUOTE_CACHE[(venue, pair)] = (time.monotonic(), adapter, quote)
+
+
+def fetch_quote_coalesced(venue: str, pair: str, adapter: ExchangeAdapter) -> Optional[Quote]:
+    """fetch_quote compartido: llamadas concurrentes al mismo (venue, par) usan una sola request."""
+
+    key = (venue, pair)
+    with QUOTE_INFLIGHT_LOCK:
+        entry = QUOTE_INFLIGHT.get(key)
+        if entry is not None and entry[0] is adapter:
+            pending = entry[1]
+            owner = False
+        else:
+            pending = Future()
+            QUOTE_INFLIGHT[key] = (adapter, pending)
+            owner = True
+    if not owner:
+        return pending.result()
+
+    try:
+        quote = adapter.fetch_quote(pair)
+    except BaseException as exc:
+        pending.set_exception(exc)
+        raise
+    else:
+        pending.set_result(quote)
+        return quote
+    finally:
+        with QUOTE_INFLIGHT_LOCK:
+            current = QUOTE_INFLIGHT.get(key)
+            if current is not None and current[1] is pending:
+                del QUOTE_INFLIGHT[key]
+
+
+def invalidate_quote_cache(venue: Optional[str] = None) -> None:
+    with QUOTE_CACHE_LOCK:
+        if venue is None:
+            QUOTE_CACHE.clear()
+            return
+        for key in [key for key in QUOTE_CACHE if key[0] == venue]:
+            del QUOTE_CACHE[key]
+
+
+def _is_unsupported_spot_pair(venue: str, pair: str, p2p_pairs_cfg: Dict[str, Any]) -> bool:
+    pair_key = pair.upper()
+    is_p2p_pair = pair_key in p2p_pairs_cfg.get(venue, {})
+    return venue == "bybit" and pair_key.endswith("/ARS") and not is_p2p_pair
 
+
+def fetch_all_quotes(pairs: List[str], adapters: Dict[str, ExchangeAdapter]) -> Tuple[Dict[str, Dict[str, Quote]], List[Dict[str, Any]]]:
+    # Solo los pares con al menos una cotización aparecen en el resultado;
+    # los consumidores acceden con .get(pair, {}).
+    pair_quotes: Dict[str, Dict[str, Quote]] = defaultdict(dict)
+    quote_discards: List[Dict[str, Any]] = []
+    if not pairs or not adapters:
+        return {}, quote_discards
+
+    p2p_pairs_cfg = configured_p2p_pairs()
+
+    def _record_outcome(adapter: ExchangeAdapter, pair: str, venue: str, quote: Optional[Quote]) -> Optional[Quote]:
         if quote:
+            store_cached_quote(venue, pair, adapter, quote)
             record_exchange_success(venue, pair)
             log_event(
                 "exchange.quote",
@@ -5612,34 +7160,149 @@ def fetch_all_quotes(pairs: List[str], adapters: Dict[str, ExchangeAdapter]) ->
         record_exchange_no_data(venue, pair)
         return None
 
-    max_workers = min(
-        max(1, DEFAULT_QUOTE_WORKERS),
-        max(1, len(pairs) * max(1, len(adapters))),
-    )
+    def _throttle(venue: str) -> bool:
+        # La espera del rate limit no cuenta como latencia del fetch y no
+        # puede pasarse del deadline: el worker no queda dormido en vano.
+        max_wait = None if deadline_at is None else max(0.0, deadline_at - time.monotonic())
+        return throttle_venue_request(venue, max_wait=max_wait) is not None
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        for pair in pairs:
-            for venue, adapter in adapters.items():
-                if is_circuit_open(venue):
-                    record_exchange_skip(venue, "circuit_open", pair)
-                    continue
-                venue_p2p_pairs = p2p_pairs_cfg.get(venue, {})
-                pair_key = pair.upper()
-                is_p2p_pair = pair_key in venue_p2p_pairs
-                if venue == "bybit" and pair_key.endswith("/ARS") and not is_p2p_pair:
-                    print("[bybit] ARS no está en spot; usar Convert/P2P (no implementado).")
-                    record_exchange_skip(venue, "ars_not_spot", pair)
-                    continue
-                futures_map[executor.submit(_task, adapter, pair, venue)] = (pair, venue)
+    def _task(adapter: ExchangeAdapter, pair: str, venue: str) -> Optional[Quote]:
+        cached = get_cached_quote(venue, pair, adapter)
+        if cached is not None:
+            return cached
+        # El circuito pudo abrirse mientras la tarea esperaba en la cola.
+        if is_circuit_open(venue):
+            record_exchange_skip(venue, "circuit_open", pair)
+            return None
+
+        if not _throttle(venue):
+            record_exchange_skip(venue, "deadline", pair)
+            return None
+
+        record_exchange_attempt(venue, pair)
+        adapter.prefetch_depth(pair)
+        started = time.perf_counter()
+        try:
+            quote = fetch_quote_coalesced(venue, pair, adapter)
+        except Exception as exc:
+            if getattr(exc, "status_code", None) == 429:
+                invalidate_quote_cache(venue)
+            record_exchange_error(venue, str(exc), pair)
+            return None
+        finally:
+            record_fetch_latency((time.perf_counter() - started) * 1000.0)
+
+        return _record_outcome(adapter, pair, venue, quote)
+
+    def _bulk_task(adapter: ExchangeAdapter, venue_pairs: List[str], venue: str) -> Dict[str, Optional[Quote]]:
+        results: Dict[str, Optional[Quote]] = {}
+        pending: List[str] = []
+        for pair in venue_pairs:
+            cached = get_cached_quote(venue, pair, adapter)
+            if cached is not None:
+                results[pair] = cached
+            else:
+                pending.append(pair)
+        if not pending:
+            return results
+        if is_circuit_open(venue):
+            for pair in pending:
+                record_exchange_skip(venue, "circuit_open", pair)
+            return results
+        if not _throttle(venue):
+            for pair in pending:
+                record_exchange_skip(venue, "deadline", pair)
+            return results
+
+        for pair in pending:
+            record_exchange_attempt(venue, pair)
+            adapter.prefetch_depth(pair)
+        started = time.perf_counter()
+        try:
+            fetched = adapter.fetch_quotes_bulk(pending)
+        except Exception as exc:
+            if getattr(exc, "status_code", None) == 429:
+                invalidate_quote_cache(venue)
+            for pair in pending:
+                record_exchange_error(venue, str(exc), pair)
+            return results
+        finally:
+            record_fetch_latency((time.perf_counter() - started) * 1000.0)
+
+        for pair in pending:
+            results[pair] = _record_outcome(adapter, pair, venue, fetched.get(pair))
+        return results
+
+    def _lane_task(adapter: ExchangeAdapter, lane_pairs: List[str], venue: str) -> Dict[str, Optional[Quote]]:
+        results: Dict[str, Optional[Quote]] = {}
+        for idx, pair in enumerate(lane_pairs):
+            # Pasado el deadline la corrida ya no espera: el resto del carril
+            # se omite en vez de retener el worker.
+            if deadline_at is not None and time.monotonic() >= deadline_at:
+                for late_pair in lane_pairs[idx:]:
+                    record_exchange_skip(venue, "deadline", late_pair)
+                break
+            results[pair] = _task(adapter, pair, venue)
+        return results
+
+    # Agrupamos por venue: los adapters con endpoint multi-símbolo resuelven
+    # todos sus pares con una sola request por corrida.
+    venue_pairs: Dict[str, List[str]] = defaultdict(list)
+    for pair in pairs:
+        for venue, adapter in adapters.items():
+            if is_circuit_open(venue):
+                record_exchange_skip(venue, "circuit_open", pair)
+                continue
+            if _is_unsupported_spot_pair(venue, pair, p2p_pairs_cfg):
+                print("[bybit] ARS no está en spot; usar Convert/P2P (no implementado).")
+                record_exchange_skip(venue, "ars_not_spot", pair)
+                continue
+            venue_pairs[venue].append(pair)
+
+    deadline = QUOTE_FETCH_DEADLINE_SECONDS if QUOTE_FETCH_DEADLINE_SECONDS > 0 else None
+    deadline_at = time.monotonic() + deadline if deadline is not None else None
+
+    # Las tareas se encolan alternando venues: el pool FIFO no atiende todos
+    # los carriles de un venue antes de arrancar los del siguiente.
+    jobs_by_venue: List[List[Tuple[Callable[..., Any], ExchangeAdapter, Any, str]]] = []
+    for venue, requested in venue_pairs.items():
+        adapter = adapters[venue]
+        if adapter.bulk_quotes_supported and len(requested) > 1:
+            jobs_by_venue.append([(_bulk_task, adapter, requested, venue)])
+            continue
+        jobs: List[Tuple[Callable[..., Any], ExchangeAdapter, Any, str]] = []
+        for lane in split_venue_lanes(requested, QUOTE_VENUE_CONCURRENCY):
+            if len(lane) == 1:
+                jobs.append((_task, adapter, lane[0], venue))
+            else:
+                jobs.append((_lane_task, adapter, lane, venue))
+        jobs_by_venue.append(jobs)
+
+    executor = get_quote_executor()
+    futures_map: Dict[Any, Tuple[Union[str, Tuple[str, ...]], str]] = {}
+    for round_jobs in itertools.zip_longest(*jobs_by_venue):
+        for job in round_jobs:
+            if job is None:
+                continue
+            fn, adapter, requested_key, venue = job
+            key = requested_key if isinstance(requested_key, str) else tuple(requested_key)
+            futures_map[executor.submit(fn, adapter, requested_key, venue)] = (key, venue)
 
-        for future in as_completed(futures_map):
-            pair, venue = futures_map[future]
+    try:
+        for future in as_completed(futures_map, timeout=deadline):
+            requested_key, venue = futures_map[future]
             try:
-                quote = future.result()
+                result = future.result()
             except Exception as exc:
-                print(f"[{venue}] error fetch {pair}: {exc}")
+                print(f"[{venue}] error fetch {requested_key}: {exc}")
                 continue
-            if quote:
+            if isinstance(requested_key, str):
+                task_quotes: Dict[str, Optional[Quote]] = {requested_key: result}
+            else:
+                task_quotes = result
+            for pair, quote in task_quotes.items():
+                if not quote:
+                    continue
                 source = str(getattr(quote, "source", "")).lower()
                 if source == "offline":
                     log_event(
@@ -5652,9 +7315,26 @@ def fetch_all_quotes(pairs: List[str], adapters: Dict[str, ExchangeAdapter]) ->
                     continue
 
                 pair_quotes[pair][venue] = quote
+    except FuturesTimeoutError:
+        # Las tareas que aún no arrancaron se cancelan para no ocupar workers
+        # del pool compartido durante la próxima corrida.
+        late_venues: Set[str] = set()
+        cancelled = 0
+        for future, (_, venue) in futures_map.items():
+            if future.done():
+                continue
+            late_venues.add(venue)
+            if future.cancel():
+                cancelled += 1
+        log_event(
+            "exchange.quote.deadline",
+            deadline_seconds=deadline,
+            venues=sorted(late_venues),
+            cancelled=cancelled,
+        )
 
     now_ms = current_millis()
-    validated_quotes: Dict[str, Dict[str, Quote]] = {pair: {} for pair in pairs}
+    validated_quotes: Dict[str, Dict[str, Quote]] = defaultdict(dict)
     for pair, venues in pair_quotes.items():
         for venue, quote in venues.items():
             is_valid, reasons, quality_score = validate_quote_quality(
@@ -5690,7 +7370,7 @@ def fetch_all_quotes(pairs: List[str], adapters: Dict[str, ExchangeAdapter]) ->
             )
             record_exchange_no_data(venue, pair)
 
-    return validated_quotes, quote_discards
+    return dict(validated_quotes), quote_discards
 
 
 def collect_pair_quotes(pairs: List[str], adapters: Dict[str, ExchangeAdapter]) -> Dict[str, Dict[str, Quote]]:
@@ -5711,8 +7391,6 @@ def diagnose_exchange_pairs(
 
     futures: Dict[Any, Tuple[str, str]] = {}
     results: List[Dict[str, Any]] = []
-    workers = max_workers or DEFAULT_QUOTE_WORKERS
-    workers = max(1, workers)
 
     def _task(venue: str, adapter: ExchangeAdapter, pair: str) -> Dict[str, Any]:
         started = time.perf_counter()
@@ -5757,7 +7435,7 @@ def diagnose_exchange_pairs(
             try:
                 ts_value = int(quote.ts)
             except (TypeError, ValueError):
-                ts_value = int(time.time() * 1000)
+                ts_value = current_millis()
 
             return {
                 "venue": venue,
@@ -5778,7 +7456,16 @@ def diagnose_exchange_pairs(
             "latency_ms": latency_ms,
         }
 
-    with ThreadPoolExecutor(max_workers=workers) as executor:
+    # Sin límite explícito se reutiliza el pool de quotes: el diagnóstico no
+    # levanta (ni destruye) una tanda nueva de hilos en cada invocación.
+    own_executor: Optional[ThreadPoolExecutor] = None
+    if max_workers:
+        own_executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        executor = own_executor
+    else:
+        executor = get_quote_executor()
+
+    try:
         for venue, adapter in adapters.items():
             for pair in pairs_list:
                 future = executor.submit(_task, venue, adapter, pair)
@@ -5798,6 +7485,9 @@ def diagnose_exchange_pairs(
                         "latency_ms": 0.0,
                     }
                 )
+    finally:
+        if own_executor is not None:
+            own_executor.shutdown(wait=True)
 
     return results
 
@@ -5834,10 +7524,35 @@ def update_prometheus_metrics(
         PROM_EXCHANGE_ATTEMPTS.labels(exchange=exchange).set(float(stats.get("attempts", 0)))
         PROM_EXCHANGE_ERRORS.labels(exchange=exchange).set(float(stats.get("errors", 0)))
 
+    latency = fetch_latency_snapshot()
+    for stat in ("avg", "p50", "p95"):
+        value = latency.get(stat)
+        if value is not None:
+            PROM_FETCH_LATENCY_MS.labels(stat=stat).set(float(value))
+
+    global PROM_GENERATION
+    with PROM_CACHE_LOCK:
+        PROM_GENERATION += 1
+
+
+def render_prometheus_metrics() -> bytes:
+    """Devuelve la exposición Prometheus, reutilizando la última si no hubo cambios."""
+
+    global PROM_CACHE
+    with PROM_CACHE_LOCK:
+        generation = PROM_GENERATION
+        if PROM_CACHE[0] == generation:
+            return PROM_CACHE[1]
+    body = generate_latest(PROM_REGISTRY)
+    with PROM_CACHE_LOCK:
+        if generation == PROM_GENERATION:
+            PROM_CACHE = (generation, body)
+    return body
+
 # =========================
 # Engine
 # =========================
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class Opportunity:
     pair: str
     buy_venue: str
@@ -5859,9 +7574,11 @@ class Opportunity:
     sell_vwap: float = 0.0
     effective_slippage_bps: float = 0.0
     executable_qty: float = 0.0
+    # Suma de taker fees de ambas patas, fijada al calcular la oportunidad.
+    total_fee_percent: Optional[float] = None
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class BacktestParams:
     capital_quote: float
     slippage_bps: float
@@ -5870,7 +7587,7 @@ class BacktestParams:
     latency_penalty_multiplier: float
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class BacktestReport:
     total_trades: int = 0
     profitable_trades: int = 0
@@ -5880,7 +7597,7 @@ class BacktestReport:
     average_effective_percent: float = 0.0
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class HistoricalAnalysis:
     rows_considered: int
     success_rate: float
@@ -5914,24 +7631,145 @@ def load_historical_rows(path: str, lookback_hours: int) -> List[Dict[str, str]]
     return rows
 
 
-def compute_pair_volatility(rows: Iterable[Dict[str, str]]) -> Tuple[Dict[str, float], float]:
-    per_pair: Dict[str, List[float]] = {}
+@dataclass(**DATACLASS_SLOTS)
+class HistoricalSeriesState:
+    inode: int
+    lookback_hours: int
+    offset: int = 0
+    tail: bytes = b""
+    columns: Optional[Tuple[int, int, int]] = None
+    timestamps: List[int] = field(default_factory=list)
+    pairs: List[str] = field(default_factory=list)
+    net_values: List[float] = field(default_factory=list)
+
+
+# En modo loop el CSV solo crece: cada corrida parsea las filas agregadas
+# desde la anterior. `tail` guarda los últimos bytes leídos para detectar un
+# archivo reescrito en el lugar; un inode distinto indica migración o rotación.
+HISTORICAL_SERIES_CACHE: Dict[str, HistoricalSeriesState] = {}
+HISTORICAL_SERIES_LOCK = threading.Lock()
+HISTORICAL_SERIES_TAIL_BYTES = 64
+
+
+def _extend_historical_series(path: str, state: HistoricalSeriesState, cutoff_ts: Optional[int]) -> bool:
+    """Agrega las filas nuevas; devuelve False si el archivo ya no coincide con el estado."""
+    with open(path, "rb") as f:
+        f.seek(state.offset - len(state.tail))
+        chunk = f.read()
+    if not chunk.startswith(state.tail):
+        return False
+    end = chunk.rfind(b"\n")
+    if end < len(state.tail):
+        return True
+    consumed = chunk[len(state.tail):end + 1]
+    state.offset += len(consumed)
+    state.tail = chunk[max(0, end + 1 - HISTORICAL_SERIES_TAIL_BYTES):end + 1]
+
+    reader = csv.reader(consumed.decode("utf-8", errors="replace").splitlines())
+    if state.columns is None:
+        header = next(reader, None) or []
+        try:
+            state.columns = (header.index("ts"), header.index("pair"), header.index("net_%"))
+        except ValueError:
+            state.columns = (-1, -1, -1)
+    ts_idx, pair_idx, net_idx = state.columns
+    if ts_idx < 0:
+        return True
+    required = max(ts_idx, pair_idx)
+    for row in reader:
+        if len(row) <= required:
+            continue
+        try:
+            ts = int(float(row[ts_idx]))
+        except ValueError:
+            continue
+        if cutoff_ts is not None and ts < cutoff_ts:
+            continue
+        pair = row[pair_idx]
+        if not pair:
+            continue
+        state.timestamps.append(ts)
+        state.pairs.append(pair)
+        state.net_values.append(safe_float(row[net_idx], 0.0) if net_idx < len(row) else 0.0)
+    return True
+
+
+def load_historical_series(path: str, lookback_hours: int) -> Tuple[List[str], List[float]]:
+    """Pares y net_% del lookback como listas paralelas, sin un dict por fila."""
+    if not os.path.exists(path):
+        return [], []
+
+    ensure_log_header(path)
+
+    cutoff_ts: Optional[int] = None
+    if lookback_hours > 0:
+        cutoff_ts = int(time.time() - lookback_hours * 3600)
+
+    with HISTORICAL_SERIES_LOCK:
+        try:
+            inode = os.stat(path).st_ino
+        except OSError:
+            return [], []
+        state = HISTORICAL_SERIES_CACHE.get(path)
+        if state is None or state.inode != inode or state.lookback_hours != lookback_hours:
+            state = HistoricalSeriesState(inode=inode, lookback_hours=lookback_hours)
+        if not _extend_historical_series(path, state, cutoff_ts):
+            state = HistoricalSeriesState(inode=inode, lookback_hours=lookback_hours)
+            _extend_historical_series(path, state, cutoff_ts)
+        HISTORICAL_SERIES_CACHE[path] = state
+
+        # Las filas que salieron de la ventana se descartan para siempre: el
+        # cutoff solo avanza mientras el lookback no cambie.
+        if cutoff_ts is not None and state.timestamps and min(state.timestamps) < cutoff_ts:
+            keep = [index for index, ts in enumerate(state.timestamps) if ts >= cutoff_ts]
+            state.timestamps = [state.timestamps[index] for index in keep]
+            state.pairs = [state.pairs[index] for index in keep]
+            state.net_values = [state.net_values[index] for index in keep]
+        return list(state.pairs), list(state.net_values)
+
+
+def _series_from_rows(rows: Iterable[Dict[str, str]]) -> Tuple[List[str], List[float]]:
+    pairs: List[str] = []
+    net_values: List[float] = []
     for row in rows:
         pair = row.get("pair")
         if not pair:
             continue
-        per_pair.setdefault(pair, []).append(safe_float(row.get("net_%"), 0.0))
+        pairs.append(pair)
+        net_values.append(safe_float(row.get("net_%"), 0.0))
+    return pairs, net_values
+
+
+def _float_mean(values: List[float]) -> float:
+    return math.fsum(values) / len(values) if values else 0.0
+
+
+def _float_pstdev(values: List[float]) -> float:
+    """Desvío poblacional en float; statistics.pstdev pasa por Fraction y es mucho más lento."""
+    count = len(values)
+    if count < 2:
+        return 0.0
+    mu = math.fsum(values) / count
+    return math.sqrt(math.fsum((value - mu) * (value - mu) for value in values) / count)
+
+
+def compute_pair_volatility(rows: Iterable[Dict[str, str]]) -> Tuple[Dict[str, float], float]:
+    return _pair_volatility_from_series(*_series_from_rows(rows))
+
+
+def _pair_volatility_from_series(pairs: List[str], net_values: List[float]) -> Tuple[Dict[str, float], float]:
+    per_pair: Dict[str, List[float]] = {}
+    for pair, net_percent in zip(pairs, net_values):
+        bucket = per_pair.get(pair)
+        if bucket is None:
+            per_pair[pair] = [net_percent]
+        else:
+            bucket.append(net_percent)
 
     volatility: Dict[str, float] = {}
     max_volatility = 0.0
     for pair, values in per_pair.items():
-        if len(values) > 1:
-            try:
-                vol = pstdev(values)
-            except StatisticsError:
-                vol = 0.0
-        else:
-            vol = 0.0
+        vol = _float_pstdev(values)
         volatility[pair] = vol
         max_volatility = max(max_volatility, vol)
     return volatility, max_volatility
@@ -5947,35 +7785,50 @@ def build_backtest_params(capital: float, cfg: Dict[str, float]) -> BacktestPara
     )
 
 
-def compute_effective_net_percent(net_percent: float, pair_volatility: float, params: BacktestParams) -> float:
+def _effective_penalty_percent(pair_volatility: float, params: BacktestParams) -> float:
     penalty = (params.slippage_bps + params.rebalance_bps) / 100.0
     if pair_volatility > 0 and params.latency_seconds > 0 and params.latency_penalty_multiplier > 0:
         penalty += pair_volatility * (params.latency_seconds / 60.0) * params.latency_penalty_multiplier
-    return net_percent - penalty
+    return penalty
+
+
+def compute_effective_net_percent(net_percent: float, pair_volatility: float, params: BacktestParams) -> float:
+    return net_percent - _effective_penalty_percent(pair_volatility, params)
 
 
 def run_backtest(rows: Iterable[Dict[str, str]], params: BacktestParams, pair_volatility: Dict[str, float]) -> Tuple[BacktestReport, List[float], List[float]]:
-    net_values: List[float] = []
+    pairs, net_values = _series_from_rows(rows)
+    return _backtest_series(pairs, net_values, params, pair_volatility)
+
+
+def _backtest_series(
+    pairs: List[str],
+    net_values: List[float],
+    params: BacktestParams,
+    pair_volatility: Dict[str, float],
+) -> Tuple[BacktestReport, List[float], List[float]]:
     effective_values: List[float] = []
     cumulative_pnl = 0.0
     profitable = 0
-
-    for row in rows:
-        pair = row.get("pair")
-        if not pair:
-            continue
-        net_percent = safe_float(row.get("net_%"), 0.0)
-        effective_net = compute_effective_net_percent(net_percent, pair_volatility.get(pair, 0.0), params)
-        net_values.append(net_percent)
+    capital = params.capital_quote
+    # La penalización sólo depende del par: se calcula una vez por par.
+    penalty_by_pair: Dict[str, float] = {}
+
+    for pair, net_percent in zip(pairs, net_values):
+        penalty = penalty_by_pair.get(pair)
+        if penalty is None:
+            penalty = _effective_penalty_percent(pair_volatility.get(pair, 0.0), params)
+            penalty_by_pair[pair] = penalty
+        effective_net = net_percent - penalty
         effective_values.append(effective_net)
-        pnl = params.capital_quote * (effective_net / 100.0)
+        pnl = capital * (effective_net / 100.0)
         cumulative_pnl += pnl
         if pnl > 0:
             profitable += 1
 
     total = len(effective_values)
     average_pnl = cumulative_pnl / total if total else 0.0
-    average_effective = mean(effective_values) if effective_values else 0.0
+    average_effective = _float_mean(effective_values)
     success_rate = (profitable / total) if total else 0.0
 
     report = BacktestReport(
@@ -5990,6 +7843,17 @@ def run_backtest(rows: Iterable[Dict[str, str]], params: BacktestParams, pair_vo
     return report, net_values, effective_values
 
 
+def _select_kth_smallest(values: List[float], index: int) -> float:
+    """k-ésimo menor (base 0). Con k cerca de un extremo un heap acotado evita ordenar todo."""
+    count = len(values)
+    small_side = min(index + 1, count - index)
+    if small_side * 16 <= count:
+        if index + 1 <= count - index:
+            return heapq.nsmallest(index + 1, values)[-1]
+        return heapq.nlargest(count - index, values)[-1]
+    return sorted(values)[index]
+
+
 def compute_dynamic_threshold(
     net_values: List[float],
     effective_values: List[float],
@@ -6005,15 +7869,18 @@ def compute_dynamic_threshold(
     max_thr = float(cfg.get("max_threshold_percent", 5.0))
     adjust_multiplier = float(cfg.get("adjust_multiplier", 0.4))
 
-    sorted_net = sorted(net_values)
     # índice asociado al percentil que deja target% de señales por encima
-    idx = max(0, min(len(sorted_net) - 1, int(math.floor((1 - target) * len(sorted_net)))))
-    quantile_net = sorted_net[idx]
-
-    penalties: List[float] = []
-    for net, eff in zip(net_values, effective_values):
-        penalties.append(net - eff)
-    avg_penalty = mean(penalties) if penalties else 0.0
+    idx = max(0, min(len(net_values) - 1, int(math.floor((1 - target) * len(net_values)))))
+    quantile_net = _select_kth_smallest(net_values, idx)
+
+    # mean(net - eff) sin armar la lista intermedia de penalizaciones.
+    paired = min(len(net_values), len(effective_values))
+    avg_penalty = 0.0
+    if paired:
+        avg_penalty = (
+            math.fsum(itertools.islice(net_values, paired))
+            - math.fsum(itertools.islice(effective_values, paired))
+        ) / paired
 
     candidate = quantile_net + max(0.0, avg_penalty)
 
@@ -6027,11 +7894,11 @@ def compute_dynamic_threshold(
 def analyze_historical_performance(path: str, capital: float) -> HistoricalAnalysis:
     analysis_cfg = CONFIG.get("analysis", {})
     lookback_hours = int(analysis_cfg.get("lookback_hours", 0))
-    rows = load_historical_rows(path, lookback_hours)
+    pairs, series_net = load_historical_series(path, lookback_hours)
 
     params = build_backtest_params(capital, CONFIG.get("execution_costs", {}))
 
-    if not rows:
+    if not pairs:
         backtest = BacktestReport()
         return HistoricalAnalysis(
             rows_considered=0,
@@ -6044,10 +7911,10 @@ def analyze_historical_performance(path: str, capital: float) -> HistoricalAnaly
             backtest=backtest,
         )
 
-    volatility, max_volatility = compute_pair_volatility(rows)
-    backtest, net_values, effective_values = run_backtest(rows, params, volatility)
+    volatility, max_volatility = _pair_volatility_from_series(pairs, series_net)
+    backtest, net_values, effective_values = _backtest_series(pairs, series_net, params, volatility)
 
-    average_net = mean(net_values) if net_values else 0.0
+    average_net = _float_mean(net_values)
     recommended_threshold = compute_dynamic_threshold(
         net_values,
         effective_values,
@@ -6067,7 +7934,7 @@ def analyze_historical_performance(path: str, capital: float) -> HistoricalAnaly
         backtest=backtest,
     )
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class TriangleLeg:
     pair: str
     action: str  # BUY_BASE o SELL_BASE
@@ -6076,7 +7943,7 @@ class TriangleLeg:
         return self.action.strip().upper()
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class TriangularRoute:
     name: str
     venue: str
@@ -6088,7 +7955,7 @@ class TriangularRoute:
         return f"{self.venue}::{self.name}"
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class TriangularOpportunity:
     route: TriangularRoute
     start_capital: float
@@ -6102,46 +7969,202 @@ class TriangularOpportunity:
     def net_profit(self) -> float:
         return self.final_capital_net - self.start_capital
 
+OPPORTUNITIES_PER_PAIR = 5
+SUMMARY_OPPORTUNITIES_LIMIT = 20
+
+
+def rank_opportunities(
+    opportunities: List[Opportunity],
+    top_k: Optional[int] = None,
+    account_limit_checker: Optional[Callable[[Opportunity], Tuple[bool, Optional[str], Dict[str, Any]]]] = None,
+) -> List[Opportunity]:
+    """Ordena por net_percent descendente; con top_k solo selecciona los k mejores.
+
+    Con checker y top_k los candidatos se chequean en orden de ranking hasta
+    completar k aprobados: el resto no llega a evaluarse.
+    """
+
+    if account_limit_checker is None:
+        if top_k is not None and 0 <= top_k < len(opportunities):
+            return heapq.nlargest(top_k, opportunities, key=lambda o: o.net_percent)
+        return sorted(opportunities, key=lambda o: o.net_percent, reverse=True)
+
+    # El índice desempata igual que el sort estable por net_percent.
+    heap = [(-opp.net_percent, idx) for idx, opp in enumerate(opportunities)]
+    heapq.heapify(heap)
+    limit = len(opportunities) if top_k is None else max(0, top_k)
+    ranked: List[Opportunity] = []
+    while heap and len(ranked) < limit:
+        _, idx = heapq.heappop(heap)
+        candidate = opportunities[idx]
+        allowed, reason, details = account_limit_checker(candidate)
+        if not allowed:
+            log_event(
+                "opportunity.discard",
+                reason=reason or "account_limit",
+                pair=candidate.pair,
+                buy_venue=candidate.buy_venue,
+                sell_venue=candidate.sell_venue,
+                strategy=candidate.strategy,
+                **(details or {}),
+            )
+            continue
+        ranked.append(candidate)
+    return ranked
+
+
 def compute_opportunities_for_pair(
     pair: str,
     quotes: Dict[str, Quote],
     fees: Dict[str, VenueFees],
     account_limit_checker: Optional[Callable[[Opportunity], Tuple[bool, Optional[str], Dict[str, Any]]]] = None,
+    top_k: Optional[int] = None,
+    min_net_percent: Optional[float] = None,
+    scan_mode: str = "all",
 ) -> List[Opportunity]:
-    venues = list(quotes.keys())
-    opportunities: List[Opportunity] = []
-    for buy_v, sell_v in itertools.permutations(venues, 2):
-        buy_quote = quotes.get(buy_v)
-        sell_quote = quotes.get(sell_v)
-        if not buy_quote or not sell_quote:
-            continue
-        if str(getattr(buy_quote, "source", "")).lower() == "offline":
-            continue
-        if str(getattr(sell_quote, "source", "")).lower() == "offline":
-            continue
-
-        buy_fee_cfg = fees.get(buy_v)
-        sell_fee_cfg = fees.get(sell_v)
-        if not buy_fee_cfg or not sell_fee_cfg:
+    # Cada venue se prepara una sola vez (fees, slippage, validaciones) en vez
+    # de repetirlo en cada permutación buy/sell. Los datos quedan en listas
+    # paralelas (una por columna) para que el cruce sea aritmética por índice.
+    venues: List[str] = []
+    venue_quotes: List[Quote] = []
+    buy_prices: List[float] = []
+    sell_prices: List[float] = []
+    raw_asks: List[float] = []
+    raw_bids: List[float] = []
+    taker_fees: List[float] = []
+    for venue, quote in quotes.items():
+        if not quote or str(getattr(quote, "source", "")).lower() == "offline":
             continue
-
-        buy_price = float(buy_quote.ask)
-        sell_price = float(sell_quote.bid)
-        if buy_price <= 0 or sell_price <= 0:
+        fee_cfg = fees.get(venue)
+        if not fee_cfg:
             continue
+        schedule = fee_cfg.schedule_for_pair(pair)
+        buy_price = 0.0
+        if float(quote.ask) > 0:
+            buy_price = apply_slippage(quote.ask, schedule.slippage_bps, "buy")
+        sell_price = 0.0
+        if float(quote.bid) > 0:
+            sell_price = apply_slippage(quote.bid, schedule.slippage_bps, "sell")
+        venues.append(venue)
+        venue_quotes.append(quote)
+        buy_prices.append(buy_price)
+        sell_prices.append(sell_price)
+        raw_asks.append(float(quote.ask))
+        raw_bids.append(float(quote.bid))
+        taker_fees.append(schedule.taker_fee_percent)
+
+    count = len(venues)
+    if count < 2:
+        return []
 
-        buy_schedule = buy_fee_cfg.schedule_for_pair(pair)
-        sell_schedule = sell_fee_cfg.schedule_for_pair(pair)
-
-        buy_price = apply_slippage(buy_quote.ask, buy_schedule.slippage_bps, "buy")
-        sell_price = apply_slippage(sell_quote.bid, sell_schedule.slippage_bps, "sell")
-        if buy_price <= 0 or sell_price <= 0:
+    # Primero se calculan solo los números (tuplas); los Opportunity se
+    # construyen en orden de net_percent y únicamente hasta cubrir top_k.
+    # Los empates se ordenan por (i, j), el mismo orden que daba
+    # itertools.permutations.
+    #
+    # min_net_percent se compara contra una cota con bid/ask crudos (sin el
+    # slippage configurado) menos fees: run_once vuelve a valuar con el VWAP
+    # del libro, que puede mejorar el neto modelado con slippage, pero nunca
+    # superar el top of book. Lo que no llega al umbral con esa cota no puede
+    # alertar; lo demás se devuelve aunque su neto con slippage quede abajo.
+    #
+    # La poda por ranking (top_k) sí usa el neto con slippage, que es el que
+    # ordena el resultado: filas de menor a mayor precio de compra y columnas
+    # de mayor a menor precio de venta; el umbral sube al k-ésimo mejor neto
+    # visto y, en cuanto la cota de una fila o celda no lo alcanza, se corta.
+    sell_items = ((sell_prices[j], taker_fees[j], j) for j in range(count) if sell_prices[j] > 0)
+    buy_items = ((buy_prices[i], taker_fees[i], i) for i in range(count) if buy_prices[i] > 0)
+    if scan_mode == "best_only":
+        # Solo el min-ask contra el max-bid: con dos candidatos por lado se
+        # cubre el caso de que ambos extremos sean del mismo venue.
+        sell_cols = heapq.nlargest(2, sell_items)
+        buy_rows = heapq.nsmallest(2, buy_items)
+        top_k = 1 if top_k is None else min(top_k, 1)
+    else:
+        sell_cols = sorted(sell_items, reverse=True)
+        buy_rows = sorted(buy_items)
+    if not sell_cols:
+        return []
+    best_sell = sell_cols[0][0]
+    min_fee = min(taker_fees)
+    threshold = min_net_percent
+    max_raw_bid = max(raw_bids[j] for _, _, j in sell_cols)
+    # Sin descartes posibles alcanza con los k mejores. El heap guarda
+    # (net, -i, -j, gross): en la cima queda el peor según (-net, i, j).
+    keep_best = top_k is not None and account_limit_checker is None
+    if keep_best and top_k <= 0:
+        return []
+    floor: Optional[float] = None
+    best: List[Tuple[float, int, int, float]] = []
+    raw: List[Tuple[float, float, int, int]] = []
+    for buy_price, buy_fee, i in buy_rows:
+        # Invariantes de la fila: una división por fila en vez de una por celda.
+        scale = 100.0 / buy_price
+        row_fee = buy_fee + min_fee
+        if floor is not None and (best_sell - buy_price) * scale - 2.0 * min_fee < floor:
+            break
+        raw_ask = raw_asks[i]
+        raw_scale = 100.0 / raw_ask
+        if threshold is not None and (max_raw_bid - raw_ask) * raw_scale - row_fee < threshold:
             continue
+        for sell_price, sell_fee, j in sell_cols:
+            if j == i:
+                continue
+            gross_percent = (sell_price - buy_price) * scale
+            if floor is not None and gross_percent - row_fee < floor:
+                break
+            net_percent = gross_percent - (buy_fee + sell_fee)
+            if floor is not None and net_percent < floor:
+                continue
+            if threshold is not None and (raw_bids[j] - raw_ask) * raw_scale - (buy_fee + sell_fee) < threshold:
+                continue
+            if not keep_best:
+                raw.append((net_percent, gross_percent, i, j))
+                continue
+            entry = (net_percent, -i, -j, gross_percent)
+            if len(best) < top_k:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+            else:
+                continue
+            if len(best) == top_k:
+                floor = best[0][0]
+
+    def _rank(item: Tuple[float, float, int, int]) -> Tuple[float, int, int]:
+        return (-item[0], item[2], item[3])
+
+    def _pop_ranked(heap: List[Tuple[float, int, int, float]]) -> Iterable[Tuple[float, float, int, int]]:
+        while heap:
+            neg_net, i, j, gross = heapq.heappop(heap)
+            yield -neg_net, gross, i, j
+
+    ranked: Iterable[Tuple[float, float, int, int]]
+    if keep_best:
+        raw = [(net, gross, -neg_i, -neg_j) for net, neg_i, neg_j, gross in best]
+        raw.sort(key=_rank)
+        ranked = raw
+    elif top_k is None:
+        raw.sort(key=_rank)
+        ranked = raw
+    else:
+        # Con checker puede haber descartes: heapify es O(M) y solo se extraen
+        # en orden los candidatos que se llegan a evaluar.
+        heap = [(-net, i, j, gross) for net, gross, i, j in raw]
+        heapq.heapify(heap)
+        ranked = _pop_ranked(heap)
 
-        gross_percent = (sell_price - buy_price) / buy_price * 100.0
-        total_fee = buy_schedule.taker_fee_percent + sell_schedule.taker_fee_percent
-        net_percent = gross_percent - total_fee
-
+    limit = len(raw) if top_k is None else max(0, top_k)
+    opportunities: List[Opportunity] = []
+    for net_percent, gross_percent, i, j in ranked:
+        if len(opportunities) >= limit:
+            break
+        buy_v = venues[i]
+        sell_v = venues[j]
+        buy_price = buy_prices[i]
+        sell_price = sell_prices[j]
+        buy_quote = venue_quotes[i]
+        sell_quote = venue_quotes[j]
         candidate = Opportunity(
                 pair=pair,
                 buy_venue=buy_v,
@@ -6157,6 +8180,7 @@ def compute_opportunities_for_pair(
                     float(getattr(sell_quote, "metadata", {}).get("quality_score", 1.0) or 1.0),
                 ),
                 strategy="spot_spot",
+                total_fee_percent=taker_fees[i] + taker_fees[j],
             )
         if account_limit_checker:
             allowed, reason, details = account_limit_checker(candidate)
@@ -6173,7 +8197,7 @@ def compute_opportunities_for_pair(
                 continue
         opportunities.append(candidate)
 
-    return sorted(opportunities, key=lambda o: o.net_percent, reverse=True)
+    return opportunities
 
 
 def compute_spot_p2p_opportunities(
@@ -6182,36 +8206,48 @@ def compute_spot_p2p_opportunities(
     p2p_quotes: Dict[str, Quote],
     fees: Dict[str, VenueFees],
     account_limit_checker: Optional[Callable[[Opportunity], Tuple[bool, Optional[str], Dict[str, Any]]]] = None,
+    top_k: Optional[int] = None,
 ) -> List[Opportunity]:
     opportunities: List[Opportunity] = []
     base, _ = split_pair(pair)
     asset = base.upper()
     target_notional = float(CONFIG.get("simulation_capital_quote", 0.0) or 0.0)
+    # Las columnas P2P (filtros del aviso, fee, capacidad) dependen solo del
+    # venue: se preparan una vez y no en cada cruce con un venue spot.
+    p2p_columns: List[Tuple[str, Quote, Dict[str, Any], float, float]] = []
+    for p2p_venue, p2p_quote in p2p_quotes.items():
+        passes_filters, execution_meta, _ = _p2p_quote_passes_filters(p2p_venue, p2p_quote, target_notional)
+        if not passes_filters:
+            continue
+        p2p_columns.append(
+            (
+                p2p_venue,
+                p2p_quote,
+                execution_meta,
+                get_p2p_fee_percent(p2p_venue, asset),
+                _effective_notional_capacity(execution_meta, target_notional),
+            )
+        )
+    if not p2p_columns:
+        return opportunities
     for spot_venue, spot_quote in spot_quotes.items():
         fee_cfg = fees.get(spot_venue)
         if not fee_cfg:
             continue
-        buy_schedule = fee_cfg.schedule_for_pair(pair)
-        sell_schedule = fee_cfg.schedule_for_pair(pair)
-        spot_buy = apply_slippage(spot_quote.ask, buy_schedule.slippage_bps, "buy")
-        spot_sell = apply_slippage(spot_quote.bid, sell_schedule.slippage_bps, "sell")
+        schedule = fee_cfg.schedule_for_pair(pair)
+        spot_buy = apply_slippage(spot_quote.ask, schedule.slippage_bps, "buy")
+        spot_sell = apply_slippage(spot_quote.bid, schedule.slippage_bps, "sell")
         if spot_buy <= 0 or spot_sell <= 0:
             continue
-        for p2p_venue, p2p_quote in p2p_quotes.items():
-            passes_filters, execution_meta, _ = _p2p_quote_passes_filters(p2p_venue, p2p_quote, target_notional)
-            if not passes_filters:
-                continue
-            candidates: List[Opportunity] = []
-            buy_fee = buy_schedule.taker_fee_percent
-            sell_fee = sell_schedule.taker_fee_percent
-            p2p_fee = get_p2p_fee_percent(p2p_venue, asset)
+        buy_fee = schedule.taker_fee_percent
+        sell_fee = schedule.taker_fee_percent
+        for p2p_venue, p2p_quote, execution_meta, p2p_fee, executable_notional in p2p_columns:
             p2p_bid = p2p_quote.bid
             p2p_ask = p2p_quote.ask
-            executable_notional = _effective_notional_capacity(execution_meta, target_notional)
             if p2p_bid > 0:
                 gross = (p2p_bid - spot_buy) / spot_buy * 100.0
                 net = gross - buy_fee - p2p_fee
-                candidates.append(
+                opportunities.append(
                     Opportunity(
                         pair=pair,
                         buy_venue=spot_venue,
@@ -6247,7 +8283,7 @@ def compute_spot_p2p_opportunities(
             if p2p_ask > 0:
                 gross = (spot_sell - p2p_ask) / p2p_ask * 100.0
                 net = gross - sell_fee - p2p_fee
-                candidates.append(
+                opportunities.append(
                     Opportunity(
                         pair=pair,
                         buy_venue=f"{p2p_venue}_p2p",
@@ -6280,54 +8316,46 @@ def compute_spot_p2p_opportunities(
                         },
                     )
                 )
-            for candidate in candidates:
-                if account_limit_checker:
-                    allowed, reason, details = account_limit_checker(candidate)
-                    if not allowed:
-                        log_event(
-                            "opportunity.discard",
-                            reason=reason or "account_limit",
-                            pair=candidate.pair,
-                            buy_venue=candidate.buy_venue,
-                            sell_venue=candidate.sell_venue,
-                            strategy=candidate.strategy,
-                            **(details or {}),
-                        )
-                        continue
-                opportunities.append(candidate)
-    return sorted(opportunities, key=lambda o: o.net_percent, reverse=True)
+    return rank_opportunities(opportunities, top_k, account_limit_checker)
 
 
 def compute_p2p_cross_opportunities(
     pair: str,
     quotes: Dict[str, Quote],
     account_limit_checker: Optional[Callable[[Opportunity], Tuple[bool, Optional[str], Dict[str, Any]]]] = None,
+    top_k: Optional[int] = None,
 ) -> List[Opportunity]:
     base, _ = split_pair(pair)
     opportunities: List[Opportunity] = []
     target_notional = float(CONFIG.get("simulation_capital_quote", 0.0) or 0.0)
-    venues = list(quotes.keys())
-    for buy_v, sell_v in itertools.permutations(venues, 2):
-        buy_quote = quotes.get(buy_v)
-        sell_quote = quotes.get(sell_v)
-        if not buy_quote or not sell_quote:
+    # Filtros, fee y capacidad se resuelven una vez por venue en lugar de
+    # repetirse en cada permutación.
+    columns: List[Tuple[str, Quote, Dict[str, Any], float, float]] = []
+    for venue, quote in quotes.items():
+        if not quote:
             continue
-        buy_ok, buy_meta, _ = _p2p_quote_passes_filters(buy_v, buy_quote, target_notional)
-        sell_ok, sell_meta, _ = _p2p_quote_passes_filters(sell_v, sell_quote, target_notional)
-        if not buy_ok or not sell_ok:
+        passes_filters, meta, _ = _p2p_quote_passes_filters(venue, quote, target_notional)
+        if not passes_filters:
             continue
+        columns.append(
+            (
+                venue,
+                quote,
+                meta,
+                get_p2p_fee_percent(venue, base),
+                _effective_notional_capacity(meta, target_notional),
+            )
+        )
+    for buy_col, sell_col in itertools.permutations(columns, 2):
+        buy_v, buy_quote, buy_meta, buy_fee, buy_capacity = buy_col
+        sell_v, sell_quote, sell_meta, sell_fee, sell_capacity = sell_col
         buy_price = buy_quote.ask
         sell_price = sell_quote.bid
         if buy_price <= 0 or sell_price <= 0:
             continue
-        buy_fee = get_p2p_fee_percent(buy_v, base)
-        sell_fee = get_p2p_fee_percent(sell_v, base)
         gross_percent = (sell_price - buy_price) / buy_price * 100.0
         net_percent = gross_percent - buy_fee - sell_fee
-        executable_notional = min(
-            _effective_notional_capacity(buy_meta, target_notional),
-            _effective_notional_capacity(sell_meta, target_notional),
-        )
+        executable_notional = min(buy_capacity, sell_capacity)
         candidate = Opportunity(
                 pair=pair,
                 buy_venue=f"{buy_v}_p2p",
@@ -6365,21 +8393,8 @@ def compute_p2p_cross_opportunities(
                     "executable_qty_real": executable_notional / buy_price if buy_price > 0 else 0.0,
                 },
             )
-        if account_limit_checker:
-            allowed, reason, details = account_limit_checker(candidate)
-            if not allowed:
-                log_event(
-                    "opportunity.discard",
-                    reason=reason or "account_limit",
-                    pair=candidate.pair,
-                    buy_venue=candidate.buy_venue,
-                    sell_venue=candidate.sell_venue,
-                    strategy=candidate.strategy,
-                    **(details or {}),
-                )
-                continue
         opportunities.append(candidate)
-    return sorted(opportunities, key=lambda o: o.net_percent, reverse=True)
+    return rank_opportunities(opportunities, top_k, account_limit_checker)
 
 
 def get_weighted_capital(base_capital: float, weights_cfg: Dict[str, float], key: str) -> float:
@@ -6390,15 +8405,33 @@ def get_weighted_capital(base_capital: float, weights_cfg: Dict[str, float], key
     return base_capital * weight
 
 
+TRIANGULAR_ROUTES_CACHE: Optional[Tuple[Union[bytes, str], List[TriangularRoute]]] = None
+TRIANGULAR_ROUTES_CACHE_LOCK = threading.Lock()
+
+
 def load_triangular_routes() -> List[TriangularRoute]:
+    """Rutas triangulares de CONFIG; se reconstruyen solo si cambia su configuración."""
+
+    global TRIANGULAR_ROUTES_CACHE
     routes_cfg = CONFIG.get("triangular_routes", []) or []
+    key = dumps_cache_key(routes_cfg)
+    with TRIANGULAR_ROUTES_CACHE_LOCK:
+        if TRIANGULAR_ROUTES_CACHE is not None and TRIANGULAR_ROUTES_CACHE[0] == key:
+            return list(TRIANGULAR_ROUTES_CACHE[1])
+    routes = _parse_triangular_routes(routes_cfg)
+    with TRIANGULAR_ROUTES_CACHE_LOCK:
+        TRIANGULAR_ROUTES_CACHE = (key, routes)
+    return list(routes)
+
+
+def _parse_triangular_routes(routes_cfg: List[Dict[str, Any]]) -> List[TriangularRoute]:
     routes: List[TriangularRoute] = []
     for rcfg in routes_cfg:
         legs_cfg = rcfg.get("legs", []) or []
         legs = [
             TriangleLeg(
                 pair=str(leg_cfg.get("pair", "")).upper(),
-                action=str(leg_cfg.get("action", "BUY_BASE")),
+                action=str(leg_cfg.get("action", "BUY_BASE")).strip().upper(),
             )
             for leg_cfg in legs_cfg
             if leg_cfg.get("pair")
@@ -6414,6 +8447,117 @@ def load_triangular_routes() -> List[TriangularRoute]:
     return routes
 
 
+# Acción de cada pata -> (lado de la cotización, operación sobre el monto).
+TRIANGLE_LEG_PLANS: Dict[str, Tuple[str, Callable[[float, float], float]]] = {
+    "BUY_BASE": ("ask", operator.truediv),
+    "SELL_BASE": ("bid", operator.mul),
+}
+
+
+RateEdge = Tuple[str, str, float, TriangleLeg]
+
+
+def find_negative_cycle(nodes: List[str], edges: List[RateEdge]) -> Optional[List[RateEdge]]:
+    """Bellman-Ford desde un origen virtual; devuelve un ciclo negativo (aristas en orden) o None."""
+
+    dist = {node: 0.0 for node in nodes}
+    pred: Dict[str, RateEdge] = {}
+    relaxed: Optional[str] = None
+    for _ in range(len(nodes) + 1):
+        relaxed = None
+        for edge in edges:
+            src, dst, weight, _ = edge
+            candidate = dist[src] + weight
+            if candidate < dist[dst] - 1e-12:
+                dist[dst] = candidate
+                pred[dst] = edge
+                relaxed = dst
+        if relaxed is None:
+            return None
+
+    # Tras V pasos hacia atrás por los predecesores se está dentro del ciclo.
+    node = relaxed
+    for _ in range(len(nodes)):
+        edge = pred.get(node)
+        if edge is None:
+            return None
+        node = edge[0]
+    cycle: List[RateEdge] = []
+    current = node
+    while True:
+        edge = pred[current]
+        cycle.append(edge)
+        current = edge[0]
+        if current == node:
+            break
+    cycle.reverse()
+    return cycle
+
+
+def discover_triangular_routes(
+    quotes_by_pair: Dict[str, Dict[str, Quote]],
+    fees: Dict[str, VenueFees],
+    max_legs: int = 4,
+    max_routes_per_venue: int = 5,
+) -> List[TriangularRoute]:
+    """Rutas intra-venue con ciclo rentable entre los pares cotizados.
+
+    Cada par aporta dos aristas con peso -log(tasa * (1 - fee)): comprar base
+    al ask y vender base al bid. Un ciclo de peso negativo multiplica el
+    capital por más de 1 neto de fees; el monto exacto lo recalcula
+    compute_triangular_opportunity.
+    """
+
+    edges_by_venue: Dict[str, List[RateEdge]] = defaultdict(list)
+    for pair, venue_quotes in quotes_by_pair.items():
+        base, quote_asset = split_pair(pair)
+        for venue, quote in venue_quotes.items():
+            if not quote or quote.bid <= 0 or quote.ask <= 0:
+                continue
+            if str(getattr(quote, "source", "")).lower() == "p2p":
+                continue
+            fee_cfg = fees.get(venue)
+            keep = 1.0 - ((fee_cfg.taker_fee_percent / 100.0) if fee_cfg else 0.0)
+            if keep <= 0:
+                continue
+            edges_by_venue[venue].append(
+                (quote_asset, base, -math.log(keep / quote.ask), TriangleLeg(pair=pair, action="BUY_BASE"))
+            )
+            edges_by_venue[venue].append(
+                (base, quote_asset, -math.log(quote.bid * keep), TriangleLeg(pair=pair, action="SELL_BASE"))
+            )
+
+    routes: List[TriangularRoute] = []
+    for venue in sorted(edges_by_venue):
+        edges = edges_by_venue[venue]
+        nodes = sorted({edge[0] for edge in edges} | {edge[1] for edge in edges})
+        for _ in range(max_routes_per_venue):
+            cycle = find_negative_cycle(nodes, edges)
+            if not cycle:
+                break
+            if len(cycle) <= max_legs:
+                # Se arranca desde una stablecoin si el ciclo pasa por una.
+                start = next((k for k, edge in enumerate(cycle) if edge[0] in STABLE_ASSETS), 0)
+                cycle = cycle[start:] + cycle[:start]
+                assets = [edge[0] for edge in cycle]
+                routes.append(
+                    TriangularRoute(
+                        name="auto:" + ">".join(assets + [assets[0]]),
+                        venue=venue,
+                        start_asset=assets[0],
+                        legs=[edge[3] for edge in cycle],
+                    )
+                )
+            # Sin su primera arista el ciclo desaparece y puede aflorar otro.
+            dropped = cycle[0]
+            edges = [edge for edge in edges if edge is not dropped]
+    return routes
+
+
+def _route_leg_signature(route: TriangularRoute) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    return route.venue, tuple(sorted((leg.pair, leg.action) for leg in route.legs))
+
+
 def compute_triangular_opportunity(route: TriangularRoute,
                                    quotes_by_pair: Dict[str, Dict[str, Quote]],
                                    fees: Dict[str, VenueFees],
@@ -6424,8 +8568,9 @@ def compute_triangular_opportunity(route: TriangularRoute,
     fee_cfg = fees.get(route.venue)
     fee_rate = (fee_cfg.taker_fee_percent / 100.0) if fee_cfg else 0.0
 
-    gross_amount = start_capital
-    net_amount = start_capital
+    # El fee es el mismo en cada pata: se acumula solo el multiplicador de
+    # precios y el neto aplica (1 - fee)^n una vez al final.
+    multiplier = 1.0
     legs_with_prices: List[Tuple[TriangleLeg, float]] = []
 
     for leg in route.legs:
@@ -6434,24 +8579,21 @@ def compute_triangular_opportunity(route: TriangularRoute,
         if not quote:
             return None
 
-        action = leg.normalized_action()
-        if action == "BUY_BASE":
-            price = quote.ask
-            if price <= 0:
-                return None
-            gross_amount = gross_amount / price
-            net_amount = (net_amount / price) * (1 - fee_rate)
-        elif action == "SELL_BASE":
-            price = quote.bid
-            if price <= 0:
-                return None
-            gross_amount = gross_amount * price
-            net_amount = (net_amount * price) * (1 - fee_rate)
-        else:
+        # load_triangular_routes ya normaliza la acción; normalized_action
+        # queda solo para patas construidas a mano.
+        plan = TRIANGLE_LEG_PLANS.get(leg.action) or TRIANGLE_LEG_PLANS.get(leg.normalized_action())
+        if plan is None:
+            return None
+        side, apply_price = plan
+        price = getattr(quote, side)
+        if price <= 0:
             return None
+        multiplier = apply_price(multiplier, price)
 
         legs_with_prices.append((leg, price))
 
+    gross_amount = start_capital * multiplier
+    net_amount = gross_amount * (1.0 - fee_rate) ** len(legs_with_prices)
     gross_percent = (gross_amount - start_capital) / start_capital * 100.0
     net_percent = (net_amount - start_capital) / start_capital * 100.0
 
@@ -6544,11 +8686,11 @@ def estimate_profit(
     if base_qty <= 0:
         return 0.0, 0.0, 0.0, 0.0
 
+    # Forma fusionada de (q*sell - q*buy - fee*q*buy) / (q*buy): el neto
+    # porcentual no depende de la cantidad y el profit sale de escalarlo.
     effective_capital = base_qty * buy_price
-    gross_proceeds = base_qty * sell_price
-    fee_loss = (total_percent_fee / 100.0) * effective_capital
-    profit = gross_proceeds - effective_capital - fee_loss
-    net_pct = (profit / effective_capital) * 100.0 if effective_capital > 0 else 0.0
+    net_pct = (sell_price / buy_price - 1.0) * 100.0 - total_percent_fee
+    profit = effective_capital * net_pct / 100.0
     return profit, net_pct, base_qty, effective_capital
 
 # =========================
@@ -6557,10 +8699,51 @@ def estimate_profit(
 
 
 def ensure_log_header(path: str) -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    if not os.path.exists(path) or os.path.getsize(path) == 0:
-        with open(path, "w", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow(LOG_HEADER)
+    _ensure_csv_header(path, LOG_HEADER)
+
+
+def build_csv_row(
+    opp: Opportunity,
+    est_profit: float,
+    base_qty: float,
+    capital_used: float,
+    buy_depth: Optional[DepthInfo],
+    sell_depth: Optional[DepthInfo],
+) -> List[Any]:
+    buy_depth_qty = _available_depth_qty(buy_depth, "buy")
+    sell_depth_qty = _available_depth_qty(sell_depth, "sell")
+    return [
+        int(time.time()),
+        opp.pair,
+        opp.buy_venue,
+        opp.sell_venue,
+        f"{opp.buy_price:.8f}",
+        f"{opp.sell_price:.8f}",
+        f"{opp.gross_percent:.4f}",
+        f"{opp.net_percent:.4f}",
+        f"{est_profit:.4f}",
+        f"{base_qty:.8f}",
+        f"{capital_used:.8f}",
+        f"{buy_depth_qty:.8f}",
+        f"{sell_depth_qty:.8f}",
+        f"{opp.liquidity_score:.4f}",
+        f"{opp.volatility_score:.4f}",
+        f"{opp.priority_score:.6f}",
+        opp.confidence_label,
+        f"{opp.buy_vwap:.8f}",
+        f"{opp.sell_vwap:.8f}",
+        f"{opp.effective_slippage_bps:.4f}",
+        f"{opp.executable_qty:.8f}",
+    ]
+
+
+def append_csv_rows(path: str, header: List[str], rows: List[List[Any]]) -> None:
+    """Escribe un lote de filas con una sola apertura del archivo."""
+
+    if not path or not rows:
+        return
+    with _open_csv_append(path, header) as f:
+        csv.writer(f).writerows(rows)
 
 
 def append_csv(
@@ -6572,51 +8755,41 @@ def append_csv(
     buy_depth: Optional[DepthInfo],
     sell_depth: Optional[DepthInfo],
 ) -> None:
-    ensure_log_header(path)
-    buy_depth_qty = _available_depth_qty(buy_depth, "buy")
-    sell_depth_qty = _available_depth_qty(sell_depth, "sell")
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(
-            [
-                int(time.time()),
-                opp.pair,
-                opp.buy_venue,
-                opp.sell_venue,
-                f"{opp.buy_price:.8f}",
-                f"{opp.sell_price:.8f}",
-                f"{opp.gross_percent:.4f}",
-                f"{opp.net_percent:.4f}",
-                f"{est_profit:.4f}",
-                f"{base_qty:.8f}",
-                f"{capital_used:.8f}",
-                f"{buy_depth_qty:.8f}",
-                f"{sell_depth_qty:.8f}",
-                f"{opp.liquidity_score:.4f}",
-                f"{opp.volatility_score:.4f}",
-                f"{opp.priority_score:.6f}",
-                opp.confidence_label,
-                f"{opp.buy_vwap:.8f}",
-                f"{opp.sell_vwap:.8f}",
-                f"{opp.effective_slippage_bps:.4f}",
-                f"{opp.executable_qty:.8f}",
-            ]
-        )
+    append_csv_rows(
+        path,
+        LOG_HEADER,
+        [build_csv_row(opp, est_profit, base_qty, capital_used, buy_depth, sell_depth)],
+    )
+
+
+# Firma (tamaño, mtime_ns) de cada CSV en su último backup: una corrida sin
+# filas nuevas no vuelve a copiar el archivo completo ni a listar backups.
+LOG_BACKUP_SIGNATURES: Dict[str, Tuple[int, int]] = {}
 
 
 def ensure_log_backups(paths: Iterable[str]) -> None:
+    flush_buffered_csv()
     backup_dir = Path(LOG_BACKUP_DIR)
-    backup_dir.mkdir(parents=True, exist_ok=True)
-    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    timestamp: Optional[str] = None
     for raw_path in paths:
         if not raw_path:
             continue
         file_path = Path(raw_path)
-        if not file_path.exists() or file_path.is_dir():
+        if not file_path.is_file():
             continue
+        stat_result = file_path.stat()
+        signature = (stat_result.st_size, stat_result.st_mtime_ns)
+        if LOG_BACKUP_SIGNATURES.get(raw_path) == signature:
+            continue
+        if timestamp is None:
+            backup_dir.mkdir(parents=True, exist_ok=True)
+            timestamp = time.strftime("%Y%m%d-%H%M%S")
         target = backup_dir / f"{file_path.stem}-{timestamp}{file_path.suffix}"
         shutil.copy2(file_path, target)
+        LOG_BACKUP_SIGNATURES[raw_path] = signature
 
+    if timestamp is None:
+        return
     backups = sorted(
         backup_dir.glob("*.csv"), key=lambda item: item.stat().st_mtime, reverse=True
     )
@@ -6627,38 +8800,39 @@ def ensure_log_backups(paths: Iterable[str]) -> None:
             pass
 
 
+TRIANGULAR_LOG_HEADER = [
+    "ts",
+    "route",
+    "venue",
+    "start_asset",
+    "start_capital",
+    "final_capital_net",
+    "gross_%",
+    "net_%",
+    "legs",
+]
+
+
+def build_triangular_csv_row(opp: TriangularOpportunity) -> List[Any]:
+    leg_summary = " | ".join(
+        f"{leg.pair}:{leg.normalized_action()}@{price:.8f}"
+        for leg, price in opp.leg_prices
+    )
+    return [
+        int(time.time()),
+        opp.route.name,
+        opp.route.venue,
+        opp.route.start_asset,
+        f"{opp.start_capital:.8f}",
+        f"{opp.final_capital_net:.8f}",
+        f"{opp.gross_percent:.4f}",
+        f"{opp.net_percent:.4f}",
+        leg_summary,
+    ]
+
+
 def append_triangular_csv(path: str, opp: TriangularOpportunity) -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    exists = os.path.exists(path)
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        if not exists:
-            w.writerow([
-                "ts",
-                "route",
-                "venue",
-                "start_asset",
-                "start_capital",
-                "final_capital_net",
-                "gross_%",
-                "net_%",
-                "legs",
-            ])
-        leg_summary = " | ".join(
-            f"{leg.pair}:{leg.normalized_action()}@{price:.8f}"
-            for leg, price in opp.leg_prices
-        )
-        w.writerow([
-            int(time.time()),
-            opp.route.name,
-            opp.route.venue,
-            opp.route.start_asset,
-            f"{opp.start_capital:.8f}",
-            f"{opp.final_capital_net:.8f}",
-            f"{opp.gross_percent:.4f}",
-            f"{opp.net_percent:.4f}",
-            leg_summary,
-        ])
+    append_csv_rows(path, TRIANGULAR_LOG_HEADER, [build_triangular_csv_row(opp)])
 
 # =========================
 # Formato de alerta
@@ -6686,6 +8860,21 @@ def format_venue_label(venue: str) -> str:
     return normalized.upper()
 
 
+# strftime por segundo: las alertas de una misma corrida comparten el texto
+# de la hora en vez de formatearlo una vez por oportunidad.
+ALERT_TIMESTAMP_CACHE: Tuple[int, str] = (-1, "")
+
+
+def alert_timestamp_text(now: Optional[float] = None) -> str:
+    global ALERT_TIMESTAMP_CACHE
+    second = int(time.time() if now is None else now)
+    cached = ALERT_TIMESTAMP_CACHE
+    if cached[0] != second:
+        cached = (second, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second)))
+        ALERT_TIMESTAMP_CACHE = cached
+    return cached[1]
+
+
 def fmt_alert(
     opp: Opportunity,
     est_profit: float,
@@ -6729,7 +8918,7 @@ def fmt_alert(
             "*Transferencia estimada:* `"
             f"{format_decimal_comma(float(transfer_cost), decimals=2)} USDT`{eta}"
         )
-    lines.append(time.strftime("%Y-%m-%d %H:%M:%S"))
+    lines.append(alert_timestamp_text())
     return "\n".join(lines)
 
 
@@ -6751,7 +8940,7 @@ def fmt_test_alert_table(
 
     buy_label = format_venue_label(opp.buy_venue)
     sell_label = format_venue_label(opp.sell_venue)
-    now_text = time.strftime("%Y-%m-%d %H:%M:%S")
+    now_text = alert_timestamp_text()
 
     lines = [
         "🚨 *Formato de alerta (test)*",
@@ -6797,7 +8986,7 @@ def fmt_triangular_alert(opp: TriangularOpportunity, fee_percent: float) -> str:
         f"Resultado neto: {opp.final_capital_net:.4f} {opp.route.start_asset} (PnL {opp.net_profit:.4f}, {opp.net_percent:.3f}%)\n"
         f"Spread bruto: {opp.gross_percent:.3f}% | Fees considerados: {fee_percent:.3f}% por trade\n"
         f"Legs:\n{legs_block}\n"
-        f"{time.strftime('%Y-%m-%d %H:%M:%S')}"
+        f"{alert_timestamp_text()}"
     )
 
 
@@ -6861,18 +9050,30 @@ def run_once() -> None:
 
     routes = load_triangular_routes()
     pairs = normalize_pair_list(configured_pairs)
-    extra_pairs = {leg.pair for route in routes for leg in route.legs}
-    p2p_pairs_cfg = configured_p2p_pairs()
-    p2p_pairs = sorted({pair for venue_pairs in p2p_pairs_cfg.values() for pair in venue_pairs})
-    all_pairs = sorted(set(pairs) | extra_pairs | set(p2p_pairs))
-    update_analysis_state(capital, log_csv)
-    with CONFIG_LOCK:
-        dynamic_threshold = float(DYNAMIC_THRESHOLD_PERCENT or base_threshold)
-    threshold = dynamic_threshold
+    p2p_pairs = sorted({pair for venue_pairs in configured_p2p_pairs().values() for pair in venue_pairs})
+    all_pairs = quote_pair_universe(pairs, routes, p2p_pairs)
+    # El análisis histórico (CSV + backtest) no depende de las cotizaciones:
+    # corre mientras los workers esperan la red y se espera antes de fijar
+    # el umbral dinámico.
+    analysis_refresh = get_quote_executor().submit(update_analysis_state, capital, log_csv)
     fee_map = build_fee_map(all_pairs)
     transfers = build_transfer_profiles()
     summary_opps: List[Dict[str, Any]] = []
     alert_records: List[Dict[str, Any]] = []
+    opp_csv_rows: List[List[Any]] = []
+    # Las alertas se encolan y se esperan al cierre de la corrida, así el
+    # cálculo no queda bloqueado por la latencia de Telegram.
+    alert_sends: List["Future[None]"] = []
+    # Las alertas sin teclado (triangulares, degradación) se agrupan en pocos
+    # mensajes para no disparar una ráfaga de sendMessage por corrida.
+    plain_alerts: List[str] = []
+
+    def _queue_alert(text: str, reply_markup: Optional[Dict[str, Any]]) -> None:
+        # Sin botones nada la ata a un mensaje propio: viaja en el lote.
+        if reply_markup is None:
+            plain_alerts.append(text)
+            return
+        alert_sends.append(tg_send_message_nowait(text, enabled=tg_enabled, reply_markup=reply_markup))
     run_ts = int(time.time())
 
     def _route_payment_method(venue_label: str) -> str:
@@ -6935,6 +9136,10 @@ def run_once() -> None:
         venues=len(adapters),
         latency_ms=quote_latency_ms,
     )
+    analysis_refresh.result()
+    with CONFIG_LOCK:
+        dynamic_threshold = float(DYNAMIC_THRESHOLD_PERCENT or base_threshold)
+    threshold = dynamic_threshold
 
     with STATE_LOCK:
         DASHBOARD_STATE["last_quote_latency_ms"] = quote_latency_ms
@@ -6952,7 +9157,11 @@ def run_once() -> None:
         effective_p2p_quotes = build_effective_p2p_quotes(p2p_index)
 
     spot_alerts = 0
+    # Sin perfiles de límites el chequeo siempre aprueba: se omite para que el
+    # cálculo por par use la búsqueda acotada de top_k.
+    spot_limit_checker = _precheck_opportunity_account_limits if account_limits_configured() else None
     if is_strategy_enabled("spot_spot"):
+        scan_mode = str(CONFIG.get("scan_mode") or "all").strip().lower()
         for pair in pairs:
             quotes = pair_quotes.get(pair, {})
             if len(quotes) < 2:
@@ -6966,15 +9175,26 @@ def run_once() -> None:
             capital_for_pair = get_weighted_capital(capital, pair_weight_cfg, pair)
             if capital_for_pair <= 0:
                 continue
-            opps = compute_opportunities_for_pair(pair, quotes, fee_map, account_limit_checker=_precheck_opportunity_account_limits)
-            for opp in opps[:5]:
-                fee_buy = fee_map.get(opp.buy_venue)
-                fee_sell = fee_map.get(opp.sell_venue)
-                if not fee_buy or not fee_sell:
-                    continue
-                buy_schedule = fee_buy.schedule_for_pair(pair)
-                sell_schedule = fee_sell.schedule_for_pair(pair)
-                total_fee_pct = buy_schedule.taker_fee_percent + sell_schedule.taker_fee_percent
+            opps = compute_opportunities_for_pair(
+                pair,
+                quotes,
+                fee_map,
+                account_limit_checker=spot_limit_checker,
+                top_k=OPPORTUNITIES_PER_PAIR,
+                min_net_percent=threshold,
+                scan_mode=scan_mode,
+            )
+            for opp in opps:
+                total_fee_pct = opp.total_fee_percent
+                if total_fee_pct is None:
+                    fee_buy = fee_map.get(opp.buy_venue)
+                    fee_sell = fee_map.get(opp.sell_venue)
+                    if not fee_buy or not fee_sell:
+                        continue
+                    total_fee_pct = (
+                        fee_buy.schedule_for_pair(pair).taker_fee_percent
+                        + fee_sell.schedule_for_pair(pair).taker_fee_percent
+                    )
                 depth_volumes = [
                     v
                     for v in (
@@ -7148,14 +9368,15 @@ def run_once() -> None:
             }
             summary_opps.append(entry)
             if est_percent >= threshold:
-                append_csv(
-                    log_csv,
-                    opp,
-                    est_profit,
-                    base_qty,
-                    capital_used,
-                    opp.buy_depth,
-                    opp.sell_depth,
+                opp_csv_rows.append(
+                    build_csv_row(
+                        opp,
+                        est_profit,
+                        base_qty,
+                        capital_used,
+                        opp.buy_depth,
+                        opp.sell_depth,
+                    )
                 )
                 msg = fmt_alert(
                     opp,
@@ -7180,8 +9401,7 @@ def run_once() -> None:
                     est_pnl_quote=est_profit,
                 )
                 msg = f"{msg}\n*Signal ID:* `{signal_id}`"
-                reply_markup = build_trade_reply_markup(link_items)
-                tg_send_message(msg, enabled=tg_enabled, reply_markup=reply_markup)
+                _queue_alert(msg, build_trade_reply_markup(link_items))
                 SIGNAL_REGISTRY[signal_id]["state"] = "sent"
                 record_signal_lifecycle_event(
                     signal_id,
@@ -7225,8 +9445,15 @@ def run_once() -> None:
             capital_for_pair = get_weighted_capital(capital, pair_weight_cfg, pair)
             if capital_for_pair <= 0:
                 continue
-            opps = compute_spot_p2p_opportunities(pair, spot_quotes, p2p_asset_quotes, fee_map, account_limit_checker=_precheck_opportunity_account_limits)
-            for opp in opps[:5]:
+            opps = compute_spot_p2p_opportunities(
+                pair,
+                spot_quotes,
+                p2p_asset_quotes,
+                fee_map,
+                account_limit_checker=_precheck_opportunity_account_limits,
+                top_k=OPPORTUNITIES_PER_PAIR,
+            )
+            for opp in opps:
                 side = opp.notes.get("side")
                 p2p_venue = str(opp.notes.get("p2p_venue") or "")
                 p2p_fee = float(opp.notes.get("p2p_fee_percent", 0.0) or 0.0)
@@ -7329,14 +9556,15 @@ def run_once() -> None:
                     "notes": opp.notes,
                 }
                 summary_opps.append(entry)
-                append_csv(
-                    log_csv,
-                    opp,
-                    est_profit,
-                    base_qty,
-                    capital_used,
-                    opp.buy_depth,
-                    opp.sell_depth,
+                opp_csv_rows.append(
+                    build_csv_row(
+                        opp,
+                        est_profit,
+                        base_qty,
+                        capital_used,
+                        opp.buy_depth,
+                        opp.sell_depth,
+                    )
                 )
                 msg = fmt_alert(
                     opp,
@@ -7361,8 +9589,7 @@ def run_once() -> None:
                     est_pnl_quote=est_profit,
                 )
                 msg = f"{msg}\n*Signal ID:* `{signal_id}`"
-                reply_markup = build_trade_reply_markup(link_items)
-                tg_send_message(msg, enabled=tg_enabled, reply_markup=reply_markup)
+                _queue_alert(msg, build_trade_reply_markup(link_items))
                 SIGNAL_REGISTRY[signal_id]["state"] = "sent"
                 record_signal_lifecycle_event(
                     signal_id,
@@ -7402,9 +9629,14 @@ def run_once() -> None:
             capital_for_pair = get_weighted_capital(capital, pair_weight_cfg, pair)
             if capital_for_pair <= 0:
                 continue
-            opps = compute_p2p_cross_opportunities(pair, quotes, account_limit_checker=_precheck_opportunity_account_limits)
+            opps = compute_p2p_cross_opportunities(
+                pair,
+                quotes,
+                account_limit_checker=_precheck_opportunity_account_limits,
+                top_k=OPPORTUNITIES_PER_PAIR,
+            )
             asset, _ = split_pair(pair)
-            for opp in opps[:5]:
+            for opp in opps:
                 buy_fee = float(opp.notes.get("p2p_buy_fee_percent", 0.0) or 0.0)
                 sell_fee = float(opp.notes.get("p2p_sell_fee_percent", 0.0) or 0.0)
                 adjusted_buy = opp.buy_price * (1 + buy_fee / 100.0)
@@ -7476,14 +9708,8 @@ def run_once() -> None:
                     "notes": opp.notes,
                 }
                 summary_opps.append(entry)
-                append_csv(
-                    log_csv,
-                    opp,
-                    est_profit,
-                    base_qty,
-                    capital_used,
-                    None,
-                    None,
+                opp_csv_rows.append(
+                    build_csv_row(opp, est_profit, base_qty, capital_used, None, None)
                 )
                 msg = fmt_alert(
                     opp,
@@ -7508,8 +9734,7 @@ def run_once() -> None:
                     est_pnl_quote=est_profit,
                 )
                 msg = f"{msg}\n*Signal ID:* `{signal_id}`"
-                reply_markup = build_trade_reply_markup(link_items)
-                tg_send_message(msg, enabled=tg_enabled, reply_markup=reply_markup)
+                _queue_alert(msg, build_trade_reply_markup(link_items))
                 SIGNAL_REGISTRY[signal_id]["state"] = "sent"
                 record_signal_lifecycle_event(
                     signal_id,
@@ -7535,12 +9760,28 @@ def run_once() -> None:
                 alert_entry["ts_str"] = time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime(alert_entry["ts"]))
                 alert_records.append(alert_entry)
 
-    summary_opps.sort(key=lambda item: item.get("priority_score", item["net_percent"]), reverse=True)
-    if len(summary_opps) > 20:
-        summary_opps = summary_opps[:20]
+    # Solo se publican las 20 mejores: nlargest evita ordenar la lista entera
+    # y mantiene el mismo orden (estable) que sort + slice.
+    summary_opps = heapq.nlargest(
+        SUMMARY_OPPORTUNITIES_LIMIT,
+        summary_opps,
+        key=lambda item: item.get("priority_score", item["net_percent"]),
+    )
+
+    # Las filas del CSV se acumulan durante la corrida y se escriben en lote.
+    append_csv_rows(log_csv, LOG_HEADER, opp_csv_rows)
 
     tri_alerts = 0
-    for route in routes:
+    tri_csv_rows: List[List[Any]] = []
+    tri_routes = routes
+    if is_strategy_enabled("triangular_discovery"):
+        known_routes = {_route_leg_signature(route) for route in routes}
+        tri_routes = routes + [
+            route
+            for route in discover_triangular_routes(pair_quotes, fee_map)
+            if _route_leg_signature(route) not in known_routes
+        ]
+    for route in tri_routes:
         route_capital = get_weighted_capital(capital, triangle_weight_cfg, route.identifier)
         if route_capital <= 0:
             continue
@@ -7549,13 +9790,16 @@ def run_once() -> None:
             continue
 
         if tri_log_csv:
-            append_triangular_csv(tri_log_csv, opp)
+            tri_csv_rows.append(build_triangular_csv_row(opp))
         fee_cfg = fee_map.get(route.venue)
         fee_pct = fee_cfg.default.taker_fee_percent if fee_cfg else 0.0
         msg = fmt_triangular_alert(opp, fee_pct)
-        tg_send_message(msg, enabled=tg_enabled)
+        plain_alerts.append(msg)
         tri_alerts += 1
 
+    if tri_log_csv:
+        append_csv_rows(tri_log_csv, TRIANGULAR_LOG_HEADER, tri_csv_rows)
+
     total_latency_ms = int((time.time() - run_start) * 1000)
     metrics_data = metrics_snapshot()
 
@@ -7590,7 +9834,9 @@ def run_once() -> None:
 
     degradation_alerts = build_degradation_alerts(metrics_data)
     for alert_msg in degradation_alerts:
-        tg_send_message(f"🚨 {alert_msg}", enabled=tg_enabled)
+        plain_alerts.append(f"🚨 {alert_msg}")
+    for batch in batch_telegram_texts(plain_alerts):
+        alert_sends.append(tg_send_message_nowait(batch, enabled=tg_enabled))
 
     update_prometheus_metrics(metrics_data, summary, tri_alerts)
 
@@ -7598,6 +9844,7 @@ def run_once() -> None:
     if tri_log_csv:
         backup_targets.append(tri_log_csv)
     ensure_log_backups(backup_targets)
+    wait_for_telegram_sends(alert_sends)
 
     print(
         "Run complete. Oportunidades enviadas: "
@@ -7621,6 +9868,9 @@ def _run_scanner_mode(args: argparse.Namespace, tg_enabled: bool) -> None:
 
     ensure_keepalive_thread()
 
+    if QUOTE_REFRESH_ENABLED and (args.web or (args.loop and not args.once)):
+        ensure_quote_refresh_threads()
+
     if args.web:
         ensure_web_startup_requirements("scanner", args.web)
         SCANNER_LOOP_THREAD = threading.Thread(
@@ -76,6 +76,8 @@ class ExchangeMetrics:
 class CircuitBreaker:
     consecutive_failures: int = 0
     open_until: float = 0.0
+    # Consecutive openings without a success in between; doubles the cooldown.
+    trips: int = 0
 
     def is_open(self) -> bool:
         return time.time() < self.open_until
@@ -87,9 +89,76 @@ _EXCHANGE_CIRCUITS: Dict[str, CircuitBreaker] = {}
 _ALERT_STATE: Dict[str, float] = {}
 
 CIRCUIT_FAILURE_THRESHOLD = 3
-CIRCUIT_COOLDOWN_SECONDS = 60
+CIRCUIT_COOLDOWN_SECONDS = 30
+CIRCUIT_COOLDOWN_MAX_SECONDS = 300
 DEGRADATION_ALERT_COOLDOWN = 600
 ERROR_RATE_ALERT_THRESHOLD = 0.5
+FETCH_LATENCY_WINDOW = 200
+
+
+class LatencyWindow:
+    """Fixed-size ring buffer of latency samples with a running sum.
+
+    The buffer is preallocated so recording a sample never allocates, and the
+    running sum keeps the average O(1). Percentiles sort a copy of the filled
+    slots, which is cheap for the window sizes used here.
+    """
+
+    __slots__ = ("_buf", "_size", "_cursor", "_count", "_total")
+
+    def __init__(self, size: int = FETCH_LATENCY_WINDOW) -> None:
+        self._size = max(1, int(size))
+        self._buf = [0.0] * self._size
+        self._cursor = 0
+        self._count = 0
+        self._total = 0.0
+
+    def record(self, value_ms: float) -> None:
+        idx = self._cursor
+        if self._count == self._size:
+            self._total -= self._buf[idx]
+        else:
+            self._count += 1
+        value = float(value_ms)
+        self._buf[idx] = value
+        self._total += value
+        self._cursor = (idx + 1) % self._size
+
+    def clear(self) -> None:
+        self._cursor = 0
+        self._count = 0
+        self._total = 0.0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def mean(self) -> Optional[float]:
+        if not self._count:
+            return None
+        return self._total / self._count
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._count:
+            return None
+        ordered = sorted(self._buf[: self._count])
+        rank = int(round((pct / 100.0) * (len(ordered) - 1)))
+        return ordered[max(0, min(rank, len(ordered) - 1))]
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        if not self._count:
+            return {"samples": 0, "avg": None, "p50": None, "p95": None, "max": None}
+        ordered = sorted(self._buf[: self._count])
+        last = len(ordered) - 1
+        return {
+            "samples": self._count,
+            "avg": self._total / self._count,
+            "p50": ordered[int(round(0.50 * last))],
+            "p95": ordered[int(round(0.95 * last))],
+            "max": ordered[last],
+        }
+
+
+_FETCH_LATENCIES = LatencyWindow(FETCH_LATENCY_WINDOW)
 
 
 def _get_metrics_locked(exchange: str) -> ExchangeMetrics:
@@ -119,6 +188,7 @@ def record_exchange_success(exchange: str, pair: Optional[str] = None) -> None:
         successes = metrics.successes
         circuit = _get_circuit_locked(exchange)
         circuit.consecutive_failures = 0
+        circuit.trips = 0
         consecutive_failures = circuit.consecutive_failures
     payload = {
         "exchange": exchange,
@@ -139,14 +209,24 @@ def record_exchange_error(exchange: str, error: str, pair: Optional[str] = None)
         circuit = _get_circuit_locked(exchange)
         circuit.consecutive_failures += 1
         consecutive_failures = circuit.consecutive_failures
-        if circuit.consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD:
-            circuit.open_until = time.time() + CIRCUIT_COOLDOWN_SECONDS
+        now = time.time()
+        # Errors that land while the circuit is already open (concurrent
+        # per-pair tasks, one failed bulk request) belong to the same trip:
+        # they must not escalate the backoff again.
+        if circuit.consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD and circuit.open_until <= now:
+            cooldown = min(
+                CIRCUIT_COOLDOWN_MAX_SECONDS,
+                CIRCUIT_COOLDOWN_SECONDS * (2 ** circuit.trips),
+            )
+            circuit.trips += 1
+            circuit.open_until = now + cooldown
             open_until = circuit.open_until
     if open_until is not None:
         log_event(
             "exchange.circuit_open",
             exchange=exchange,
             open_until=open_until,
+            cooldown_seconds=cooldown,
             consecutive_failures=consecutive_failures,
         )
     payload = {
@@ -189,14 +269,46 @@ def is_circuit_open(exchange: str) -> bool:
         if is_open:
             return True
         if circuit.open_until and not is_open:
+            # Half-open: a single further failure re-opens with a doubled
+            # cooldown; a success (record_exchange_success) clears trips.
             circuit.open_until = 0.0
-            circuit.consecutive_failures = 0
+            circuit.consecutive_failures = CIRCUIT_FAILURE_THRESHOLD - 1
             should_log_reset = True
     if should_log_reset:
         log_event("exchange.circuit_reset", exchange=exchange)
     return False
 
 
+def circuit_snapshot() -> Dict[str, Dict[str, float]]:
+    """Exchanges whose circuit is open, with the remaining cooldown."""
+
+    now = time.time()
+    with _METRICS_LOCK:
+        return {
+            name: {
+                "remaining_seconds": circuit.open_until - now,
+                "trips": circuit.trips,
+            }
+            for name, circuit in _EXCHANGE_CIRCUITS.items()
+            if circuit.open_until > now
+        }
+
+
+def record_fetch_latency(duration_ms: float) -> None:
+    with _METRICS_LOCK:
+        _FETCH_LATENCIES.record(duration_ms)
+
+
+def avg_fetch_latency_ms() -> Optional[float]:
+    with _METRICS_LOCK:
+        return _FETCH_LATENCIES.mean()
+
+
+def fetch_latency_snapshot() -> Dict[str, Optional[float]]:
+    with _METRICS_LOCK:
+        return _FETCH_LATENCIES.snapshot()
+
+
 def metrics_snapshot() -> Dict[str, Dict]:
     with _METRICS_LOCK:
         return {name: asdict(metrics) for name, metrics in _EXCHANGE_METRICS.items()}
@@ -234,11 +346,16 @@ def reset_all_states() -> None:
         _EXCHANGE_METRICS.clear()
         _EXCHANGE_CIRCUITS.clear()
         _ALERT_STATE.clear()
+        _FETCH_LATENCIES.clear()
 
 
 __all__ = [
     "log_event",
     "metrics_snapshot",
+    "LatencyWindow",
+    "record_fetch_latency",
+    "avg_fetch_latency_ms",
+    "fetch_latency_snapshot",
     "record_exchange_attempt",
     "record_exchange_success",
     "record_exchange_error",
@@ -246,6 +363,7 @@ __all__ = [
     "record_exchange_skip",
     "register_degradation_alert",
     "is_circuit_open",
+    "circuit_snapshot",
     "reset_metrics",
     "reset_all_states",
     "ERROR_RATE_ALERT_THRESHOLD",
@@ -4,10 +4,12 @@ from arbitrage_telebot import (
     compute_opportunities_for_pair,
     compute_p2p_cross_opportunities,
     compute_spot_p2p_opportunities,
+    rank_opportunities,
 )
 
 __all__ = [
     "compute_opportunities_for_pair",
     "compute_p2p_cross_opportunities",
     "compute_spot_p2p_opportunities",
+    "rank_opportunities",
 ]
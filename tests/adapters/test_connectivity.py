@@ -57,3 +57,149 @@ def test_exchange_adapter_contract_smoke_with_mocked_http(monkeypatch):
         assert quote is not None
         assert quote.bid == pytest.approx(100.0)
         assert quote.ask == pytest.approx(101.0)
+
+
+def test_bulk_quotes_use_one_request_and_fall_back_for_missing_symbols(monkeypatch):
+    now_ms = bot.current_millis()
+    calls = []
+
+    def fake_http_get_json(url, params=None, **kwargs):
+        calls.append((url, dict(params or {})))
+        if "binance" in url and not params:
+            rows = [
+                {"symbol": "BTCUSDT", "bidPrice": "100.0", "askPrice": "101.0"},
+                {"symbol": "ETHUSDT", "bidPrice": "10.0", "askPrice": "10.5"},
+                {"symbol": "SOLUSDT", "bidPrice": "0", "askPrice": "0"},
+            ]
+            return bot.HttpJsonResponse(rows, "mocked", bot.current_millis())
+        if "binance" in url:
+            data = {"bidPrice": "1.0", "askPrice": "1.1", "time": now_ms}
+            return bot.HttpJsonResponse(data, "mocked", bot.current_millis())
+        if "okx" in url:
+            items = [
+                {"instId": "BTC-USDT", "bidPx": "100.0", "askPx": "101.0", "ts": str(now_ms)},
+                {"instId": "ETH-USDT", "bidPx": "10.0", "askPx": "10.5", "ts": str(now_ms)},
+                {"instId": "XRP-USDT", "bidPx": "0.5", "askPx": "0.6", "ts": str(now_ms)},
+            ]
+            return bot.HttpJsonResponse({"data": items}, "mocked", bot.current_millis())
+        if "bybit" in url:
+            items = [
+                {"symbol": "BTCUSDT", "bid1Price": "100.0", "ask1Price": "101.0"},
+                {"symbol": "ETHUSDT", "bid1Price": "10.0", "ask1Price": "10.5"},
+            ]
+            return bot.HttpJsonResponse({"result": {"list": items}, "time": now_ms}, "mocked", bot.current_millis())
+        if "kucoin" in url:
+            items = [
+                {"symbol": "BTC-USDT", "buy": "100.0", "sell": "101.0"},
+                {"symbol": "ETH-USDT", "buy": "10.0", "sell": "10.5"},
+            ]
+            return bot.HttpJsonResponse({"data": {"time": now_ms, "ticker": items}}, "mocked", bot.current_millis())
+        raise AssertionError(f"Unexpected url {url}")
+
+    monkeypatch.setattr(bot, "http_get_json", fake_http_get_json)
+    monkeypatch.setattr(bot.ExchangeAdapter, "_attach_depth", lambda self, pair, quote: quote)
+
+    quotes = Binance().fetch_quotes_bulk(["BTC/USDT", "ETH/USDT", "SOL/USDT"])
+    assert quotes["BTC/USDT"].bid == pytest.approx(100.0)
+    assert quotes["ETH/USDT"].ask == pytest.approx(10.5)
+    assert quotes["SOL/USDT"].bid == pytest.approx(1.0)
+    assert calls[0][1] == {}
+    assert calls[1][1] == {"symbol": "SOLUSDT"}
+    assert len(calls) == 2
+
+    calls.clear()
+    quotes = OKX().fetch_quotes_bulk(["BTC/USDT", "ETH/USDT"])
+    assert len(calls) == 1
+    assert set(quotes) == {"BTC/USDT", "ETH/USDT"}
+    assert quotes["ETH/USDT"].bid == pytest.approx(10.0)
+
+    for adapter_cls in (Bybit, KuCoin):
+        calls.clear()
+        quotes = adapter_cls().fetch_quotes_bulk(["BTC/USDT", "ETH/USDT"])
+        assert len(calls) == 1
+        assert "symbol" not in calls[0][1]
+        assert quotes["BTC/USDT"].bid == pytest.approx(100.0)
+        assert quotes["ETH/USDT"].ask == pytest.approx(10.5)
+
+    # Los endpoints de mercado completo no reintentan símbolos no listados.
+    for adapter_cls in (Binance, Bybit, KuCoin, OKX):
+        calls.clear()
+        quotes = adapter_cls().fetch_quotes_bulk(["BTC/USDT", "DOGE/USDT"])
+        assert len(calls) == 1
+        assert quotes["DOGE/USDT"] is None
+
+
+def test_bulk_quotes_fall_back_per_pair_when_response_has_no_market_list(monkeypatch):
+    now_ms = bot.current_millis()
+    calls = []
+
+    def fake_http_get_json(url, params=None, **kwargs):
+        params = dict(params or {})
+        calls.append((url, params))
+        if "bybit" in url:
+            if "symbol" not in params:
+                return bot.HttpJsonResponse({"retCode": 10006, "result": {}}, "mocked", bot.current_millis())
+            data = {"result": {"list": [{"bid1Price": "100.0", "ask1Price": "101.0", "time": now_ms}]}}
+        elif "kucoin" in url:
+            if "allTickers" in url:
+                return bot.HttpJsonResponse({"code": "429000", "data": None}, "mocked", bot.current_millis())
+            data = {"data": {"bestBid": "100.0", "bestAsk": "101.0", "time": now_ms}}
+        elif "okx" in url:
+            if "instId" not in params:
+                return bot.HttpJsonResponse({"code": "50011", "data": []}, "mocked", bot.current_millis())
+            data = {"data": [{"bidPx": "100.0", "askPx": "101.0", "ts": str(now_ms)}]}
+        else:
+            raise AssertionError(f"Unexpected url {url}")
+        return bot.HttpJsonResponse(data, "mocked", bot.current_millis())
+
+    monkeypatch.setattr(bot, "http_get_json", fake_http_get_json)
+    monkeypatch.setattr(bot.ExchangeAdapter, "_attach_depth", lambda self, pair, quote: quote)
+
+    for adapter_cls in (Bybit, KuCoin, OKX):
+        calls.clear()
+        quotes = adapter_cls().fetch_quotes_bulk(["BTC/USDT", "ETH/USDT"])
+        assert len(calls) == 3
+        assert quotes["BTC/USDT"].bid == pytest.approx(100.0)
+        assert quotes["ETH/USDT"] is not None
+
+
+def test_binance_bulk_quotes_survive_an_unlisted_symbol(monkeypatch):
+    calls = []
+
+    def fake_http_get_json(url, params=None, **kwargs):
+        params = dict(params or {})
+        calls.append((url, params))
+        # Binance rechaza la request completa si un símbolo no está listado.
+        if "DELISTEDUSDT" in params.get("symbols", "") or params.get("symbol") == "DELISTEDUSDT":
+            raise bot.HttpError("Invalid symbol", status_code=400)
+        rows = [
+            {"symbol": "BTCUSDT", "bidPrice": "100.0", "askPrice": "101.0"},
+            {"symbol": "ETHUSDT", "bidPrice": "10.0", "askPrice": "10.5"},
+        ]
+        return bot.HttpJsonResponse(rows, "mocked", bot.current_millis())
+
+    monkeypatch.setattr(bot, "http_get_json", fake_http_get_json)
+    monkeypatch.setattr(bot.ExchangeAdapter, "_attach_depth", lambda self, pair, quote: quote)
+
+    quotes = Binance().fetch_quotes_bulk(["BTC/USDT", "ETH/USDT", "DELISTED/USDT"])
+
+    assert len(calls) == 1
+    assert quotes["BTC/USDT"].bid == pytest.approx(100.0)
+    assert quotes["ETH/USDT"].ask == pytest.approx(10.5)
+    assert quotes["DELISTED/USDT"] is None
+
+
+def test_symbol_for_memoizes_normalized_symbols():
+    calls = []
+
+    class CountingBinance(Binance):
+        def normalize_symbol(self, pair: str) -> str:
+            calls.append(pair)
+            return super().normalize_symbol(pair)
+
+    adapter = CountingBinance()
+    adapter.prime_symbols(["BTC/USDT", "ETH/USDT"])
+
+    assert adapter.symbol_for("BTC/USDT") == "BTCUSDT"
+    assert adapter.symbol_for("ETH/USDT") == "ETHUSDT"
+    assert calls == ["BTC/USDT", "ETH/USDT"]
@@ -116,6 +116,32 @@ def test_compute_spot_p2p_opportunities_applies_execution_filters(monkeypatch):
     assert all(opp.notes.get("executable_qty_real", 0) > 0 for opp in opps)
 
 
+def test_compute_spot_p2p_opportunities_filters_each_p2p_venue_once(monkeypatch):
+    monkeypatch.setitem(bot.CONFIG, "simulation_capital_quote", 1_000)
+    calls = []
+    original = bot._p2p_quote_passes_filters
+
+    def counting_filter(venue, quote, required_notional):
+        calls.append(venue)
+        return original(venue, quote, required_notional)
+
+    monkeypatch.setattr(bot, "_p2p_quote_passes_filters", counting_filter)
+    spot_quotes = {
+        venue: bot.Quote("USDTARS", bid=1000.0, ask=1010.0, ts=1) for venue in ("binance", "bybit", "okx")
+    }
+    p2p_quotes = {
+        "binance": bot.Quote("USDTARS", bid=1040.0, ask=980.0, ts=1, source="p2p", metadata={"fiat": "ARS"})
+    }
+    fees = {
+        venue: bot.VenueFees(venue=venue, default=bot.FeeSchedule(taker_fee_percent=0.1)) for venue in spot_quotes
+    }
+
+    opps = bot.compute_spot_p2p_opportunities("USDT/ARS", spot_quotes, p2p_quotes, fees)
+
+    assert len(opps) == 6
+    assert calls == ["binance"]
+
+
 def test_http_get_json_uses_fallback_after_http_404_and_403(monkeypatch):
     calls = []
 
@@ -123,7 +149,7 @@ def test_http_get_json_uses_fallback_after_http_404_and_403(monkeypatch):
         def __init__(self, status_code, payload):
             self.status_code = status_code
             self._payload = payload
-            self.content = b"{}"
+            self.content = bot.json.dumps(payload).encode("utf-8")
 
         def json(self):
             return self._payload
@@ -138,7 +164,7 @@ def test_http_get_json_uses_fallback_after_http_404_and_403(monkeypatch):
         calls.append(url)
         return responses[url]
 
-    monkeypatch.setattr(bot.requests, "get", fake_get)
+    monkeypatch.setattr(bot.HTTP_SESSION, "get", fake_get)
     monkeypatch.setattr(bot.time, "sleep", lambda *_: None)
     monkeypatch.setattr(bot.random, "uniform", lambda *_: 0.0)
 
@@ -169,7 +195,7 @@ def test_http_get_json_uses_fallback_after_dns_like_error(monkeypatch):
 
     class FakeResponse:
         status_code = 200
-        content = b"{}"
+        content = b'{"bid": 100.0, "ask": 101.0}'
 
         @staticmethod
         def json():
@@ -181,7 +207,7 @@ def test_http_get_json_uses_fallback_after_dns_like_error(monkeypatch):
             raise bot.requests.exceptions.ConnectionError("Name or service not known")
         return FakeResponse()
 
-    monkeypatch.setattr(bot.requests, "get", fake_get)
+    monkeypatch.setattr(bot.HTTP_SESSION, "get", fake_get)
     monkeypatch.setattr(bot.time, "sleep", lambda *_: None)
     monkeypatch.setattr(bot.random, "uniform", lambda *_: 0.0)
 
@@ -68,3 +68,47 @@ def test_check_account_limit_reactivates_when_month_changes(tmp_path, monkeypatc
     assert details_blocked["scope"] == "monthly"
     assert allowed_next_month is True
     assert reason_next_month is None
+
+
+def test_account_limit_ledger_is_served_from_memory_until_file_changes(tmp_path, monkeypatch):
+    ledger_path = tmp_path / "ledger.json"
+    monkeypatch.setattr(bot, "ACCOUNT_LEDGER_CACHE", {})
+    monkeypatch.setitem(
+        bot.CONFIG,
+        "account_limits",
+        {
+            "ledger_path": str(ledger_path),
+            "venues": {"binance": {"default": {"monthly_fiat_limit": 1000.0, "cooldown_seconds": 0}}},
+        },
+    )
+
+    bot.check_account_limit("binance", fiat_amount=700.0, payment_method="SPOT", now_ts=1704067200, consume=True)
+
+    real_loads = bot.json.loads
+
+    def fail_loads(*args, **kwargs):
+        raise AssertionError("ledger sin cambios; no debería re-parsearse")
+
+    monkeypatch.setattr(bot.json, "loads", fail_loads)
+    blocked, _, details = bot.check_account_limit(
+        "binance", fiat_amount=400.0, payment_method="SPOT", now_ts=1704067300
+    )
+    assert blocked is False and details["monthly_consumed"] == 700.0
+
+    monkeypatch.setattr(bot.json, "loads", real_loads)
+    ledger_path.write_text('{"accounts": {}}', encoding="utf-8")
+    allowed, _, _ = bot.check_account_limit("binance", fiat_amount=400.0, payment_method="SPOT", now_ts=1704067300)
+    assert allowed is True
+
+
+def test_account_limits_configured_requires_a_venue_profile(monkeypatch):
+    monkeypatch.setitem(bot.CONFIG, "account_limits", {"ledger_path": "unused.json"})
+    assert bot.account_limits_configured() is False
+
+    monkeypatch.setitem(bot.CONFIG, "account_limits", {"venues": {"binance": {}}})
+    assert bot.account_limits_configured() is False
+
+    monkeypatch.setitem(
+        bot.CONFIG, "account_limits", {"venues": {"binance": {"default": {"monthly_fiat_limit": 10.0}}}}
+    )
+    assert bot.account_limits_configured() is True
@@ -52,3 +52,128 @@ def test_update_analysis_state_handles_failures(monkeypatch):
 
     assert bot.DYNAMIC_THRESHOLD_PERCENT == 0.28
     assert any(event == "analysis.error" for event, _ in events)
+
+
+def test_compute_pair_volatility_and_backtest_match_reference_formulas():
+    import statistics
+
+    rows = [
+        {"pair": "BTC/USDT", "net_%": "0.5"},
+        {"pair": "BTC/USDT", "net_%": "0.9"},
+        {"pair": "BTC/USDT", "net_%": "-0.2"},
+        {"pair": "ETH/USDT", "net_%": "0.3"},
+        {"pair": "", "net_%": "9"},
+    ]
+    volatility, max_volatility = bot.compute_pair_volatility(rows)
+
+    expected_btc = statistics.pstdev([0.5, 0.9, -0.2])
+    assert volatility["BTC/USDT"] == pytest.approx(expected_btc)
+    assert volatility["ETH/USDT"] == 0.0
+    assert max_volatility == pytest.approx(expected_btc)
+
+    params = bot.BacktestParams(
+        capital_quote=1000.0,
+        slippage_bps=5.0,
+        rebalance_bps=5.0,
+        latency_seconds=30.0,
+        latency_penalty_multiplier=1.0,
+    )
+    report, net_values, effective_values = bot.run_backtest(rows, params, volatility)
+
+    expected_effective = [
+        bot.compute_effective_net_percent(net, volatility[row["pair"]], params)
+        for row, net in zip(rows[:4], [0.5, 0.9, -0.2, 0.3])
+    ]
+    assert net_values == [0.5, 0.9, -0.2, 0.3]
+    assert effective_values == expected_effective
+    assert report.total_trades == 4
+    assert report.average_effective_percent == pytest.approx(statistics.mean(expected_effective))
+
+
+def test_compute_dynamic_threshold_matches_sorted_quantile():
+    net_values = [float(value) for value in (5, 1, 9, 3, 7, 2, 8, 6, 4, 0) * 4]
+    effective_values = [value - 0.1 for value in net_values]
+    cfg = {"target_success_rate": 0.6, "min_threshold_percent": 0.0, "max_threshold_percent": 50.0}
+
+    idx = int((1 - 0.6) * len(net_values))
+    expected_candidate = sorted(net_values)[idx] + 0.1
+    expected = 0.5 * (1.0 - (0.6 - 0.6) * 0.4) + 0.5 * expected_candidate
+
+    assert bot.compute_dynamic_threshold(net_values, effective_values, 0.6, 1.0, cfg) == pytest.approx(expected)
+    for index in (0, 1, len(net_values) - 1, idx):
+        assert bot._select_kth_smallest(net_values, index) == sorted(net_values)[index]
+
+
+def test_load_historical_series_matches_dict_rows_and_applies_lookback(tmp_path):
+    import csv
+    import time
+
+    path = tmp_path / "opportunities.csv"
+    now = int(time.time())
+    header = list(bot.LOG_HEADER)
+    samples = [
+        (now - 60, "BTC/USDT", "0.5"),
+        (now - 10 * 3600, "BTC/USDT", "9.9"),
+        (now - 30, "", "1.0"),
+        ("bad-ts", "ETH/USDT", "0.2"),
+        (now - 20, "ETH/USDT", "not-a-number"),
+    ]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for ts, pair, net in samples:
+            row = [""] * len(header)
+            row[header.index("ts")] = ts
+            row[header.index("pair")] = pair
+            row[header.index("net_%")] = net
+            writer.writerow(row)
+
+    pairs, net_values = bot.load_historical_series(str(path), lookback_hours=1)
+
+    assert pairs == ["BTC/USDT", "ETH/USDT"]
+    assert net_values == [0.5, 0.0]
+    assert (pairs, net_values) == bot._series_from_rows(bot.load_historical_rows(str(path), 1))
+
+
+def test_load_historical_series_parses_only_appended_rows(tmp_path, monkeypatch):
+    import csv
+    import time
+
+    monkeypatch.setattr(bot, "HISTORICAL_SERIES_CACHE", {})
+    path = tmp_path / "opportunities.csv"
+    header = list(bot.LOG_HEADER)
+    now = int(time.time())
+
+    def _row(ts, pair, net):
+        row = [""] * len(header)
+        row[header.index("ts")] = ts
+        row[header.index("pair")] = pair
+        row[header.index("net_%")] = net
+        return row
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerow(_row(now - 60, "BTC/USDT", "0.5"))
+
+    assert bot.load_historical_series(str(path), lookback_hours=1) == (["BTC/USDT"], [0.5])
+    offset = bot.HISTORICAL_SERIES_CACHE[str(path)].offset
+
+    bot.append_csv_rows(str(path), header, [_row(now - 30, "ETH/USDT", "0.7")])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(f"{now},SOL/USDT")  # fila a medio escribir: se ignora hasta el salto de línea
+
+    assert bot.load_historical_series(str(path), lookback_hours=1) == (["BTC/USDT", "ETH/USDT"], [0.5, 0.7])
+    assert bot.HISTORICAL_SERIES_CACHE[str(path)].offset > offset
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerow(_row(now - 10, "XRP/USDT", "1.25"))
+        writer.writerow(_row(now - 5, "ADA/USDT", "0.1"))
+        writer.writerow(_row(now - 1, "DOT/USDT", "0.2"))
+
+    assert bot.load_historical_series(str(path), lookback_hours=1) == (
+        ["XRP/USDT", "ADA/USDT", "DOT/USDT"],
+        [1.25, 0.1, 0.2],
+    )
@@ -140,3 +140,325 @@ def test_depth_cooldown_does_not_break_ticker_quote_flow(monkeypatch):
     assert request_counts["ticker"] == 2
     assert request_counts["depth"] == 1
     assert event_names.count("exchange.depth.cooldown_active") == 1
+
+
+def test_fetch_all_quotes_reuses_cached_quote_within_ttl(monkeypatch):
+    now_ms = int(time.time() * 1000)
+    monkeypatch.setattr(bot, "QUOTE_CACHE", {})
+    monkeypatch.setattr(bot, "QUOTE_CACHE_TTL_SECONDS", 60.0)
+
+    calls = []
+
+    class CountingAdapter(DummyAdapter):
+        def fetch_quote(self, pair: str):
+            calls.append(pair)
+            return super().fetch_quote(pair)
+
+    adapter = CountingAdapter({"BTC/USDT": _quote("BTC/USDT", 30000.0, 30010.0, now_ms)})
+
+    bot.fetch_all_quotes(["BTC/USDT"], {"binance": adapter})
+    pair_quotes, _ = bot.fetch_all_quotes(["BTC/USDT"], {"binance": adapter})
+
+    assert calls == ["BTC/USDT"]
+    assert "binance" in pair_quotes["BTC/USDT"]
+
+    other = CountingAdapter(adapter.quotes)
+    bot.fetch_all_quotes(["BTC/USDT"], {"binance": other})
+    assert calls == ["BTC/USDT", "BTC/USDT"]
+
+    bot.invalidate_quote_cache("binance")
+    assert bot.QUOTE_CACHE == {}
+
+
+def test_fetch_quote_coalesced_shares_inflight_request(monkeypatch):
+    now_ms = int(time.time() * 1000)
+    monkeypatch.setattr(bot, "QUOTE_INFLIGHT", {})
+    started = bot.threading.Event()
+    release = bot.threading.Event()
+    calls = []
+
+    class SlowAdapter(DummyAdapter):
+        def fetch_quote(self, pair: str):
+            calls.append(pair)
+            started.set()
+            release.wait(timeout=2)
+            return super().fetch_quote(pair)
+
+    adapter = SlowAdapter({"BTC/USDT": _quote("BTC/USDT", 30000.0, 30010.0, now_ms)})
+    results = []
+    first = bot.threading.Thread(
+        target=lambda: results.append(bot.fetch_quote_coalesced("binance", "BTC/USDT", adapter))
+    )
+    first.start()
+    assert started.wait(timeout=2)
+    second = bot.threading.Thread(
+        target=lambda: results.append(bot.fetch_quote_coalesced("binance", "BTC/USDT", adapter))
+    )
+    second.start()
+    time.sleep(0.05)
+    release.set()
+    first.join(timeout=2)
+    second.join(timeout=2)
+
+    assert calls == ["BTC/USDT"]
+    assert len(results) == 2 and results[0] is results[1]
+    assert bot.QUOTE_INFLIGHT == {}
+
+
+def test_fetch_all_quotes_caps_concurrent_requests_per_venue(monkeypatch):
+    now_ms = int(time.time() * 1000)
+    monkeypatch.setattr(bot, "QUOTE_CACHE_TTL_SECONDS", 0.0)
+    monkeypatch.setattr(bot, "QUOTE_VENUE_CONCURRENCY", 1)
+    executor = bot.ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(bot, "get_quote_executor", lambda: executor)
+    lock = bot.threading.Lock()
+    active = {"binance": 0, "okx": 0}
+    peak = {"binance": 0, "okx": 0}
+    started = []
+
+    class SlowAdapter(DummyAdapter):
+        def __init__(self, venue, quotes):
+            super().__init__(quotes)
+            self.venue = venue
+
+        def fetch_quote(self, pair: str):
+            with lock:
+                started.append((self.venue, pair))
+                active[self.venue] += 1
+                peak[self.venue] = max(peak[self.venue], active[self.venue])
+            time.sleep(0.02)
+            with lock:
+                active[self.venue] -= 1
+            return super().fetch_quote(pair)
+
+    pairs = ["BTC/USDT", "ETH/USDT", "SOL/USDT"]
+    book = {pair: _quote(pair, 100.0, 100.1, now_ms) for pair in pairs}
+    adapters = {venue: SlowAdapter(venue, book) for venue in ("binance", "okx")}
+    try:
+        quotes, _ = bot.fetch_all_quotes(pairs, adapters)
+    finally:
+        executor.shutdown(wait=True)
+
+    assert peak == {"binance": 1, "okx": 1}
+    # Un carril por venue: okx arranca sin esperar a que binance termine.
+    assert started.index(("okx", "BTC/USDT")) < started.index(("binance", "SOL/USDT"))
+    assert sorted(quotes) == pairs
+    assert all(set(venues) == {"binance", "okx"} for venues in quotes.values())
+
+
+def test_fetch_all_quotes_lane_stops_at_deadline(monkeypatch):
+    now_ms = int(time.time() * 1000)
+    monkeypatch.setattr(bot, "QUOTE_CACHE_TTL_SECONDS", 0.0)
+    monkeypatch.setattr(bot, "QUOTE_VENUE_CONCURRENCY", 1)
+    monkeypatch.setattr(bot, "QUOTE_FETCH_DEADLINE_SECONDS", 0.05)
+    executor = bot.ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(bot, "get_quote_executor", lambda: executor)
+    skips = []
+    monkeypatch.setattr(bot, "record_exchange_skip", lambda venue, reason, pair=None: skips.append((reason, pair)))
+    fetched = []
+
+    class SlowAdapter(DummyAdapter):
+        def fetch_quote(self, pair: str):
+            fetched.append(pair)
+            time.sleep(0.08)
+            return super().fetch_quote(pair)
+
+    pairs = ["BTC/USDT", "ETH/USDT", "SOL/USDT"]
+    adapter = SlowAdapter({pair: _quote(pair, 100.0, 100.1, now_ms) for pair in pairs})
+    try:
+        bot.fetch_all_quotes(pairs, {"binance": adapter})
+    finally:
+        executor.shutdown(wait=True)
+
+    assert fetched == ["BTC/USDT"]
+    assert skips == [("deadline", "ETH/USDT"), ("deadline", "SOL/USDT")]
+
+
+def test_fetch_all_quotes_skips_rate_limited_pairs_past_deadline(monkeypatch):
+    now_ms = int(time.time() * 1000)
+    monkeypatch.setattr(bot, "QUOTE_CACHE_TTL_SECONDS", 0.0)
+    monkeypatch.setattr(bot, "QUOTE_FETCH_DEADLINE_SECONDS", 5.0)
+    monkeypatch.setattr(bot, "VENUE_RATE_BUCKETS", {})
+    monkeypatch.setitem(bot.CONFIG, "venues", {"binance": {"requests_per_second": 0.01}})
+    latencies = []
+    monkeypatch.setattr(bot, "record_fetch_latency", latencies.append)
+    skips = []
+    monkeypatch.setattr(bot, "record_exchange_skip", lambda venue, reason, pair=None: skips.append((reason, pair)))
+
+    pairs = ["BTC/USDT", "ETH/USDT"]
+    adapter = DummyAdapter({pair: _quote(pair, 100.0, 100.1, now_ms) for pair in pairs})
+    started = time.monotonic()
+    quotes, _ = bot.fetch_all_quotes(pairs, {"binance": adapter})
+
+    # El bucket solo tiene un token: el segundo par esperaría 100 s.
+    assert time.monotonic() - started < 2.0
+    assert len(quotes) == 1
+    assert len(latencies) == 1
+    assert [reason for reason, _ in skips] == ["deadline"]
+
+
+def test_split_venue_lanes_round_robins_pairs():
+    assert bot.split_venue_lanes(["a", "b", "c", "d", "e"], 2) == [["a", "c", "e"], ["b", "d"]]
+    assert bot.split_venue_lanes(["a", "b"], 4) == [["a"], ["b"]]
+    assert bot.split_venue_lanes(["a", "b"], 0) == [["a"], ["b"]]
+
+
+def test_quote_cache_ttl_is_longer_for_stablecoin_pairs(monkeypatch):
+    monkeypatch.setattr(bot, "QUOTE_CACHE_TTL_SECONDS", 2.0)
+    monkeypatch.setattr(bot, "QUOTE_CACHE_STABLE_TTL_SECONDS", 15.0)
+
+    assert bot.quote_cache_ttl_for_pair("BTC/USDT") == 2.0
+    assert bot.quote_cache_ttl_for_pair("usdc/usdt") == 15.0
+
+    monkeypatch.setitem(bot.CONFIG, "quote_cache_ttl_by_pair", {"BTC/USDT": 0.5})
+    assert bot.quote_cache_ttl_for_pair("btc/usdt") == 0.5
+    assert bot.quote_cache_ttl_for_pair("ETH/USDT") == 2.0
+
+    monkeypatch.setitem(bot.CONFIG, "quote_cache_ttl_by_pair", {"btc/usdt": 1, " eth / usdt ": 3})
+    assert bot.quote_cache_ttl_for_pair("BTC/USDT") == 1.0
+    assert bot.quote_cache_ttl_for_pair("ETH/USDT") == 3.0
+
+    monkeypatch.setattr(bot, "QUOTE_CACHE_TTL_SECONDS", 0.0)
+    assert bot.quote_cache_ttl_for_pair("USDC/USDT") == 0.0
+
+
+def test_quote_refresh_loop_feeds_cache_until_stopped(monkeypatch):
+    now_ms = int(time.time() * 1000)
+    monkeypatch.setattr(bot, "QUOTE_CACHE", {})
+    monkeypatch.setattr(bot, "QUOTE_CACHE_TTL_SECONDS", 60.0)
+    monkeypatch.setitem(bot.CONFIG, "pairs", ["btc/usdt"])
+    monkeypatch.setattr(bot, "load_triangular_routes", lambda: [])
+    monkeypatch.setattr(bot, "throttle_venue_request", lambda venue, max_wait=None: 0.0)
+
+    class BulkAdapter(DummyAdapter):
+        bulk_quotes_supported = True
+
+        def fetch_quotes_bulk(self, pairs):
+            bot.QUOTE_REFRESH_STOP.set()
+            return {pair: self.quotes.get(pair) for pair in pairs}
+
+    adapter = BulkAdapter({"BTC/USDT": _quote("BTC/USDT", 30000.0, 30010.0, now_ms)})
+    monkeypatch.setattr(bot, "build_adapters", lambda: {"binance": adapter})
+    monkeypatch.setattr(bot, "is_circuit_open", lambda venue: False)
+
+    bot.QUOTE_REFRESH_STOP.clear()
+    bot._quote_refresh_loop("binance")
+
+    assert bot.get_cached_quote("binance", "BTC/USDT", adapter).bid == 30000.0
+
+
+def test_quote_refresh_loop_throttles_and_records_per_pair_outcomes(monkeypatch):
+    now_ms = int(time.time() * 1000)
+    monkeypatch.setattr(bot, "QUOTE_CACHE", {})
+    monkeypatch.setattr(bot, "QUOTE_CACHE_TTL_SECONDS", 60.0)
+    monkeypatch.setitem(bot.CONFIG, "pairs", ["BTC/USDT", "eth/usdt"])
+    monkeypatch.setattr(bot, "load_triangular_routes", lambda: [])
+    monkeypatch.setattr(bot, "configured_p2p_pairs", lambda: {})
+    monkeypatch.setattr(bot, "is_circuit_open", lambda venue: False)
+    throttled = []
+    monkeypatch.setattr(bot, "throttle_venue_request", lambda venue, max_wait=None: throttled.append(venue) or 0.0)
+    outcomes = []
+    monkeypatch.setattr(bot, "record_exchange_attempt", lambda venue, pair=None: outcomes.append(("attempt", pair)))
+    monkeypatch.setattr(bot, "record_exchange_success", lambda venue, pair=None: outcomes.append(("success", pair)))
+    monkeypatch.setattr(
+        bot, "record_exchange_error", lambda venue, error, pair=None: outcomes.append(("error", pair))
+    )
+    monkeypatch.setattr(bot, "log_event", lambda *args, **kwargs: None)
+
+    class FlakyAdapter(DummyAdapter):
+        def fetch_quote(self, pair):
+            if pair == "ETH/USDT":
+                bot.QUOTE_REFRESH_STOP.set()
+                raise bot.HttpError("boom", status_code=500)
+            return super().fetch_quote(pair)
+
+    adapter = FlakyAdapter({"BTC/USDT": _quote("BTC/USDT", 30000.0, 30010.0, now_ms)})
+    monkeypatch.setattr(bot, "build_adapters", lambda: {"kucoin": adapter})
+
+    bot.QUOTE_REFRESH_STOP.clear()
+    bot._quote_refresh_loop("kucoin")
+
+    assert throttled == ["kucoin", "kucoin"]
+    assert outcomes == [
+        ("attempt", "BTC/USDT"),
+        ("success", "BTC/USDT"),
+        ("attempt", "ETH/USDT"),
+        ("error", "ETH/USDT"),
+    ]
+    assert bot.get_cached_quote("kucoin", "BTC/USDT", adapter).bid == 30000.0
+
+
+def test_prefetch_depth_is_shared_with_get_depth(monkeypatch):
+    monkeypatch.setattr(bot, "DEPTH_CACHE", bot.DepthCache())
+    release = bot.threading.Event()
+    calls = []
+    depth = bot.DepthInfo(100.0, 101.0, 5.0, 6.0, 20, 1_700_000_000_000, "depth-checksum")
+
+    adapter = bot.Binance()
+
+    def fake_snapshot(pair):
+        calls.append(pair)
+        release.wait(timeout=2)
+        return depth
+
+    monkeypatch.setattr(adapter, "fetch_depth_snapshot", fake_snapshot)
+
+    adapter.prefetch_depth("BTC/USDT")
+    adapter.prefetch_depth("BTC/USDT")
+    release.set()
+
+    assert adapter.get_depth("BTC/USDT") is depth
+    assert calls == ["BTC/USDT"]
+    assert bot.DEPTH_INFLIGHT == {}
+
+
+def test_stale_depth_is_served_while_refreshing_without_overriding_prices(monkeypatch):
+    now_ms = {"value": 1_000_000}
+    monkeypatch.setattr(bot, "current_millis", lambda: now_ms["value"])
+    monkeypatch.setattr(bot, "DEPTH_CACHE", bot.DepthCache(ttl_ms=5_000, stale_ms=10_000))
+
+    adapter = bot.Binance()
+    stale = bot.DepthInfo(90.0, 95.0, 5.0, 6.0, 20, now_ms["value"], "old")
+    bot.DEPTH_CACHE.set(("binance", adapter.symbol_for("BTC/USDT")), stale)
+    now_ms["value"] += 7_000
+
+    prefetched = []
+    monkeypatch.setattr(adapter, "prefetch_depth", prefetched.append)
+
+    quote = bot.Quote("BTCUSDT", 100.0, 101.0, now_ms["value"])
+    attached = adapter._attach_depth("BTC/USDT", quote)
+
+    assert prefetched == ["BTC/USDT"]
+    assert attached.depth is stale
+    assert (attached.bid, attached.ask) == (100.0, 101.0)
+
+    now_ms["value"] += 10_000
+    assert bot.DEPTH_CACHE.lookup(("binance", "BTCUSDT")) == (None, False)
+
+
+def test_fetch_all_quotes_returns_at_deadline_without_slow_venue(monkeypatch):
+    now_ms = int(time.time() * 1000)
+    monkeypatch.setattr(bot, "QUOTE_CACHE", {})
+    monkeypatch.setattr(bot, "QUOTE_FETCH_DEADLINE_SECONDS", 0.2)
+    events = []
+    monkeypatch.setattr(bot, "log_event", lambda name, **payload: events.append((name, payload)))
+    release = bot.threading.Event()
+
+    class SlowAdapter(DummyAdapter):
+        def fetch_quote(self, pair: str):
+            release.wait(timeout=2)
+            return super().fetch_quote(pair)
+
+    fast = DummyAdapter({"BTC/USDT": _quote("BTC/USDT", 30000.0, 30010.0, now_ms)})
+    slow = SlowAdapter({"BTC/USDT": _quote("BTC/USDT", 30001.0, 30011.0, now_ms)})
+
+    try:
+        started = time.monotonic()
+        pair_quotes, _ = bot.fetch_all_quotes(["BTC/USDT"], {"binance": fast, "okx": slow})
+        elapsed = time.monotonic() - started
+    finally:
+        release.set()
+
+    assert elapsed < 1.5
+    assert set(pair_quotes["BTC/USDT"]) == {"binance"}
+    assert ("exchange.quote.deadline", {"deadline_seconds": 0.2, "venues": ["okx"], "cancelled": 0}) in events
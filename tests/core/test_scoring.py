@@ -127,6 +127,22 @@ def test_classify_confidence_high_medium_low():
     assert low == "baja"
 
 
+def test_venue_fees_schedule_for_pair_is_memoized_until_pair_fee_changes():
+    fees = VenueFees(
+        venue="binance",
+        default=FeeSchedule(taker_fee_percent=0.1),
+        vip_level="vip1",
+        vip_multipliers={"default": 1.0, "vip1": 0.5},
+    )
+
+    first = fees.schedule_for_pair("BTC/USDT")
+    assert first.taker_fee_percent == pytest.approx(0.05)
+    assert fees.schedule_for_pair("BTC/USDT") is first
+
+    fees.register_pair_fee("BTC/USDT", FeeSchedule(taker_fee_percent=0.2))
+    assert fees.schedule_for_pair("BTC/USDT").taker_fee_percent == pytest.approx(0.1)
+
+
 def test_compute_triangular_opportunity_applies_fees():
     route = TriangularRoute(
         name="USDT-USDC-BUSD",
@@ -153,6 +169,70 @@ def test_compute_triangular_opportunity_applies_fees():
     assert pytest.approx(0.6973, rel=1e-3) == opportunity.net_percent
 
 
+def test_compute_triangular_opportunity_mixes_buy_and_sell_legs():
+    route = TriangularRoute(
+        name="USDT-BTC-ETH",
+        venue="binance",
+        start_asset="USDT",
+        legs=[
+            TriangleLeg(pair="BTC/USDT", action="buy_base"),
+            TriangleLeg(pair="ETH/BTC", action="BUY_BASE"),
+            TriangleLeg(pair="ETH/USDT", action="SELL_BASE"),
+        ],
+    )
+    quotes = {
+        "BTC/USDT": {"binance": make_quote("BTCUSDT", bid=49_990.0, ask=50_000.0)},
+        "ETH/BTC": {"binance": make_quote("ETHBTC", bid=0.0499, ask=0.05)},
+        "ETH/USDT": {"binance": make_quote("ETHUSDT", bid=2_550.0, ask=2_551.0)},
+    }
+    fees = {"binance": VenueFees(venue="binance", default=FeeSchedule(taker_fee_percent=0.1))}
+
+    opportunity = compute_triangular_opportunity(route, quotes, fees, start_capital=1_000.0)
+
+    expected_gross = 1_000.0 / 50_000.0 / 0.05 * 2_550.0
+    assert opportunity.final_capital_gross == pytest.approx(expected_gross)
+    assert opportunity.final_capital_net == pytest.approx(expected_gross * 0.999**3)
+    assert [price for _, price in opportunity.leg_prices] == [50_000.0, 0.05, 2_550.0]
+
+
+def test_discover_triangular_routes_finds_profitable_cycle():
+    quotes = {
+        "BTC/USDT": {"binance": make_quote("BTCUSDT", bid=99.9, ask=100.0)},
+        "ETH/BTC": {"binance": make_quote("ETHBTC", bid=0.0499, ask=0.05)},
+        "ETH/USDT": {"binance": make_quote("ETHUSDT", bid=5.1, ask=5.11)},
+    }
+    fees = {"binance": VenueFees(venue="binance", default=FeeSchedule(taker_fee_percent=0.1))}
+
+    routes = bot.discover_triangular_routes(quotes, fees)
+
+    assert len(routes) == 1
+    route = routes[0]
+    assert route.start_asset == "USDT"
+    assert [(leg.pair, leg.action) for leg in route.legs] == [
+        ("BTC/USDT", "BUY_BASE"),
+        ("ETH/BTC", "BUY_BASE"),
+        ("ETH/USDT", "SELL_BASE"),
+    ]
+    opportunity = compute_triangular_opportunity(route, quotes, fees, start_capital=100.0)
+    assert opportunity.net_percent > 0
+
+    quotes["ETH/USDT"]["binance"] = make_quote("ETHUSDT", bid=4.99, ask=5.0)
+    assert bot.discover_triangular_routes(quotes, fees) == []
+
+
+def test_compute_triangular_opportunity_rejects_unknown_action():
+    route = TriangularRoute(
+        name="bad",
+        venue="binance",
+        start_asset="USDT",
+        legs=[TriangleLeg(pair="BTC/USDT", action="HOLD")],
+    )
+    quotes = {"BTC/USDT": {"binance": make_quote("BTCUSDT", bid=49_990.0, ask=50_000.0)}}
+    fees = {"binance": VenueFees(venue="binance", default=FeeSchedule(taker_fee_percent=0.1))}
+
+    assert compute_triangular_opportunity(route, quotes, fees, start_capital=100.0) is None
+
+
 def test_build_degradation_alerts_triggers_and_debounces():
     reset_all_states()
     snapshot = {
@@ -261,3 +341,340 @@ def test_compute_p2p_cross_opportunities_populates_execution_notes(monkeypatch):
     assert top.notes["buy_payment_method"] == "BANK_TRANSFER"
     assert top.notes["sell_payment_method"] == "BANK_TRANSFER"
     assert top.notes["executable_qty_real"] > 0
+
+
+def test_compute_opportunities_for_pair_top_k_keeps_best_ranked():
+    quotes = {
+        "binance": make_quote("BTCUSDT", bid=100.0, ask=100.5),
+        "bybit": make_quote("BTCUSDT", bid=102.0, ask=102.5),
+        "okx": make_quote("BTCUSDT", bid=101.0, ask=101.5),
+    }
+    fees = {
+        venue: VenueFees(venue=venue, default=FeeSchedule(taker_fee_percent=0.0))
+        for venue in quotes
+    }
+
+    full = bot.compute_opportunities_for_pair("BTC/USDT", quotes, fees)
+    top = bot.compute_opportunities_for_pair("BTC/USDT", quotes, fees, top_k=2)
+
+    assert len(full) == 6
+    assert [(o.buy_venue, o.sell_venue) for o in top] == [
+        (o.buy_venue, o.sell_venue) for o in full[:2]
+    ]
+    assert top[0].buy_venue == "binance" and top[0].sell_venue == "bybit"
+
+
+def test_compute_opportunities_for_pair_min_net_percent_drops_losing_routes():
+    quotes = {
+        "binance": make_quote("BTCUSDT", bid=100.0, ask=100.5),
+        "bybit": make_quote("BTCUSDT", bid=102.0, ask=102.5),
+        "okx": make_quote("BTCUSDT", bid=101.0, ask=101.5),
+    }
+    fees = {
+        venue: VenueFees(venue=venue, default=FeeSchedule(taker_fee_percent=0.0))
+        for venue in quotes
+    }
+
+    full = bot.compute_opportunities_for_pair("BTC/USDT", quotes, fees)
+    filtered = bot.compute_opportunities_for_pair("BTC/USDT", quotes, fees, min_net_percent=0.0)
+
+    assert filtered == [o for o in full if o.net_percent >= 0.0]
+    assert all(o.net_percent >= 0.0 for o in filtered)
+    assert len(filtered) < len(full)
+
+
+def test_compute_opportunities_for_pair_pruned_scan_matches_exhaustive_search():
+    import random
+
+    rng = random.Random(7)
+    venues = ["binance", "bybit", "okx", "kucoin", "bitget"]
+    for _ in range(50):
+        quotes = {}
+        for venue in venues:
+            ask = rng.uniform(99.0, 101.0)
+            quotes[venue] = make_quote("BTCUSDT", bid=ask - rng.uniform(0.0, 0.5), ask=ask)
+        fees = {
+            venue: VenueFees(venue=venue, default=FeeSchedule(taker_fee_percent=rng.choice([0.0, 0.1, 0.2])))
+            for venue in venues
+        }
+        full = bot.compute_opportunities_for_pair("BTC/USDT", quotes, fees)
+        threshold = rng.uniform(-0.5, 1.0)
+        filtered = bot.compute_opportunities_for_pair("BTC/USDT", quotes, fees, min_net_percent=threshold)
+
+        assert len(full) == len(venues) * (len(venues) - 1)
+        assert filtered == [o for o in full if o.net_percent >= threshold]
+
+
+def test_compute_opportunities_for_pair_threshold_ignores_configured_slippage():
+    quotes = {
+        "binance": make_quote("USDTARS", bid=99.9, ask=100.0),
+        "bybit": make_quote("USDTARS", bid=100.8, ask=100.9),
+    }
+    fees = {
+        venue: VenueFees(venue=venue, default=FeeSchedule(taker_fee_percent=0.1, slippage_bps=30.0))
+        for venue in quotes
+    }
+
+    opps = bot.compute_opportunities_for_pair("USDT/ARS", quotes, fees, min_net_percent=0.5)
+
+    # Con slippage el neto modelado es ~0%, pero el top of book deja 0.6%:
+    # el VWAP de run_once todavía puede alertar, así que no se poda.
+    assert [(o.buy_venue, o.sell_venue) for o in opps] == [("binance", "bybit")]
+    assert opps[0].net_percent < 0.5
+
+
+def test_compute_opportunities_for_pair_threshold_keeps_every_reachable_route():
+    import random
+
+    rng = random.Random(23)
+    venues = ["binance", "bybit", "okx", "kucoin", "bitget"]
+    for _ in range(50):
+        quotes = {}
+        for venue in venues:
+            ask = rng.uniform(99.0, 101.0)
+            quotes[venue] = make_quote("BTCUSDT", bid=ask - rng.uniform(0.0, 0.5), ask=ask)
+        fees = {
+            venue: VenueFees(
+                venue=venue,
+                default=FeeSchedule(
+                    taker_fee_percent=rng.choice([0.0, 0.1, 0.2]),
+                    slippage_bps=rng.choice([0.0, 15.0, 35.0]),
+                ),
+            )
+            for venue in venues
+        }
+        full = bot.compute_opportunities_for_pair("BTC/USDT", quotes, fees)
+        threshold = rng.uniform(-0.5, 1.0)
+
+        def reachable(opp):
+            raw_ask = quotes[opp.buy_venue].ask
+            raw_bid = quotes[opp.sell_venue].bid
+            return (raw_bid - raw_ask) / raw_ask * 100 - opp.total_fee_percent >= threshold
+
+        expected = [o for o in full if reachable(o)]
+        assert bot.compute_opportunities_for_pair("BTC/USDT", quotes, fees, min_net_percent=threshold) == expected
+        assert (
+            bot.compute_opportunities_for_pair("BTC/USDT", quotes, fees, top_k=2, min_net_percent=threshold)
+            == expected[:2]
+        )
+
+
+def test_compute_opportunities_for_pair_top_k_bound_matches_full_ranking():
+    import random
+
+    rng = random.Random(11)
+    venues = ["binance", "bybit", "okx", "kucoin", "bitget", "gate"]
+    for _ in range(50):
+        quotes = {}
+        for venue in venues:
+            ask = round(rng.uniform(99.0, 101.0), 1)
+            quotes[venue] = make_quote("BTCUSDT", bid=ask - rng.choice([0.1, 0.2]), ask=ask)
+        fees = {
+            venue: VenueFees(venue=venue, default=FeeSchedule(taker_fee_percent=rng.choice([0.1, 0.1, 0.2])))
+            for venue in venues
+        }
+        full = bot.compute_opportunities_for_pair("BTC/USDT", quotes, fees)
+        for k in (1, 3, 5):
+            assert bot.compute_opportunities_for_pair("BTC/USDT", quotes, fees, top_k=k) == full[:k]
+        threshold = rng.uniform(-0.5, 1.0)
+        expected = [o for o in full if o.net_percent >= threshold][:2]
+        assert (
+            bot.compute_opportunities_for_pair("BTC/USDT", quotes, fees, top_k=2, min_net_percent=threshold)
+            == expected
+        )
+
+
+def test_compute_opportunities_for_pair_two_venues_yields_both_directions():
+    quotes = {
+        "binance": make_quote("BTCUSDT", bid=100.0, ask=100.5),
+        "bybit": make_quote("BTCUSDT", bid=102.0, ask=102.5),
+    }
+    fees = {
+        "binance": VenueFees(venue="binance", default=FeeSchedule(taker_fee_percent=0.1)),
+        "bybit": VenueFees(venue="bybit", default=FeeSchedule(taker_fee_percent=0.1, slippage_bps=10.0)),
+    }
+
+    opps = bot.compute_opportunities_for_pair("BTC/USDT", quotes, fees)
+
+    assert [(o.buy_venue, o.sell_venue) for o in opps] == [("binance", "bybit"), ("bybit", "binance")]
+    best = opps[0]
+    assert best.sell_price == pytest.approx(102.0 * (1 - 0.001))
+    assert best.net_percent == pytest.approx((best.sell_price - 100.5) / 100.5 * 100 - 0.2)
+    assert best.total_fee_percent == pytest.approx(0.2)
+
+
+def test_compute_opportunities_for_pair_top_k_skips_rejected_candidates():
+    quotes = {
+        "binance": make_quote("BTCUSDT", bid=100.0, ask=100.5),
+        "bybit": make_quote("BTCUSDT", bid=102.0, ask=102.5),
+        "okx": make_quote("BTCUSDT", bid=101.0, ask=101.5),
+    }
+    fees = {
+        venue: VenueFees(venue=venue, default=FeeSchedule(taker_fee_percent=0.0))
+        for venue in quotes
+    }
+    checked = []
+
+    def checker(opp):
+        checked.append((opp.buy_venue, opp.sell_venue))
+        if opp.buy_venue == "binance" and opp.sell_venue == "bybit":
+            return False, "limit", {}
+        return True, None, {}
+
+    opps = bot.compute_opportunities_for_pair(
+        "BTC/USDT", quotes, fees, account_limit_checker=checker, top_k=1
+    )
+
+    assert [(o.buy_venue, o.sell_venue) for o in opps] == [("binance", "okx")]
+    assert len(checked) == 2
+
+
+def test_build_adapters_and_fee_map_are_reused_until_config_changes(monkeypatch):
+    venues = {
+        "binance": {"enabled": True, "taker_fee_percent": 0.1},
+        "bybit": {"enabled": True, "taker_fee_percent": 0.1},
+    }
+    monkeypatch.setitem(bot.CONFIG, "venues", venues)
+
+    first = bot.build_adapters()
+    assert bot.build_adapters()["binance"] is first["binance"]
+    fees = bot.build_fee_map(["BTC/USDT"])
+    assert bot.build_fee_map(["BTC/USDT"])["bybit"] is fees["bybit"]
+
+    venues["bybit"] = {"enabled": False}
+    assert set(bot.build_adapters()) == {"binance"}
+    venues["binance"]["taker_fee_percent"] = 0.2
+    assert bot.build_fee_map(["BTC/USDT"])["binance"].default.taker_fee_percent == 0.2
+
+    venues["binance"]["transfers"] = {"usdt": {"withdraw_fee": 1.0}}
+    transfers = bot.build_transfer_profiles()
+    assert bot.build_transfer_profiles()["binance"] is transfers["binance"]
+    venues["binance"]["transfers"]["usdt"]["withdraw_fee"] = 2.0
+    assert bot.build_transfer_profiles()["binance"].profile("USDT").withdraw_fee == 2.0
+
+
+def test_build_adapters_primes_symbols_for_triangular_legs(monkeypatch):
+    monkeypatch.setattr(bot, "ADAPTERS_CACHE", None)
+    monkeypatch.setitem(bot.CONFIG, "venues", {"okx": {"enabled": True}})
+    monkeypatch.setitem(bot.CONFIG, "pairs", ["BTC/USDT"])
+    monkeypatch.setitem(
+        bot.CONFIG,
+        "triangular_routes",
+        [{"name": "tri", "venue": "okx", "legs": [{"pair": "eth/btc", "action": "BUY_BASE"}]}],
+    )
+
+    adapter = bot.build_adapters()["okx"]
+
+    assert adapter._symbol_map == {"BTC/USDT": "BTC-USDT", "ETH/BTC": "ETH-BTC"}
+
+
+def test_rebuild_adapters_reprimes_symbols_for_new_pairs(monkeypatch):
+    monkeypatch.setattr(bot, "ADAPTERS_CACHE", None)
+    monkeypatch.setattr(bot, "FEE_MAP_CACHE", None)
+    monkeypatch.setitem(bot.CONFIG, "venues", {"okx": {"enabled": True}})
+    monkeypatch.setitem(bot.CONFIG, "pairs", ["BTC/USDT"])
+    monkeypatch.setitem(bot.CONFIG, "triangular_routes", [])
+
+    first = bot.build_adapters()["okx"]
+    bot.build_fee_map(["BTC/USDT"])
+    bot.CONFIG["pairs"] = ["BTC/USDT", "ETH/USDT"]
+    assert bot.build_adapters()["okx"] is first
+
+    rebuilt = bot.rebuild_adapters()["okx"]
+
+    assert rebuilt is not first
+    assert "ETH/USDT" in rebuilt._symbol_map
+    assert bot.FEE_MAP_CACHE is None
+    assert bot.build_adapters()["okx"] is rebuilt
+
+
+def test_load_triangular_routes_reuses_parsed_routes_until_config_changes(monkeypatch):
+    routes_cfg = [{"name": "tri", "venue": "okx", "legs": [{"pair": "eth/btc", "action": "buy_base"}]}]
+    monkeypatch.setitem(bot.CONFIG, "triangular_routes", routes_cfg)
+
+    first = bot.load_triangular_routes()
+    second = bot.load_triangular_routes()
+    assert first[0] is second[0]
+    assert first[0].legs[0].action == "BUY_BASE"
+
+    monkeypatch.setitem(bot.CONFIG, "triangular_routes", routes_cfg + [{"name": "other", "venue": "", "legs": []}])
+    assert bot.load_triangular_routes()[0] is not first[0]
+
+
+def test_hot_path_dataclasses_use_slots():
+    quote = make_quote("BTCUSDT", bid=100.0, ask=100.5)
+
+    assert not hasattr(quote, "__dict__")
+    assert not hasattr(bot.Opportunity("BTC/USDT", "a", "b", 1.0, 2.0, 1.0, 1.0), "__dict__")
+    quote.bid = 99.0
+    assert quote.bid == 99.0
+    for cls in (
+        bot.BacktestParams,
+        bot.BacktestReport,
+        bot.HistoricalAnalysis,
+        bot.AccountLimitProfile,
+        bot.HttpJsonResponse,
+        bot.TransferEstimate,
+        bot.TransferProfile,
+        bot.TriangleLeg,
+        bot.TriangularRoute,
+        bot.TriangularOpportunity,
+        bot.VenueTransfers,
+    ):
+        assert "__slots__" in vars(cls)
+
+
+def test_compute_opportunities_for_pair_best_only_pairs_min_ask_with_max_bid():
+    quotes = {
+        "binance": make_quote("BTCUSDT", bid=103.0, ask=100.0),
+        "bybit": make_quote("BTCUSDT", bid=101.0, ask=101.5),
+        "okx": make_quote("BTCUSDT", bid=100.5, ask=102.0),
+    }
+    fees = {
+        venue: VenueFees(venue=venue, default=FeeSchedule(taker_fee_percent=0.1))
+        for venue in quotes
+    }
+
+    best = bot.compute_opportunities_for_pair("BTC/USDT", quotes, fees, scan_mode="best_only")
+    full = bot.compute_opportunities_for_pair("BTC/USDT", quotes, fees)
+
+    # min-ask y max-bid caen en binance: se cruza con el segundo mejor lado.
+    assert [(o.buy_venue, o.sell_venue) for o in best] == [("bybit", "binance")]
+    assert best == full[:1]
+    assert bot.compute_opportunities_for_pair(
+        "BTC/USDT", quotes, fees, min_net_percent=5.0, scan_mode="best_only"
+    ) == []
+
+
+def test_rank_opportunities_checks_limits_lazily_in_ranked_order():
+    opps = [
+        Opportunity("USDT/ARS", venue, "x_p2p", 1.0, 1.0, net, net, strategy="p2p_p2p")
+        for venue, net in (("a", 0.5), ("b", 2.0), ("c", 1.0), ("d", 1.0), ("e", -1.0))
+    ]
+    checked = []
+
+    def checker(opp):
+        checked.append(opp.buy_venue)
+        return opp.buy_venue != "b", "limit", {}
+
+    ranked = bot.rank_opportunities(opps, top_k=2, account_limit_checker=checker)
+
+    assert [o.buy_venue for o in ranked] == ["c", "d"]
+    assert checked == ["b", "c", "d"]
+    assert bot.rank_opportunities(opps, account_limit_checker=lambda o: (True, None, {})) == bot.rank_opportunities(opps)
+
+
+def test_estimate_profit_matches_expanded_formula():
+    capital, buy, sell, fee = 1_000.0, 100.0, 101.5, 0.2
+
+    profit, net_pct, base_qty, capital_used = bot.estimate_profit(capital, buy, sell, fee)
+
+    assert base_qty == pytest.approx(10.0)
+    assert capital_used == pytest.approx(1_000.0)
+    assert profit == pytest.approx(base_qty * sell - capital_used - fee / 100.0 * capital_used)
+    assert net_pct == pytest.approx(1.3)
+
+    capped = bot.estimate_profit(capital, buy, sell, fee, max_base_qty=4.0)
+    assert capped[2] == 4.0 and capped[3] == pytest.approx(400.0)
+    assert capped[1] == pytest.approx(net_pct)
+    assert bot.estimate_profit(capital, 0.0, sell, fee) == (0.0, 0.0, 0.0, 0.0)
@@ -3,7 +3,7 @@ from typing import Optional
 
 import pytest
 
-from arbitrage_telebot import ExchangeAdapter, Quote, diagnose_exchange_pairs
+from arbitrage_telebot import ExchangeAdapter, Quote, diagnose_exchange_pairs, get_quote_executor
 
 
 class _BaseAdapter(ExchangeAdapter):
@@ -83,3 +83,12 @@ def test_diagnose_exchange_pairs_returns_statuses():
 
 def test_diagnose_exchange_pairs_handles_empty_inputs():
     assert diagnose_exchange_pairs([], {}) == []
+
+
+def test_diagnose_exchange_pairs_reuses_shared_quote_executor():
+    executor = get_quote_executor()
+    results = diagnose_exchange_pairs(["BTC/USDT", "ETH/USDT"], {"good": _GoodAdapter()})
+
+    assert sorted(item["pair"] for item in results) == ["BTC/USDT", "ETH/USDT"]
+    assert all(item["status"] == "ok" for item in results)
+    assert get_quote_executor() is executor
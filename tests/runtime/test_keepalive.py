@@ -26,3 +26,9 @@ def test_ensure_keepalive_thread_skips_without_url(monkeypatch):
     bot.ensure_keepalive_thread()
 
     assert any(event == "keepalive.skip" and payload.get("reason") == "missing_url" for event, payload in events)
+
+
+def test_next_loop_tick_keeps_fixed_rate_and_skips_missed_ticks():
+    assert bot.next_loop_tick(100.0, 30.0, 112.0) == (130.0, 0)
+    assert bot.next_loop_tick(100.0, 30.0, 130.0) == (160.0, 1)
+    assert bot.next_loop_tick(100.0, 30.0, 195.0) == (220.0, 3)
@@ -26,3 +26,145 @@ def test_emit_pair_coverage_logs_structured_event(monkeypatch):
     ]
     assert printed == ["[COVERAGE] BTC/USDT: ['binance', 'bybit']"]
 
+
+
+def test_ensure_log_header_checks_disk_once_per_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "logs" / "opps.csv")
+    bot.ensure_log_header(path)
+
+    def fail_exists(_path):
+        raise AssertionError("header ya verificado; no debería volver a hacer stat")
+
+    monkeypatch.setattr(bot.os.path, "exists", fail_exists)
+    bot.ensure_log_header(path)
+
+    with open(path, encoding="utf-8") as fh:
+        assert fh.read().strip() == ",".join(bot.LOG_HEADER)
+
+
+def test_append_csv_rows_writes_batch_with_single_header(tmp_path):
+    path = str(tmp_path / "tri.csv")
+    bot.append_csv_rows(path, ["a", "b"], [[1, 2], [3, 4]])
+    bot.append_csv_rows(path, ["a", "b"], [])
+    bot.append_csv_rows(path, ["a", "b"], [[5, 6]])
+
+    with open(path, encoding="utf-8") as fh:
+        assert fh.read().splitlines() == ["a,b", "1,2", "3,4", "5,6"]
+
+
+def test_append_csv_rows_restores_header_after_file_removed(tmp_path):
+    path = str(tmp_path / "rotated.csv")
+    bot.append_csv_rows(path, ["a", "b"], [[1, 2]])
+    bot.os.remove(path)
+    bot.append_csv_rows(path, ["a", "b"], [[3, 4]])
+
+    with open(path, encoding="utf-8") as fh:
+        assert fh.read().splitlines() == ["a,b", "3,4"]
+
+
+def test_append_csv_rows_skips_init_syscalls_and_recovers_removed_directory(tmp_path, monkeypatch):
+    path = str(tmp_path / "logs" / "opps.csv")
+    bot.append_csv_rows(path, ["a", "b"], [[1, 2]])
+
+    calls = []
+    monkeypatch.setattr(bot.os, "makedirs", lambda *args, **kwargs: calls.append("makedirs"))
+    bot.append_csv_rows(path, ["a", "b"], [[3, 4]])
+    assert calls == []
+    monkeypatch.undo()
+
+    bot.shutil.rmtree(tmp_path / "logs")
+    bot.append_csv_rows(path, ["a", "b"], [[5, 6]])
+
+    with open(path, encoding="utf-8") as fh:
+        assert fh.read().splitlines() == ["a,b", "5,6"]
+
+
+def test_ensure_csv_header_migrates_only_on_schema_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot, "log_event", lambda *args, **kwargs: None)
+    path = str(tmp_path / "signals.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("ts,pair\n1,BTC/USDT\n2,ETH/USDT\n")
+
+    bot._ensure_csv_header(path, ["ts", "pair", "net_%"])
+
+    with open(path, encoding="utf-8") as f:
+        assert f.read().splitlines() == ["ts,pair,net_%", "1,BTC/USDT,", "2,ETH/USDT,"]
+
+    same_header = str(tmp_path / "same.csv")
+    with open(same_header, "w", encoding="utf-8") as f:
+        f.write("ts,pair\n1,BTC/USDT\n")
+    monkeypatch.setattr(bot, "_migrate_csv_header", lambda *args: (_ for _ in ()).throw(AssertionError()))
+    bot._ensure_csv_header(same_header, ["ts", "pair"])
+
+
+def test_ensure_csv_header_strips_bom_before_comparing(tmp_path, monkeypatch):
+    events = []
+    monkeypatch.setattr(bot, "log_event", lambda event, **fields: events.append(event))
+    path = str(tmp_path / "signals.csv")
+    with open(path, "w", encoding="utf-8-sig") as f:
+        f.write("ts,pair\n1,BTC/USDT\n")
+
+    bot._ensure_csv_header(path, ["ts", "pair"])
+    assert events == []
+
+    bot.CSV_HEADER_READY.discard(path)
+    bot._ensure_csv_header(path, ["ts", "pair", "net_%"])
+    with open(path, encoding="utf-8") as f:
+        assert f.read().splitlines() == ["ts,pair,net_%", "1,BTC/USDT,"]
+    assert events == ["csv.header_migrated"]
+
+
+def test_ensure_csv_header_backs_up_headerless_file_instead_of_rewriting(tmp_path, monkeypatch):
+    events = []
+    monkeypatch.setattr(bot, "log_event", lambda event, **fields: events.append((event, fields)))
+    monkeypatch.setattr(bot, "LOG_BACKUP_DIR", str(tmp_path / "backups"))
+    path = str(tmp_path / "signals.csv")
+    content = "1,BTC/USDT\n2,ETH/USDT\n"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+    bot._ensure_csv_header(path, ["ts", "pair"])
+
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == content
+    assert [event for event, _ in events] == ["csv.header_unrecognized"]
+    backup = events[0][1]["backup"]
+    with open(backup, encoding="utf-8") as f:
+        assert f.read() == content
+
+
+def test_buffered_csv_rows_reuse_one_handle_until_flushed(tmp_path, monkeypatch):
+    path = str(tmp_path / "lifecycle.csv")
+    monkeypatch.setattr(bot, "CSV_BUFFERED_HANDLES", {})
+    monkeypatch.setattr(bot, "CSV_BUFFERED_LAST_FLUSH", bot.time.monotonic())
+
+    bot._append_csv_row_buffered(path, ["a", "b"], [1, 2])
+    handle = bot.CSV_BUFFERED_HANDLES[path][0]
+    bot._append_csv_row_buffered(path, ["a", "b"], [3, 4])
+
+    assert bot.CSV_BUFFERED_HANDLES[path][0] is handle
+    bot.flush_buffered_csv(close=True)
+    assert bot.CSV_BUFFERED_HANDLES == {}
+    with open(path, encoding="utf-8") as fh:
+        assert fh.read().splitlines() == ["a,b", "1,2", "3,4"]
+
+
+def test_ensure_log_backups_skips_unchanged_files(tmp_path, monkeypatch):
+    backup_dir = tmp_path / "backups"
+    monkeypatch.setattr(bot, "LOG_BACKUP_DIR", str(backup_dir))
+    monkeypatch.setattr(bot, "LOG_BACKUP_SIGNATURES", {})
+    path = tmp_path / "opps.csv"
+    path.write_text("ts,pair\n1,BTC/USDT\n", encoding="utf-8")
+
+    copies = []
+    real_copy = bot.shutil.copy2
+    monkeypatch.setattr(bot.shutil, "copy2", lambda src, dst: copies.append(dst) or real_copy(src, dst))
+
+    bot.ensure_log_backups([str(path), ""])
+    bot.ensure_log_backups([str(path)])
+    assert len(copies) == 1
+
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write("2,ETH/USDT\n")
+    bot.ensure_log_backups([str(path)])
+    assert len(copies) == 2
@@ -32,3 +32,20 @@ def test_tg_handle_command_test_sends_inline_keyboard_when_links_exist(monkeypat
     assert buttons[0][0]["text"] == "Comprar en Binance"
     assert buttons[1][0]["text"] == "Vender en Bybit"
     assert "*Acciones rápidas:* Comprar en Binance · Vender en Bybit" in payloads[0]["text"]
+
+
+def test_alert_timestamp_text_formats_once_per_second(monkeypatch):
+    calls = []
+    real_strftime = bot.time.strftime
+
+    def counting_strftime(fmt, *args):
+        calls.append(fmt)
+        return real_strftime(fmt, *args)
+
+    monkeypatch.setattr(bot.time, "strftime", counting_strftime)
+    monkeypatch.setattr(bot, "ALERT_TIMESTAMP_CACHE", (-1, ""))
+
+    first = bot.alert_timestamp_text(1_700_000_000.2)
+    assert bot.alert_timestamp_text(1_700_000_000.9) == first
+    assert bot.alert_timestamp_text(1_700_000_001.0) != first
+    assert len(calls) == 2
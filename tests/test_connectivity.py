@@ -2,6 +2,7 @@ from unittest.mock import Mock
 
 import pytest
 
+import arbitrage_telebot as bot
 from arbitrage_telebot import HttpError, http_get_json, http_post_json
 
 
@@ -20,7 +21,7 @@ def test_http_get_json_parse_failure_includes_context(monkeypatch, content_type,
     response.headers = {"Content-Type": content_type}
     response.json.side_effect = ValueError("invalid json")
 
-    monkeypatch.setattr("arbitrage_telebot.requests.get", lambda *args, **kwargs: response)
+    monkeypatch.setattr("arbitrage_telebot.HTTP_SESSION.get", lambda *args, **kwargs: response)
 
     url = "https://api.example.com/ticker"
     with pytest.raises(HttpError) as exc_info:
@@ -42,7 +43,7 @@ def test_http_post_json_parse_failure_includes_context(monkeypatch):
     response.headers = {"Content-Type": "text/html"}
     response.json.side_effect = ValueError("invalid json")
 
-    monkeypatch.setattr("arbitrage_telebot.requests.post", lambda *args, **kwargs: response)
+    monkeypatch.setattr("arbitrage_telebot.HTTP_SESSION.post", lambda *args, **kwargs: response)
 
     url = "https://api.example.com/order"
     with pytest.raises(HttpError) as exc_info:
@@ -53,3 +54,105 @@ def test_http_post_json_parse_failure_includes_context(monkeypatch):
     assert "status=200" in message
     assert "text/html" in message
     assert body[:200] in message
+
+
+def test_http_get_json_honours_retry_after_and_skips_final_sleep(monkeypatch):
+    limited = Mock(status_code=429, content=b"", headers={"Retry-After": "2"})
+    ok = Mock(status_code=200, content=b'{"ok": true}', headers={})
+    responses = [limited, ok, limited, limited]
+    sleeps = []
+
+    monkeypatch.setattr("arbitrage_telebot.HTTP_SESSION.get", lambda *args, **kwargs: responses.pop(0))
+    monkeypatch.setattr(bot.time, "sleep", sleeps.append)
+
+    assert http_get_json("https://api.example.com/ticker", retries=2).data == {"ok": True}
+    assert sleeps == [2.0]
+
+    with pytest.raises(HttpError) as exc_info:
+        http_get_json("https://api.example.com/ticker", retries=2)
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.retry_after == 2.0
+    assert sleeps == [2.0, 2.0]
+
+
+def test_throttle_venue_request_uses_per_venue_rate(monkeypatch):
+    monkeypatch.setattr(bot, "VENUE_RATE_BUCKETS", {})
+    monkeypatch.setitem(bot.CONFIG, "venues", {"okx": {"requests_per_second": 1}, "kucoin": {"requests_per_second": 0}})
+    clock = [100.0]
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(bot.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(bot.time, "sleep", fake_sleep)
+
+    assert bot.throttle_venue_request("okx") == 0.0
+    assert bot.throttle_venue_request("okx") == 0.0
+    assert bot.throttle_venue_request("okx") == pytest.approx(1.0)
+    assert sleeps == [pytest.approx(1.0)]
+    for _ in range(5):
+        assert bot.throttle_venue_request("kucoin") == 0.0
+    assert "kucoin" not in bot.VENUE_RATE_BUCKETS
+
+
+def test_throttle_venue_request_gives_up_past_max_wait(monkeypatch):
+    monkeypatch.setattr(bot, "VENUE_RATE_BUCKETS", {})
+    monkeypatch.setitem(bot.CONFIG, "venues", {"okx": {"requests_per_second": 1}})
+    clock = [100.0]
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(bot.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(bot.time, "sleep", fake_sleep)
+
+    assert bot.throttle_venue_request("okx") == 0.0
+    assert bot.throttle_venue_request("okx") == 0.0
+    assert bot.throttle_venue_request("okx", max_wait=0.5) is None
+    assert sleeps == []
+    assert bot.throttle_venue_request("okx", max_wait=1.0) == pytest.approx(1.0)
+    assert sleeps == [pytest.approx(1.0)]
+
+
+def test_loads_json_bytes_falls_back_to_stdlib_without_orjson(monkeypatch):
+    monkeypatch.setattr(bot, "orjson", None)
+
+    assert bot.loads_json_bytes(b'{"ok": true, "result": [1, 2]}') == {"ok": True, "result": [1, 2]}
+
+
+def test_dumps_json_bytes_round_trips_with_and_without_orjson(monkeypatch):
+    payload = {"pair": "BTC/USDT", "venues": ("binance", "okx"), 1: "ñ", "big": 2**70}
+
+    encoded = bot.dumps_json_bytes(payload)
+    assert bot.json.loads(encoded) == {"pair": "BTC/USDT", "venues": ["binance", "okx"], "1": "ñ", "big": 2**70}
+
+    monkeypatch.setattr(bot, "orjson", None)
+    assert bot.json.loads(bot.dumps_json_bytes(payload)) == bot.json.loads(encoded)
+
+
+def test_dumps_cache_key_is_order_independent_with_and_without_orjson(monkeypatch):
+    from decimal import Decimal
+
+    first = {"b": [1, 2], "a": {"y": Decimal("0.1"), "x": None}}
+    second = {"a": {"x": None, "y": Decimal("0.1")}, "b": [1, 2]}
+
+    assert bot.dumps_cache_key(first) == bot.dumps_cache_key(second)
+    assert bot.dumps_cache_key(first) != bot.dumps_cache_key({**first, "b": [2, 1]})
+
+    monkeypatch.setattr(bot, "orjson", None)
+    assert bot.dumps_cache_key(first) == bot.dumps_cache_key(second)
+
+
+def test_build_http_session_honours_trust_env_setting(monkeypatch):
+    monkeypatch.setattr(bot, "HTTP_TRUST_ENV", False)
+    assert bot.build_http_session().trust_env is False
+    assert bot.build_http_session(trust_env=True).trust_env is True
+
+
+def test_telegram_session_pool_covers_send_and_command_workers():
+    adapter = bot.TELEGRAM_SESSION.get_adapter("https://api.telegram.org")
+    assert adapter._pool_maxsize > bot.TELEGRAM_SEND_WORKERS + bot.TELEGRAM_COMMAND_WORKERS
@@ -128,3 +128,99 @@ def test_fetch_all_quotes_opens_circuit_and_skips_failed_p2p_venue(monkeypatch):
     assert snapshot["errors"] == observability.CIRCUIT_FAILURE_THRESHOLD
     assert snapshot["skips"] == 1
 
+
+def test_fetch_all_quotes_skips_queued_tasks_once_circuit_opens(monkeypatch):
+    observability.reset_all_states()
+    bot.invalidate_quote_cache()
+
+    venue = "test_queued"
+    pairs = [f"C{i}/USDT" for i in range(observability.CIRCUIT_FAILURE_THRESHOLD + 2)]
+    calls = []
+
+    class FailingAdapter(bot.ExchangeAdapter):
+        def normalize_symbol(self, pair: str) -> str:
+            return pair
+
+        def fetch_quote(self, pair: str):
+            calls.append(pair)
+            raise bot.HttpError("transport down")
+
+    executor = bot.ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(bot, "get_quote_executor", lambda: executor)
+    try:
+        bot.fetch_all_quotes(pairs, {venue: FailingAdapter()})
+    finally:
+        executor.shutdown(wait=True)
+
+    snapshot = observability.metrics_snapshot()[venue]
+    assert len(calls) == observability.CIRCUIT_FAILURE_THRESHOLD
+    assert snapshot["skips"] == 2
+
+
+
+def test_latency_window_wraps_and_reports_percentiles():
+    window = observability.LatencyWindow(4)
+    assert window.mean() is None
+
+    for value in (10.0, 20.0, 30.0, 40.0, 50.0, 60.0):
+        window.record(value)
+
+    assert len(window) == 4
+    assert window.mean() == 45.0
+    snapshot = window.snapshot()
+    assert snapshot["samples"] == 4
+    assert snapshot["max"] == 60.0
+    assert snapshot["p95"] == 60.0
+
+    observability.reset_all_states()
+    observability.record_fetch_latency(12.5)
+    assert observability.avg_fetch_latency_ms() == 12.5
+
+
+def test_render_prometheus_metrics_reuses_body_until_next_update():
+    bot.update_prometheus_metrics({}, {"ts": 1, "run_latency_ms": 5}, 0)
+    first = bot.render_prometheus_metrics()
+    assert bot.render_prometheus_metrics() is first
+
+    bot.update_prometheus_metrics({}, {"ts": 2, "run_latency_ms": 7}, 0)
+    assert bot.render_prometheus_metrics() is not first
+
+
+def test_circuit_breaker_cooldown_doubles_until_success(monkeypatch):
+    observability.reset_all_states()
+    exchange = "flaky"
+    clock = {"now": 1_000.0}
+    monkeypatch.setattr(observability.time, "time", lambda: clock["now"])
+
+    for _ in range(observability.CIRCUIT_FAILURE_THRESHOLD):
+        observability.record_exchange_error(exchange, "boom")
+    first = observability.circuit_snapshot()[exchange]
+    assert first["remaining_seconds"] == observability.CIRCUIT_COOLDOWN_SECONDS
+
+    clock["now"] += observability.CIRCUIT_COOLDOWN_SECONDS + 1
+    assert not observability.is_circuit_open(exchange)
+    observability.record_exchange_error(exchange, "boom again")
+    second = observability.circuit_snapshot()[exchange]
+    assert second["remaining_seconds"] == observability.CIRCUIT_COOLDOWN_SECONDS * 2
+    assert second["trips"] == 2
+
+    clock["now"] += observability.CIRCUIT_COOLDOWN_MAX_SECONDS + 1
+    assert not observability.is_circuit_open(exchange)
+    observability.record_exchange_success(exchange)
+    for _ in range(observability.CIRCUIT_FAILURE_THRESHOLD):
+        observability.record_exchange_error(exchange, "boom")
+    assert observability.circuit_snapshot()[exchange]["trips"] == 1
+
+
+def test_circuit_breaker_burst_of_errors_trips_once(monkeypatch):
+    observability.reset_all_states()
+    exchange = "bursty"
+    clock = {"now": 1_000.0}
+    monkeypatch.setattr(observability.time, "time", lambda: clock["now"])
+
+    for _ in range(observability.CIRCUIT_FAILURE_THRESHOLD + 5):
+        observability.record_exchange_error(exchange, "boom")
+
+    snapshot = observability.circuit_snapshot()[exchange]
+    assert snapshot["trips"] == 1
+    assert snapshot["remaining_seconds"] == observability.CIRCUIT_COOLDOWN_SECONDS
@@ -89,3 +89,18 @@ def test_ensure_web_startup_requirements_scanner_mode_warns_without_auth(monkeyp
     event, payload = events[0]
     assert event == "web.startup.missing_auth_scanner_mode"
     assert payload["role"] == "scanner"
+
+
+def test_get_bot_token_caches_value_per_env_name(monkeypatch):
+    monkeypatch.setattr(bot, "BOT_TOKEN_CACHE", {})
+    monkeypatch.setitem(bot.CONFIG["telegram"], "bot_token_env", "TEST_BOT_TOKEN")
+    monkeypatch.delenv("TEST_BOT_TOKEN", raising=False)
+
+    assert bot.get_bot_token() == ""
+    monkeypatch.setenv("TEST_BOT_TOKEN", " abc ")
+    assert bot.get_bot_token() == "abc"
+    monkeypatch.setenv("TEST_BOT_TOKEN", "rotated")
+    assert bot.get_bot_token() == "abc"
+
+    bot.reset_bot_token_cache()
+    assert bot.get_bot_token() == "rotated"
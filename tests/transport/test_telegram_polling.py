@@ -1,6 +1,19 @@
+import pytest
+
 import arbitrage_telebot as bot
 
 
+@pytest.fixture(autouse=True)
+def _isolated_chat_ids_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(bot, "TELEGRAM_CHAT_IDS_PATH", tmp_path / "chat_ids.json")
+    monkeypatch.setattr(bot, "TELEGRAM_OFFSET_PATH", tmp_path / "telegram_offset")
+    yield
+    timer = bot.TELEGRAM_CHAT_IDS_PERSIST_TIMER
+    if timer is not None:
+        timer.cancel()
+        bot.TELEGRAM_CHAT_IDS_PERSIST_TIMER = None
+
+
 class _FixedTime:
     def __init__(self, value: float):
         self._value = value
@@ -38,7 +51,7 @@ def test_tg_process_updates_resets_webhook_on_conflict(monkeypatch):
     monkeypatch.setattr(bot, "tg_api_request", fake_api)
     monkeypatch.setattr(bot, "log_event", fake_log_event)
 
-    bot.tg_process_updates(enabled=True)
+    assert bot.tg_process_updates(enabled=True) is False
 
     assert methods == ["deleteWebhook"]
     conflict_events = [payload for event, payload in events if event == "telegram.poll.conflict"]
@@ -88,12 +101,14 @@ def test_tg_process_updates_uses_long_poll_http_timeout(monkeypatch):
     monkeypatch.setattr(bot, "tg_api_request", fake_api)
     monkeypatch.setattr(bot, "log_event", lambda *args, **kwargs: None)
 
-    bot.tg_process_updates(enabled=True)
+    assert bot.tg_process_updates(enabled=True) is True
 
     assert calls
     method, params, request_timeout = calls[0]
     assert method == "getUpdates"
     assert params["timeout"] == bot.TELEGRAM_POLL_TIMEOUT_SECONDS
+    assert params["limit"] == bot.TELEGRAM_POLL_LIMIT
+    assert bot.json.loads(params["allowed_updates"]) == ["message", "channel_post"]
     assert request_timeout > params["timeout"]
     assert request_timeout == params["timeout"] + bot.TELEGRAM_POLL_HTTP_TIMEOUT_GRACE_SECONDS
 
@@ -172,7 +187,7 @@ def test_tg_send_message_includes_inline_keyboard_reply_markup(monkeypatch):
     monkeypatch.setattr(bot, "get_bot_token", lambda: "token")
     monkeypatch.setattr(bot, "get_registered_chat_ids", lambda: ["123"])
     monkeypatch.setattr(bot, "log_event", lambda *args, **kwargs: None)
-    monkeypatch.setattr(bot.requests, "post", lambda _url, data, timeout: sent_payloads.append(data) or _Response())
+    monkeypatch.setattr(bot.TELEGRAM_SESSION, "post", lambda _url, data, timeout: sent_payloads.append(data) or _Response())
 
     links = bot.build_trade_link_items("binance", "bybit", "BTC/USDT")
     reply_markup = bot.build_trade_reply_markup(links)
@@ -210,6 +225,21 @@ def test_tg_handle_command_ping_returns_pong(monkeypatch):
     assert messages == ["pong"]
 
 
+def test_tg_handle_command_dispatch_is_case_insensitive_and_rejects_unknown(monkeypatch):
+    messages = []
+
+    monkeypatch.setattr(bot, "tg_send_message", lambda text, **payload: messages.append(text))
+
+    bot.tg_handle_command("/PING", "", "123", enabled=True)
+    bot.tg_handle_command("/nope", "", "123", enabled=True)
+    bot.tg_handle_command("/ping@ArbitrageBot", "", "123", enabled=True)
+
+    assert messages[0] == "pong"
+    assert messages[1].startswith("Comando no reconocido")
+    assert messages[2] == "pong"
+    assert bot.COMMAND_HANDLERS["/listapares"] is bot.COMMAND_HANDLERS["/pairs"]
+
+
 def test_build_health_payload_reports_telegram_polling_alive(monkeypatch):
     monkeypatch.setattr(bot, "PROCESS_ROLE", "telegram-worker")
     monkeypatch.setattr(bot, "metrics_snapshot", lambda: {})
@@ -310,3 +340,380 @@ def test_api_state_payload_contains_summary_and_alerts_after_run_once(monkeypatc
     assert sent["status"] == 200
     assert sent["payload"]["last_run_summary"]
     assert sent["payload"]["latest_alerts"]
+
+
+def test_tg_send_message_broadcasts_to_all_chats_and_records_send_ts(monkeypatch):
+    sent_chats = []
+
+    class _Response:
+        status_code = 200
+        text = "ok"
+
+    monkeypatch.setattr(bot, "get_bot_token", lambda: "token")
+    monkeypatch.setattr(bot, "get_registered_chat_ids", lambda: ["1", "2", "3"])
+    monkeypatch.setattr(bot, "log_event", lambda *args, **kwargs: None)
+    monkeypatch.setattr(bot, "LAST_TELEGRAM_SEND_TS", 0.0)
+    monkeypatch.setattr(
+        bot.TELEGRAM_SESSION,
+        "post",
+        lambda _url, data, timeout: sent_chats.append(data["chat_id"]) or _Response(),
+    )
+
+    bot.tg_send_message("alerta", enabled=True)
+
+    assert sorted(sent_chats) == ["1", "2", "3"]
+    assert bot.LAST_TELEGRAM_SEND_TS > 0
+
+
+def test_tg_send_message_records_failed_targets_once_per_broadcast(monkeypatch):
+    class _Response:
+        def __init__(self, status_code):
+            self.status_code = status_code
+            self.text = "ok" if status_code == 200 else "Forbidden: bot was blocked"
+
+    monkeypatch.setattr(bot, "get_bot_token", lambda: "token")
+    monkeypatch.setattr(bot, "get_registered_chat_ids", lambda: ["1", "2", "3"])
+    monkeypatch.setattr(bot, "log_event", lambda *args, **kwargs: None)
+    monkeypatch.setattr(bot, "LAST_TELEGRAM_SEND_TS", 0.0)
+    monkeypatch.setattr(bot, "TELEGRAM_SEND_ERRORS", bot.deque(maxlen=100))
+    monkeypatch.setattr(
+        bot.TELEGRAM_SESSION,
+        "post",
+        lambda _url, data, timeout: _Response(403 if data["chat_id"] == "2" else 200),
+    )
+
+    bot.tg_send_message("alerta", enabled=True)
+
+    assert bot.LAST_TELEGRAM_SEND_TS > 0
+    assert [entry["chat_id"] for entry in bot.TELEGRAM_SEND_ERRORS] == ["2"]
+    assert bot.TELEGRAM_SEND_ERRORS[0]["status"] == 403
+
+
+def test_token_bucket_waits_once_burst_is_spent(monkeypatch):
+    clock = {"now": 100.0}
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock["now"] += seconds
+
+    monkeypatch.setattr(bot.time, "monotonic", lambda: clock["now"])
+    monkeypatch.setattr(bot.time, "sleep", fake_sleep)
+
+    bucket = bot.TokenBucket(rate=2.0, burst=2)
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == 0.5
+    assert sleeps == [0.5]
+
+
+def test_polling_thread_backs_off_on_errors_and_stops_on_request(monkeypatch):
+    calls = []
+    waits = []
+
+    def fake_process(enabled=True):
+        calls.append(enabled)
+        if len(calls) >= 3:
+            bot.TELEGRAM_POLL_STOP.set()
+        return False
+
+    def fake_wait(timeout=None):
+        waits.append(timeout)
+        return bot.TELEGRAM_POLL_STOP.is_set()
+
+    monkeypatch.setattr(bot, "tg_process_updates", fake_process)
+    monkeypatch.setattr(bot, "TELEGRAM_POLLING_THREAD", None)
+    monkeypatch.setattr(bot.TELEGRAM_POLL_STOP, "wait", fake_wait)
+
+    bot.ensure_telegram_polling_thread(enabled=True, interval=1.0)
+    bot.TELEGRAM_POLLING_THREAD.join(timeout=2)
+
+    assert not bot.TELEGRAM_POLLING_THREAD.is_alive()
+    assert len(calls) == 3
+    assert waits == [1.0, 2.0, 4.0]
+    bot.TELEGRAM_POLL_STOP.clear()
+
+
+def test_polling_thread_sleeps_through_conflict_backoff(monkeypatch):
+    calls = []
+    waits = []
+
+    def fake_process(enabled=True):
+        calls.append(enabled)
+        if len(calls) == 1:
+            bot.TELEGRAM_POLL_BACKOFF_UNTIL = bot.time.monotonic() + 30.0
+        else:
+            bot.TELEGRAM_POLL_BACKOFF_UNTIL = 0.0
+            bot.TELEGRAM_POLL_STOP.set()
+        return False
+
+    def fake_wait(timeout=None):
+        waits.append(timeout)
+        return bot.TELEGRAM_POLL_STOP.is_set()
+
+    monkeypatch.setattr(bot, "tg_process_updates", fake_process)
+    monkeypatch.setattr(bot, "TELEGRAM_POLLING_THREAD", None)
+    monkeypatch.setattr(bot, "TELEGRAM_POLL_BACKOFF_UNTIL", 0.0)
+    monkeypatch.setattr(bot.TELEGRAM_POLL_STOP, "wait", fake_wait)
+
+    bot.ensure_telegram_polling_thread(enabled=True, interval=1.0)
+    bot.TELEGRAM_POLLING_THREAD.join(timeout=2)
+
+    assert len(calls) == 2
+    assert 29.0 < waits[0] <= 30.0
+    assert waits[1:] == [1.0]
+    bot.TELEGRAM_POLL_STOP.clear()
+
+
+def test_tg_send_message_retries_as_plain_text_when_markdown_is_rejected(monkeypatch):
+    sent_payloads = []
+
+    class _Response:
+        def __init__(self, status_code, text):
+            self.status_code = status_code
+            self.text = text
+
+    def fake_post(_url, data, timeout):
+        sent_payloads.append(dict(data))
+        if "parse_mode" in data:
+            return _Response(400, '{"ok":false,"description":"Bad Request: can\'t parse entities"}')
+        return _Response(200, "ok")
+
+    monkeypatch.setattr(bot, "get_bot_token", lambda: "token")
+    monkeypatch.setattr(bot, "log_event", lambda *args, **kwargs: None)
+    monkeypatch.setattr(bot.TELEGRAM_SESSION, "post", fake_post)
+
+    bot.tg_send_message("par BTC_USDT", enabled=True, chat_id="42")
+
+    assert [payload.get("parse_mode") for payload in sent_payloads] == ["Markdown", None]
+
+
+def test_tg_send_message_honors_retry_after_on_429(monkeypatch):
+    responses = []
+    sleeps = []
+
+    class _Response:
+        def __init__(self, status_code, content):
+            self.status_code = status_code
+            self.content = content
+            self.text = content.decode()
+
+    def fake_post(_url, data, timeout):
+        if not responses:
+            responses.append(429)
+            return _Response(429, b'{"ok":false,"parameters":{"retry_after":3}}')
+        responses.append(200)
+        return _Response(200, b'{"ok":true}')
+
+    monkeypatch.setattr(bot, "get_bot_token", lambda: "token")
+    monkeypatch.setattr(bot, "log_event", lambda *args, **kwargs: None)
+    monkeypatch.setattr(bot.time, "sleep", sleeps.append)
+    monkeypatch.setattr(bot.TELEGRAM_SESSION, "post", fake_post)
+
+    bot.tg_send_message("alerta", enabled=True, chat_id="42")
+
+    assert responses == [429, 200]
+    assert sleeps == [3.0]
+
+
+def test_register_telegram_chat_is_consistent_under_concurrency(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    monkeypatch.setattr(bot, "TELEGRAM_CHAT_IDS", set())
+    monkeypatch.setattr(bot, "log_event", lambda *args, **kwargs: None)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(bot.register_telegram_chat, range(200)))
+
+    expected = sorted(str(i) for i in range(200))
+    assert bot.get_registered_chat_ids() == expected
+    assert bot.TELEGRAM_CHAT_IDS_PERSIST_TIMER is not None
+
+
+def test_flush_telegram_chat_ids_persists_and_reloads(monkeypatch):
+    path = bot.TELEGRAM_CHAT_IDS_PATH
+    monkeypatch.setattr(bot, "TELEGRAM_CHAT_IDS", set())
+    monkeypatch.setattr(bot, "log_event", lambda *args, **kwargs: None)
+    monkeypatch.setenv(bot.CONFIG["telegram"]["chat_ids_env"], "7")
+
+    bot.register_telegram_chat(5)
+    bot.register_telegram_chat(3)
+    bot.flush_telegram_chat_ids()
+
+    assert bot.TELEGRAM_CHAT_IDS_PERSIST_TIMER is None
+    assert bot.json.loads(path.read_text(encoding="utf-8")) == ["3", "5"]
+
+    bot.TELEGRAM_CHAT_IDS.clear()
+    bot._load_telegram_chat_ids_from_env()
+    assert bot.get_registered_chat_ids() == ["3", "5", "7"]
+
+
+def test_tg_process_updates_keeps_per_chat_order_across_parallel_chats(monkeypatch):
+    _setup_common(monkeypatch)
+    monkeypatch.setattr(bot, "TELEGRAM_CHAT_IDS", set())
+    monkeypatch.setattr(bot, "log_event", lambda *args, **kwargs: None)
+
+    updates = [
+        {"update_id": 1, "message": {"chat": {"id": 10}, "text": "/a1"}},
+        {"update_id": 2, "message": {"chat": {"id": 20}, "text": "/b1"}},
+        {"update_id": 3, "message": {"chat": {"id": 10}, "text": "/a2"}},
+        {"update_id": 4, "message": {"chat": {"id": 20}, "text": "/b2"}},
+    ]
+
+    def fake_api(method, params=None, http_method="get", request_timeout=None):
+        return {"ok": True, "result": updates}
+
+    handled = []
+    lock = bot.threading.Lock()
+
+    def fake_handle(command, argument, chat_id, enabled):
+        with lock:
+            handled.append((chat_id, command))
+
+    monkeypatch.setattr(bot, "tg_api_request", fake_api)
+    monkeypatch.setattr(bot, "tg_handle_command", fake_handle)
+
+    assert bot.tg_process_updates(enabled=True) is True
+    assert bot.TELEGRAM_LAST_UPDATE_ID == 4
+    assert [c for chat, c in handled if chat == "10"] == ["/a1", "/a2"]
+    assert [c for chat, c in handled if chat == "20"] == ["/b1", "/b2"]
+
+
+def test_tg_send_message_nowait_preserves_alert_order(monkeypatch):
+    sent = []
+    monkeypatch.setattr(bot, "tg_send_message", lambda text, **kwargs: sent.append(text))
+
+    pending = [bot.tg_send_message_nowait(f"alerta {idx}", enabled=True) for idx in range(5)]
+    bot.wait_for_telegram_sends(pending)
+
+    assert all(future.done() for future in pending)
+    assert sent == [f"alerta {idx}" for idx in range(5)]
+
+
+def test_batch_telegram_texts_groups_without_exceeding_limit():
+    texts = ["a" * 10, "b" * 10, "c" * 10, "d" * 25]
+
+    batches = bot.batch_telegram_texts(texts, limit=24, separator="\n\n")
+
+    assert batches == ["a" * 10 + "\n\n" + "b" * 10, "c" * 10, "d" * 25]
+    assert bot.batch_telegram_texts([]) == []
+
+
+def test_tg_process_updates_persists_offset_and_reloads_it(monkeypatch):
+    _setup_common(monkeypatch)
+    monkeypatch.setattr(bot, "TELEGRAM_CHAT_IDS", set())
+    monkeypatch.setattr(bot, "log_event", lambda *args, **kwargs: None)
+    monkeypatch.setattr(bot, "tg_handle_command", lambda *args, **kwargs: None)
+
+    updates = [
+        {"update_id": 7, "message": {"chat": {"id": 10}, "text": "/ping"}},
+        {"update_id": 9, "message": {"chat": {"id": 10}, "text": "/ping"}},
+        {"update_id": 8},
+    ]
+    monkeypatch.setattr(bot, "tg_api_request", lambda *args, **kwargs: {"ok": True, "result": updates})
+
+    assert bot.tg_process_updates(enabled=True) is True
+    assert bot.TELEGRAM_OFFSET_PATH.read_text(encoding="utf-8") == "9"
+
+    monkeypatch.setattr(bot, "TELEGRAM_LAST_UPDATE_ID", 0)
+    bot._load_telegram_offset()
+    assert bot.TELEGRAM_LAST_UPDATE_ID == 9
+
+
+def test_register_telegram_chats_registers_only_new_ids_once(monkeypatch):
+    events = []
+    scheduled = []
+    monkeypatch.setattr(bot, "TELEGRAM_CHAT_IDS", {"1"})
+    monkeypatch.setattr(bot, "log_event", lambda event, **payload: events.append(payload.get("chat_id")))
+    monkeypatch.setattr(bot, "_schedule_chat_ids_persist", lambda: scheduled.append(True))
+
+    bot.register_telegram_chats(["1", "2", "3", "2"])
+    bot.register_telegram_chats(["1", "3"])
+
+    assert bot.TELEGRAM_CHAT_IDS == {"1", "2", "3"}
+    assert events == ["2", "3"]
+    assert scheduled == [True]
+
+
+def test_get_registered_chat_ids_cache_refreshes_on_registration(monkeypatch):
+    monkeypatch.setattr(bot, "TELEGRAM_CHAT_IDS", {"2", "1"})
+    monkeypatch.setattr(bot, "log_event", lambda *args, **kwargs: None)
+
+    first = bot.get_registered_chat_ids()
+    first.append("mutated")
+    assert bot.get_registered_chat_ids() == ["1", "2"]
+
+    bot.register_telegram_chat(0)
+    assert bot.get_registered_chat_ids() == ["0", "1", "2"]
+    assert bot.count_registered_chats() == 3
+
+
+def test_command_help_and_method_urls_are_built_once():
+    assert bot.format_command_help() is bot.format_command_help()
+    assert "/ping" in bot.format_command_help()
+    assert bot.tg_method_url("token", "sendMessage") == "https://api.telegram.org/bottoken/sendMessage"
+    assert bot.tg_method_url("token", "sendMessage") is bot.tg_method_url("token", "sendMessage")
+
+
+def test_tg_process_updates_skips_free_text_without_pending_action(monkeypatch):
+    _setup_common(monkeypatch)
+    monkeypatch.setattr(bot, "TELEGRAM_CHAT_IDS", set())
+    monkeypatch.setattr(bot, "log_event", lambda *args, **kwargs: None)
+    monkeypatch.setattr(bot, "get_pending_action", lambda chat_id: "addpair" if chat_id == "30" else None)
+
+    updates = [
+        {"update_id": 1, "message": {"chat": {"id": 10}, "text": "hola a todos"}},
+        {"update_id": 2, "message": {"chat": {"id": 20}, "text": " /ping"}},
+        {"update_id": 3, "message": {"chat": {"id": 20}, "text": "BTC/USDT"}},
+        {"update_id": 4, "message": {"chat": {"id": 30}, "text": "ETH/USDT"}},
+    ]
+    monkeypatch.setattr(bot, "tg_api_request", lambda *args, **kwargs: {"ok": True, "result": updates})
+
+    handled = []
+    lock = bot.threading.Lock()
+
+    def fake_chat_texts(chat_id, texts, enabled):
+        with lock:
+            handled.append((chat_id, list(texts)))
+
+    monkeypatch.setattr(bot, "_tg_handle_chat_texts", fake_chat_texts)
+
+    assert bot.tg_process_updates(enabled=True) is True
+    assert sorted(handled) == [("20", ["/ping", "BTC/USDT"]), ("30", ["ETH/USDT"])]
+    assert bot.TELEGRAM_CHAT_IDS == {"10", "20", "30"}
+
+
+def test_tg_api_request_retries_once_after_429(monkeypatch):
+    sleeps = []
+    calls = []
+
+    class _Response:
+        def __init__(self, status_code, content):
+            self.status_code = status_code
+            self.content = content
+            self.text = content.decode()
+
+    def fake_get(_url, params, timeout):
+        calls.append(params)
+        if len(calls) == 1:
+            return _Response(429, b'{"ok":false,"parameters":{"retry_after":2}}')
+        return _Response(200, b'{"ok":true,"result":true}')
+
+    monkeypatch.setattr(bot, "get_bot_token", lambda: "token")
+    monkeypatch.setattr(bot, "log_event", lambda *args, **kwargs: None)
+    monkeypatch.setattr(bot.time, "sleep", sleeps.append)
+    monkeypatch.setattr(bot.TELEGRAM_SESSION, "get", fake_get)
+
+    assert bot.tg_api_request("getMe") == {"ok": True, "result": True}
+    assert len(calls) == 2
+    assert sleeps == [2.25]
+
+
+def test_tg_process_updates_skips_when_another_poll_is_in_flight(monkeypatch):
+    monkeypatch.setattr(bot, "log_event", lambda *args, **kwargs: None)
+    monkeypatch.setattr(
+        bot, "_tg_process_updates_locked", lambda enabled: (_ for _ in ()).throw(AssertionError())
+    )
+
+    with bot.TELEGRAM_POLL_LOCK:
+        assert bot.tg_process_updates(enabled=True) is False